@@ -0,0 +1,368 @@
+"""Data and advisor logic behind the Streamlit dashboard.
+
+Importing this module has no side effects and does not pull in Streamlit,
+pandas or plotly, so it can be used headless (see `chatbot_logic`) and in
+tests. app.py wraps these functions with Streamlit caching and UI.
+"""
+import os
+import tempfile
+import threading
+import weakref
+from typing import Dict, List, Optional
+
+from alerts import AlertEngine, alert_message, answer_alert_command, is_alert_command
+from coingecko import get_client
+from disk_cache import get_disk_cache
+from downsample import downsample_indices
+from export import columns_for, export, history_chunks, market_chunks, snapshot_chunks
+from fx import BASE_CURRENCY, currency_symbol, format_money, get_fx_table
+from indicators import INDICATORS, get_indicator_cache
+from market_cache import MarketRefresher
+from market_model import MarketSnapshot, decode_markets
+from metrics import get_metrics, span
+from portfolio import PortfolioBook
+from price_feed import get_price_table
+from price_history import get_history_store
+from universe import get_universe
+
+#Offline Dataset
+crypto_db = {
+    "bitcoin": {"name": "Bitcoin", "symbol": "BTC", "trend": "rising 🚀", "sustainability": 3},
+    "ethereum": {"name": "Ethereum", "symbol": "ETH", "trend": "stable ⚖️", "sustainability": 6},
+    "cardano": {"name": "Cardano", "symbol": "ADA", "trend": "rising 📈", "sustainability": 8},
+    "solana": {"name": "Solana", "symbol": "SOL", "trend": "volatile ⚡", "sustainability": 7},
+    "ripple": {"name": "XRP", "symbol": "XRP", "trend": "stable ⚖️", "sustainability": 8},
+}
+
+# Chart windows, all sliced from the same locally stored history
+CHART_WINDOWS = {"1 Day": "1", "7 Days": "7", "30 Days": "30", "90 Days": "90"}
+
+MODES = ["Rule-based", "Live (CoinGecko)"]
+# Owner of the dashboard chat's alerts, within each session's own engine (see `session_alerts`)
+ALERT_OWNER = "dashboard"
+
+# Indicator columns in price units; the others are ratios, percentages or an index
+PRICE_COLUMNS = ("price", "sma", "ema", "bb_mid", "bb_upper", "bb_lower")
+
+DISPLAY_COLUMNS = {
+    "name": "Name",
+    "symbol": "Symbol",
+    "current_price": "Price ($)",
+    "market_cap": "Market Cap",
+    "total_volume": "Volume",
+    "price_change_percentage_24h": "24h Change (%)",
+}
+
+
+# How often the background refresher polls /coins/markets
+REFRESH_INTERVAL = float(os.environ.get("CRYPTOBUDDY_REFRESH_INTERVAL", "30"))
+# With a streaming feed (CRYPTOBUDDY_FEED_URL) prices change every tick; redraw cards every second
+METRICS_INTERVAL = 1.0 if os.environ.get("CRYPTOBUDDY_FEED_URL") else REFRESH_INTERVAL
+
+
+# Helper Functions
+def _markets_params(ids):
+    params = {
+        "vs_currency": "usd",
+        "order": "market_cap_desc",
+        "sparkline": "false",
+        "price_change_percentage": "24h",
+    }
+    if ids:
+        params["ids"] = ",".join(ids)
+    return params
+
+
+def _load_markets(ids):
+    data = decode_markets(get_client().get("/coins/markets", _markets_params(ids)))
+    if data:
+        get_disk_cache().put("markets:" + ",".join(ids), data)
+    return data
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def get_refresher():
+    """Process-wide refresher polling the curated coins (plus any tracked ones) in the background."""
+    global _refresher
+    if _refresher is None:
+        with _refresher_lock:
+            if _refresher is None:
+                ids = tuple(crypto_db)
+                refresher = MarketRefresher(_load_markets, ids, interval=REFRESH_INTERVAL)
+                entry = get_disk_cache().get("markets:" + ",".join(ids))
+                if entry is not None:
+                    refresher.seed(decode_markets(entry.value))
+                # Open sessions' alerts are checked on every published snapshot and streamed tick
+                refresher.cache.subscribe(_check_alerts)
+                table = get_price_table()
+                if table is not None:
+                    table.subscribe(_check_tick)
+                _refresher = refresher.start()
+                get_metrics().register("market_refresher", _refresher_samples)
+    return _refresher
+
+
+def _refresher_samples():
+    refresher = _refresher
+    return [("cryptobuddy_refresh_errors_total", "counter", {}, refresher.errors),
+            ("cryptobuddy_cache_hits_total", "counter", {"cache": "refresher"}, refresher.cache.hits),
+            ("cryptobuddy_cache_misses_total", "counter", {"cache": "refresher"}, refresher.cache.misses)]
+
+
+# Alert engines of open dashboard sessions; held weakly, so a closed session's rules go with it
+_session_engines = weakref.WeakSet()
+
+
+def session_alerts():
+    """A new in-memory AlertEngine for one dashboard session.
+
+    A browser session has no stable identity (a reload starts a new one), so
+    its rules stay out of the persistent store and end with the session.
+    """
+    engine = AlertEngine()
+    _session_engines.add(engine)
+    return engine
+
+
+def _check_alerts(snapshot):
+    for engine in list(_session_engines):
+        if len(engine):
+            engine.evaluate_snapshot(snapshot, latest_indicators)
+
+
+def _check_tick(tick):
+    for engine in list(_session_engines):
+        if len(engine):
+            engine.evaluate_tick(tick)
+
+
+def latest_indicators(coin_ids):
+    """{id: latest indicator values} over locally stored history; no requests are made."""
+    cache = get_indicator_cache()
+    out = {}
+    for cid in coin_ids:
+        series = cache.get(cid, "7")
+        if series is not None:
+            out[cid] = series.latest()
+    return out
+
+
+def resolve_coin(text: str) -> Optional[str]:
+    """Coin ID for a curated coin's ID, name or symbol, else any listed coin's."""
+    key = text.strip().lower()
+    for cid, info in crypto_db.items():
+        if key in (cid, info["name"].lower(), info["symbol"].lower()):
+            return cid
+    return get_universe().resolve(key)
+
+
+def answer_alert(query: str, engine: AlertEngine, currency: str = BASE_CURRENCY) -> Optional[str]:
+    """Reply to an alert command from the dashboard chat, with the session's `engine`, or None if `query` is not one."""
+    refresher = get_refresher()
+
+    def price_of(coin_id):
+        if refresher.watch([coin_id]):
+            refresher.refresh()
+        record = refresher.snapshot().by_id.get(coin_id)
+        return record.get("current_price") if record else None
+
+    def display_name(coin_id):
+        return crypto_db[coin_id]["name"] if coin_id in crypto_db else coin_id.title()
+
+    reply = answer_alert_command(query, engine, ALERT_OWNER, resolve_coin, price_of, display_name,
+                                 quote_currency(currency), indicators=latest_indicators)
+    # Alerted coins join the polled set, so every refresh can check them
+    if refresher.watch(engine.watched()):
+        refresher.refresh()
+    return reply
+
+
+def take_alerts(engine: AlertEngine, currency: str = BASE_CURRENCY) -> List[str]:
+    """Messages for the session's alerts that fired since the last call."""
+    return [alert_message(note, quote_currency(currency)) for note in engine.take(ALERT_OWNER)]
+
+
+def quote_currency(currency):
+    """`currency` if it has an exchange rate, else USD (which never fetches rates)."""
+    if currency == BASE_CURRENCY or get_fx_table().rate(currency) is None:
+        return BASE_CURRENCY
+    return currency
+
+
+def market_snapshot(ids: List[str], currency: str = BASE_CURRENCY):
+    """Latest published market records for `ids`, in market cap order; never waits on
+    CoinGecko except for the very first load or a coin nobody has tracked yet.
+    Prices and 24h changes come from the streaming feed when one is configured;
+    money fields are converted from USD locally."""
+    refresher = get_refresher()
+    if refresher.watch(ids):
+        refresher.refresh()
+    coins = refresher.snapshot().coins.select(ids)
+    table = get_price_table()
+    if table is not None:
+        coins = MarketSnapshot(table.overlay(coins, max_age=REFRESH_INTERVAL))
+    currency = quote_currency(currency)
+    return coins if currency == BASE_CURRENCY else get_fx_table().convert_snapshot(coins, currency)
+
+
+def fetch_chart_data(coin_id: str, days: str = "7", max_points: Optional[int] = None, currency: str = BASE_CURRENCY):
+    """Fetches historical price data for charting, downsampled to at most `max_points`."""
+    # Only the tail since the last stored point is downloaded; windows are slices
+    points = get_history_store().window(coin_id, days)
+    return _chart_frame(get_fx_table().convert_points(points, quote_currency(currency)), max_points)
+
+
+def fetch_chart_data_many(coin_ids: tuple, days: str = "7", max_points: Optional[int] = None,
+                          currency: str = BASE_CURRENCY):
+    """Fetches several coins' histories concurrently; missing ones map to None."""
+    store = get_history_store()
+    store.update_many(coin_ids, days)
+    fx, currency = get_fx_table(), quote_currency(currency)
+    return {cid: _chart_frame(fx.convert_points(store.window(cid, days, refresh=False), currency), max_points)
+            for cid in coin_ids}
+
+
+def load_universe():
+    """Top 1,000 coins as a compact column table with a name/symbol index; the same
+    process-wide table `resolve_coin` uses, re-ingested every ten minutes."""
+    return get_universe(max_pages=4)
+
+
+def to_datetimes(ts_ms):
+    import pandas as pd
+
+    return pd.to_datetime(ts_ms, unit="ms")
+
+
+def _chart_frame(points, max_points=None):
+    if points is None or not len(points):
+        return None
+    with span("frame", kind="chart"):
+        if max_points:
+            points = points[downsample_indices(points["ts"], points["price"], max_points)]
+        import pandas as pd
+
+        return pd.DataFrame({"timestamp": to_datetimes(points["ts"]), "price": points["price"]})
+
+
+def indicator_frame(coin_id: str, days: str = "7", max_points: Optional[int] = None, currency: str = BASE_CURRENCY):
+    """Chart window with SMA/EMA/RSI/Bollinger/volatility/momentum columns, or None.
+
+    Served from the per-(coin, window) indicator cache, which only computes
+    the points added since the last call. With `max_points`, rows are the
+    ones downsampling the price keeps, so overlays line up with the price trace.
+    """
+    series = get_indicator_cache().get(coin_id, days)
+    if series is None:
+        return None
+    import pandas as pd
+
+    with span("frame", kind="indicators"):
+        idx = downsample_indices(series.ts, series.price, max_points) if max_points else slice(None)
+        df = pd.DataFrame({name: series.values(name)[idx] for name in INDICATORS})
+        df.insert(0, "price", series.price[idx])
+        currency = quote_currency(currency)
+        if currency != BASE_CURRENCY:
+            df[list(PRICE_COLUMNS)] *= get_fx_table().rate(currency)
+        df.insert(0, "timestamp", to_datetimes(series.ts[idx]))
+    return df
+
+
+def market_table(market_data, currency: str = BASE_CURRENCY):
+    """Display-ready DataFrame of the market snapshot (already in `currency`) for the data explorer."""
+    if not isinstance(market_data, MarketSnapshot):
+        market_data = MarketSnapshot(market_data)
+    with span("frame", kind="market_table"):
+        df_display = market_data.to_frame(list(DISPLAY_COLUMNS))
+        df_display.columns = [label.replace("$", currency_symbol(currency)) for label in DISPLAY_COLUMNS.values()]
+    return df_display
+
+
+# Export sources offered by the dashboard
+EXPORT_DATASETS = {"view": "Current view", "market": "Whole market", "history": "Stored price history"}
+
+
+def stored_history_coins() -> List[str]:
+    return get_history_store().coins()
+
+
+def export_file(dataset: str, fmt: str = "csv", columns: Optional[List[str]] = None, market_data=None,
+                coin_ids: Optional[List[str]] = None, start=None, end=None, currency: str = BASE_CURRENCY,
+                directory: Optional[str] = None):
+    """Stream an export into a new temporary file; returns (path, rows).
+
+    "view" writes `market_data` (already in `currency`), "market" every coin
+    a `/coins/markets` page at a time, and "history" the stored price points
+    of `coin_ids` (default: all) between `start` and `end`.
+    """
+    currency = quote_currency(currency)
+    if dataset == "history":
+        chunks = history_chunks(coin_ids, start, end, currency=currency)
+    elif dataset == "market":
+        chunks = market_chunks(currency=currency)
+    else:
+        chunks = snapshot_chunks(market_data)
+    columns = columns_for("history" if dataset == "history" else "market", columns)
+    fd, path = tempfile.mkstemp(prefix=f"cryptobuddy-{dataset}-", suffix=f".{fmt}", dir=directory)
+    os.close(fd)
+    try:
+        return path, export(chunks, path, fmt, columns)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def portfolio_value(market_data, holdings: Dict[str, float]) -> float:
+    """Value of `{coin_id: amount}` holdings at the snapshot's current prices."""
+    book = PortfolioBook()
+    book.set("holdings", holdings)
+    return book.value("holdings", market_data)
+
+
+def portfolio_history(holdings: Dict[str, float], days: str = "7", currency: str = BASE_CURRENCY):
+    """PortfolioHistory of the holdings over the chart window, from the stored price series."""
+    store = get_history_store()
+    coin_ids = tuple(cid for cid, amount in holdings.items() if amount)
+    store.update_many(coin_ids, days)
+    book = PortfolioBook()
+    book.set("holdings", holdings)
+    fx, currency = get_fx_table(), quote_currency(currency)
+    return book.history({cid: fx.convert_points(store.window(cid, days, refresh=False), currency) for cid in coin_ids})
+
+
+# Chat Logic
+def generate_response(query, mode_type, portfolio_value=0.0, currency=BASE_CURRENCY, alerts=None):
+    query = query.lower()
+
+    # Rule-based fallback
+    if mode_type == "Rule-based":
+        if "bitcoin" in query: return "Bitcoin is rising 🚀 with a sustainability score of 3/10."
+        if "ethereum" in query: return "Ethereum is stable ⚖️ with a sustainability score of 6/10."
+        if "sustainable" in query: return "Cardano (ADA) is currently our top eco-friendly pick!"
+        return "I can tell you about Bitcoin, Ethereum, or sustainability trends. Try switching to Live mode for real data!"
+
+    # Live Logic
+    if mode_type == "Live (CoinGecko)":
+        if is_alert_command(query):
+            if alerts is None:
+                return "Alerts are only available in a dashboard session."
+            return answer_alert(query, alerts, currency)
+        if "price" in query:
+            return "Check the dashboard above for the latest live prices! 👆"
+        if "portfolio" in query:
+            if portfolio_value > 0:
+                return f"Your current portfolio value is estimated at {format_money(portfolio_value, currency)} based on the holdings in the sidebar."
+            else:
+                return "You haven't entered any holdings yet. Use the sidebar to add your crypto holdings and track your portfolio value!"
+        if "recommend" in query:
+            return "Based on current data, Cardano scores highest on sustainability, while Bitcoin has the highest volume."
+
+    return "I'm your CryptoBuddy! Ask me about trends, prices, or your portfolio."
+
+
+def chatbot_logic(query, mode_type="Rule-based", portfolio_value=0.0, currency=BASE_CURRENCY):
+    """Headless entry point: the dashboard advisor's answer to `query`, without any UI."""
+    return generate_response(query, mode_type, portfolio_value, currency)
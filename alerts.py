@@ -0,0 +1,580 @@
+"""Price and indicator alerts, indexed so each snapshot or tick only touches the rules it fires.
+
+Every rule is a `low` and/or `high` bound on one (coin, field): "BTC below
+50k" is `low=50000`, "ETH moves 5%" is both bounds around the price when it
+was set, "BTC crosses above its SMA" is `high=0` on the price's gap to the
+SMA (accepted only while the price is below it). Per (coin, field) the bounds are kept in two sorted lists, so a new
+value fires exactly the lows above it (a suffix) and the highs below it (a
+prefix), found by bisection; rules that do not fire are never visited.
+For a whole snapshot, each coin's band (highest low, lowest high) is kept
+as an array aligned with the snapshot's columns, so one vectorized
+comparison finds the few coins that left their band.
+
+Rules and undelivered notifications live in `alerts.sqlite3` next to the
+disk cache. A fired rule is one-shot: it is removed and handed to its
+owner's listener (the CLI prints it, the chat server pushes it to the
+session) or queued until the owner asks with `take`, for up to a week
+(CRYPTOBUDDY_ALERT_PENDING_TTL seconds).
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+import numpy as np
+
+from disk_cache import default_cache_path
+from fx import BASE_CURRENCY, format_money, get_fx_table
+from market_model import MarketSnapshot
+from metrics import get_metrics, inc, span
+
+# Alertable fields: the price, and the latest indicator values over stored history
+FIELDS = ("price", "rsi", "momentum", "volatility", "sma_gap", "ema_gap")
+INDICATOR_FIELDS = FIELDS[1:]
+FIELD_LABELS = {"rsi": "RSI", "momentum": "momentum", "volatility": "volatility"}
+# Seconds a fired alert waits for an owner that never comes back before it is dropped
+PENDING_TTL = float(os.getenv("CRYPTOBUDDY_ALERT_PENDING_TTL", str(7 * 24 * 3600)))
+
+Alert = namedtuple("Alert", ["id", "owner", "coin_id", "field", "low", "high", "label", "created_at"])
+Notification = namedtuple("Notification", ["alert", "value", "fired_at"])
+
+
+def default_alerts_path():
+    return os.path.join(os.path.dirname(default_cache_path()), "alerts.sqlite3")
+
+
+class AlertStore:
+    """SQLite table of active alerts and fired-but-undelivered notifications.
+
+    Pass ":memory:" as `path` for a throwaway store.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_alerts_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS alerts ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, owner TEXT NOT NULL, coin_id TEXT NOT NULL, field TEXT NOT NULL,"
+            " low REAL, high REAL, label TEXT, created_at REAL NOT NULL, fired_at REAL, fired_value REAL)"
+        )
+        self._lock = threading.Lock()
+
+    def _many(self, sql, rows):
+        # One transaction, not one commit per row
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(sql, rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def insert(self, alerts):
+        self._many("INSERT INTO alerts (id, owner, coin_id, field, low, high, label, created_at)"
+                   " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", alerts)
+
+    def delete(self, ids):
+        self._many("DELETE FROM alerts WHERE id = ?", [(i,) for i in ids])
+
+    def reassign(self, owner, new_owner):
+        self._many("UPDATE alerts SET owner = ? WHERE owner = ?", [(new_owner, owner)])
+
+    def fire(self, notifications):
+        self._many("UPDATE alerts SET fired_at = ?, fired_value = ? WHERE id = ?",
+                   [(n.fired_at, n.value, n.alert.id) for n in notifications])
+
+    def max_id(self):
+        """Highest ID ever stored, including delivered (deleted) alerts, so IDs are never reused."""
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'alerts'").fetchone()
+        return row[0] if row else 0
+
+    def active(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id, owner, coin_id, field, low, high, label, created_at FROM alerts"
+                                      " WHERE fired_at IS NULL ORDER BY id").fetchall()
+        return [Alert(*row) for row in rows]
+
+    def undelivered(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id, owner, coin_id, field, low, high, label, created_at, fired_value,"
+                                      " fired_at FROM alerts WHERE fired_at IS NOT NULL ORDER BY fired_at").fetchall()
+        return [Notification(Alert(*row[:8]), row[8], row[9]) for row in rows]
+
+
+class _Bounds:
+    """Sorted low and high bounds (with their alert IDs) for one (coin, field).
+
+    Values in [floor, ceiling] fire nothing.
+    """
+
+    __slots__ = ("lows", "low_ids", "highs", "high_ids", "floor", "ceiling")
+
+    def __init__(self):
+        self.lows, self.low_ids, self.highs, self.high_ids = [], [], [], []
+        self.floor, self.ceiling = -np.inf, np.inf
+
+    def _edges(self):
+        self.floor = self.lows[-1] if self.lows else -np.inf
+        self.ceiling = self.highs[0] if self.highs else np.inf
+
+    def __len__(self):
+        return len(self.lows) + len(self.highs)
+
+    def add(self, alert):
+        if alert.low is not None:
+            i = bisect_right(self.lows, alert.low)
+            self.lows.insert(i, alert.low)
+            self.low_ids.insert(i, alert.id)
+        if alert.high is not None:
+            i = bisect_right(self.highs, alert.high)
+            self.highs.insert(i, alert.high)
+            self.high_ids.insert(i, alert.id)
+        self._edges()
+
+    def discard(self, alert):
+        for bound, values, ids in ((alert.low, self.lows, self.low_ids), (alert.high, self.highs, self.high_ids)):
+            if bound is None:
+                continue
+            i = bisect_left(values, bound)
+            while i < len(values) and values[i] == bound:
+                if ids[i] == alert.id:
+                    del values[i], ids[i]
+                    break
+                i += 1
+        self._edges()
+
+    def fire(self, value):
+        """Remove and return the IDs of the rules `value` triggers: lows above it, highs below it."""
+        fired = []
+        i = bisect_right(self.lows, value)
+        if i < len(self.lows):
+            fired += self.low_ids[i:]
+            del self.lows[i:], self.low_ids[i:]
+        j = bisect_left(self.highs, value)
+        if j:
+            fired += self.high_ids[:j]
+            del self.highs[:j], self.high_ids[:j]
+        if fired:
+            self._edges()
+        return fired
+
+
+class AlertEngine:
+    """Active alerts indexed by field and coin, with per-owner delivery.
+
+    Notifications queued for an owner with no listener are dropped once
+    they are older than `pending_ttl`.
+    """
+
+    def __init__(self, store=None, clock=time.time, pending_ttl=PENDING_TTL):
+        self.store = store
+        self._clock = clock
+        self.pending_ttl = pending_ttl
+        self._alerts = {}
+        self._index = {field: {} for field in FIELDS}
+        self._listeners = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._next_id = 1
+        # Bumped on every change to the index; invalidates the aligned price bands
+        self._version = 0
+        self._aligned = None
+        self.evaluations = 0
+        self.fired = 0
+        if store is not None:
+            for alert in store.active():
+                self._insert(alert)
+            for note in store.undelivered():
+                self._pending.setdefault(note.alert.owner, []).append(note)
+            self._next_id = store.max_id() + 1
+            self.expire()
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def _insert(self, alert):
+        self._version += 1
+        self._alerts[alert.id] = alert
+        index = self._index[alert.field]
+        bounds = index.get(alert.coin_id)
+        if bounds is None:
+            bounds = index[alert.coin_id] = _Bounds()
+        bounds.add(alert)
+
+    def _remove(self, alert_id):
+        self._version += 1
+        alert = self._alerts.pop(alert_id)
+        index = self._index[alert.field]
+        # A firing removes its bounds before its alerts, so the coin may already be gone
+        bounds = index.get(alert.coin_id)
+        if bounds is not None:
+            bounds.discard(alert)
+            if not len(bounds):
+                del index[alert.coin_id]
+        return alert
+
+    # -------------------- Rules --------------------
+    def add(self, owner, coin_id, field="price", low=None, high=None, label=None):
+        return self.add_many([(owner, coin_id, field, low, high, label)])[0]
+
+    def add_many(self, specs):
+        """Add `(owner, coin_id, field, low, high, label)` rules in one go; returns the Alerts."""
+        now = self._clock()
+        alerts = []
+        with self._lock:
+            for owner, coin_id, field, low, high, label in specs:
+                if field not in FIELDS:
+                    raise ValueError(f"unknown alert field {field!r}")
+                if low is None and high is None:
+                    raise ValueError("an alert needs a low or a high bound")
+                alerts.append(Alert(self._next_id, owner, coin_id, field, low, high, label, now))
+                self._next_id += 1
+            if self.store is not None:
+                self.store.insert(alerts)
+            for alert in alerts:
+                self._insert(alert)
+        return alerts
+
+    def alerts(self, owner=None):
+        with self._lock:
+            return [a for a in self._alerts.values() if owner is None or a.owner == owner]
+
+    def cancel(self, owner, alert_id=None):
+        """Cancel one of `owner`'s alerts, or all of them; returns how many were removed."""
+        with self._lock:
+            ids = [a.id for a in self._alerts.values()
+                   if a.owner == owner and (alert_id is None or a.id == alert_id)]
+            for i in ids:
+                self._remove(i)
+        if ids and self.store is not None:
+            self.store.delete(ids)
+        return len(ids)
+
+    def reassign(self, owner, new_owner):
+        """Hand `owner`'s alerts and queued notifications to `new_owner`; returns how many alerts moved."""
+        with self._lock:
+            moved = [a for a in self._alerts.values() if a.owner == owner]
+            for alert in moved:
+                self._alerts[alert.id] = alert._replace(owner=new_owner)
+            notes = [n._replace(alert=n.alert._replace(owner=new_owner)) for n in self._pending.pop(owner, [])]
+            if notes:
+                self._pending.setdefault(new_owner, []).extend(notes)
+            if (moved or notes) and self.store is not None:
+                self.store.reassign(owner, new_owner)
+        return len(moved)
+
+    def check(self, alert, value):
+        """Fire `alert` alone if `value` already triggers it (a new rule that holds at once); returns its
+        Notification or None. Other rules on the coin are left for the next evaluation."""
+        if value is None or value != value:
+            return None
+        with self._lock:
+            if alert.id not in self._alerts:
+                return None
+            if not ((alert.low is not None and value < alert.low) or (alert.high is not None and value > alert.high)):
+                return None
+            note = Notification(self._remove(alert.id), float(value), self._clock())
+        self._deliver([note])
+        return note
+
+    def watched(self, field="price"):
+        """Coins with at least one rule on `field`."""
+        return list(self._index[field])
+
+    # -------------------- Evaluation --------------------
+    def evaluate(self, values, field="price"):
+        """Fire the rules on `field` that `(coin_id, value)` pairs trigger; returns their Notifications."""
+        fired = []
+        with self._lock:
+            index = self._index[field]
+            self.evaluations += 1
+            if index:
+                now = self._clock()
+                for coin_id, value in values:
+                    bounds = index.get(coin_id)
+                    if bounds is None or value is None or bounds.floor <= value <= bounds.ceiling or value != value:
+                        continue
+                    for alert_id in bounds.fire(value):
+                        fired.append(Notification(self._remove(alert_id), float(value), now))
+        if fired:
+            self._deliver(fired)
+        return fired
+
+    def _evaluate_columns(self, ids, prices):
+        """Price rules against a snapshot's id list and price array, visiting only coins out of band."""
+        fired = []
+        with self._lock:
+            index = self._index["price"]
+            self.evaluations += 1
+            aligned = self._aligned
+            if aligned is None or aligned[1] != self._version or (aligned[0] is not ids and aligned[0] != ids):
+                floors = np.fromiter((index[c].floor if c in index else -np.inf for c in ids), np.float64, len(ids))
+                ceilings = np.fromiter((index[c].ceiling if c in index else np.inf for c in ids), np.float64,
+                                       len(ids))
+            else:
+                floors, ceilings = aligned[2], aligned[3]
+            now = self._clock()
+            for i in np.flatnonzero((prices < floors) | (prices > ceilings)).tolist():
+                coin_id, value = ids[i], float(prices[i])
+                bounds = index[coin_id]
+                for alert_id in bounds.fire(value):
+                    fired.append(Notification(self._remove(alert_id), value, now))
+                floors[i], ceilings[i] = bounds.floor, bounds.ceiling
+            self._aligned = (ids, self._version, floors, ceilings)
+        if fired:
+            self._deliver(fired)
+        return fired
+
+    def evaluate_tick(self, tick):
+        """A streamed price: one bisection per side for that coin."""
+        return self.evaluate(((tick.coin_id, tick.price),))
+
+    def evaluate_snapshot(self, snapshot, indicators=None):
+        """Check a markets snapshot (USD) against every price rule, and indicator rules when
+        `indicators(coin_ids)` gives `{id: latest indicator values}` for the coins that need them."""
+        with span("alerts"):
+            if not isinstance(snapshot, MarketSnapshot):
+                snapshot = MarketSnapshot(snapshot or ())
+            fired = []
+            if self._index["price"]:
+                fired += self._evaluate_columns(snapshot.column("id"), snapshot.column("current_price"))
+            fields = [f for f in INDICATOR_FIELDS if self._index[f]]
+            if fields and indicators is not None:
+                latest = indicators(sorted({cid for f in fields for cid in self._index[f]}))
+                prices = {r.id: r.current_price for r in snapshot.select(latest)}
+                for f in fields:
+                    fired += self.evaluate((cid, indicator_value(f, latest[cid], prices.get(cid)))
+                                           for cid in self.watched(f) if cid in latest)
+        return fired
+
+    # -------------------- Delivery --------------------
+    def subscribe(self, owner, callback):
+        """Deliver `owner`'s notifications to `callback(notification)` as they fire, starting with any queued.
+
+        An owner can have several callbacks (e.g. one per open connection); each gets every notification.
+        """
+        with self._lock:
+            self._listeners.setdefault(owner, []).append(callback)
+        for note in self.take(owner):
+            callback(note)
+
+    def unsubscribe(self, owner, callback=None):
+        """Stop delivering to `callback`, or to all of `owner`'s callbacks."""
+        with self._lock:
+            callbacks = self._listeners.get(owner, [])
+            if callback is None:
+                callbacks.clear()
+            elif callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                self._listeners.pop(owner, None)
+
+    def take(self, owner):
+        """Queued notifications for `owner`, oldest first; they count as delivered."""
+        with self._lock:
+            notes = self._pending.pop(owner, [])
+        if notes and self.store is not None:
+            self.store.delete([n.alert.id for n in notes])
+        return notes
+
+    def expire(self):
+        """Drop queued notifications older than `pending_ttl` whose owner has no listener; returns how many."""
+        cutoff = self._clock() - self.pending_ttl
+        dropped = []
+        with self._lock:
+            for owner in [o for o in self._pending if o not in self._listeners]:
+                notes = self._pending[owner]
+                dropped += [n.alert.id for n in notes if n.fired_at < cutoff]
+                notes[:] = [n for n in notes if n.fired_at >= cutoff]
+                if not notes:
+                    del self._pending[owner]
+        if dropped and self.store is not None:
+            self.store.delete(dropped)
+        return len(dropped)
+
+    def _deliver(self, fired):
+        self.fired += len(fired)
+        inc("cryptobuddy_alerts_fired_total", len(fired))
+        if self.store is not None:
+            self.store.fire(fired)
+        delivered = []
+        for note in fired:
+            reached = False
+            for callback in list(self._listeners.get(note.alert.owner, ())):
+                try:
+                    callback(note)
+                    reached = True
+                except Exception:
+                    inc("cryptobuddy_errors_total", where="alert_delivery")
+            if reached:
+                delivered.append(note.alert.id)
+                continue
+            with self._lock:
+                self._pending.setdefault(note.alert.owner, []).append(note)
+        if delivered and self.store is not None:
+            self.store.delete(delivered)
+        if len(delivered) < len(fired):
+            self.expire()
+
+    def metric_samples(self):
+        return [("cryptobuddy_alerts_active", "gauge", {}, len(self._alerts)),
+                ("cryptobuddy_alert_evaluations_total", "counter", {}, self.evaluations)]
+
+
+def indicator_value(field, latest, price=None):
+    """`field` from a coin's latest indicator values; the *_gap fields are the price's % distance from the average."""
+    if field in ("sma_gap", "ema_gap"):
+        average = latest.get(field[:3])
+        if not price or not average or average != average:
+            return None
+        return (price / average - 1) * 100
+    return latest.get(field)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine():
+    """Process-wide engine over `default_alerts_path()`."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AlertEngine(AlertStore())
+                get_metrics().register("alerts", _engine.metric_samples)
+    return _engine
+
+
+# -------------------- Chat commands --------------------
+_ASK = (r"^\s*(?:please\s+)?(?:(?:tell|notify|alert|ping|warn)\s+me|(?:set\s+(?:an?\s+)?)?alert)"
+        r"\s+(?:when|if|once|for)\s+(?:the\s+)?(?:price\s+of\s+)?")
+_END = r"\s*[?.!]*\s*$"
+CROSS_RE = re.compile(_ASK + r"(?P<coin>.+?)(?:'s)?\s+(?:price\s+)?(?:crosses|breaks|goes|moves)\s+"
+                      r"(?P<op>above|over|below|under)\s+(?:its\s+|the\s+)?(?P<average>sma|ema)(?:\s*\(?\d+\)?)?"
+                      + _END, re.IGNORECASE)
+MOVE_RE = re.compile(_ASK + r"(?P<coin>.+?)\s+(?P<verb>moves?|changes?|swings?|rises?|climbs?|jumps?|gains?|drops?"
+                     r"|falls?|loses?)\s+(?:by\s+)?(?P<pct>\d+(?:\.\d+)?)\s*(?:%|percent)" + _END, re.IGNORECASE)
+THRESHOLD_RE = re.compile(_ASK + r"(?P<coin>.+?)(?:'s)?\s+(?:(?P<field>price|rsi|momentum|volatility)\s+)?"
+                          r"(?:(?:drops?|falls?|goes|gets|is|trades|moves|rises?|climbs?|jumps?)\s+)?"
+                          r"(?P<op>below|under|above|over)\s+(?P<value>[$€£¥]?\s*\d[\d,]*(?:\.\d+)?\s*[km]?)" + _END,
+                          re.IGNORECASE)
+LIST_RE = re.compile(r"^\s*(?:show|list)?\s*(?:me\s+)?(?:my\s+)?alerts" + _END, re.IGNORECASE)
+CANCEL_RE = re.compile(r"^\s*(?:cancel|delete|remove|clear)\s+(?:(?:all\s+)?(?:my\s+)?alerts|alert\s+#?(?P<id>\d+))"
+                       + _END, re.IGNORECASE)
+_UP, _DOWN = ("rise", "climb", "jump", "gain"), ("drop", "fall", "lose")
+
+
+def _amount(text):
+    text = text.strip().lstrip("$€£¥").strip().replace(",", "").lower()
+    scale = {"k": 1e3, "m": 1e6}.get(text[-1:], 1)
+    return float(text.rstrip("km").strip()) * scale
+
+
+def is_alert_command(text):
+    return any(r.match(text) for r in (LIST_RE, CANCEL_RE, CROSS_RE, MOVE_RE, THRESHOLD_RE))
+
+
+def answer_alert_command(text, engine, owner, resolve, price_of, display_name=str, currency=BASE_CURRENCY, fx=None,
+                         indicators=None):
+    """Reply to an alert command, or None if `text` is not one.
+
+    Handles "tell me when BTC drops below 50k", "alert me if ETH moves 5%",
+    "notify me when bitcoin RSI goes above 70", "tell me when SOL crosses
+    above its SMA", "my alerts" and "cancel alert 3" / "cancel all alerts".
+    `resolve(name)` gives a coin ID, `price_of(coin_id)` its USD price and
+    `indicators(coin_ids)` the latest indicator values (as for
+    `evaluate_snapshot`); amounts are read in `currency` and stored in USD.
+    A crossing is only accepted while the price is on the other side of the
+    average, since the rule itself is a bound on the gap.
+    """
+    if LIST_RE.match(text):
+        alerts = sorted(engine.alerts(owner), key=lambda a: a.id)
+        if not alerts:
+            return "\nYou have no active alerts. Try: tell me when BTC drops below 50000\n"
+        return "\n🔔 Your alerts:\n" + "".join(f"   #{a.id} {a.label}\n" for a in alerts)
+    match = CANCEL_RE.match(text)
+    if match:
+        alert_id = int(match.group("id")) if match.group("id") else None
+        removed = engine.cancel(owner, alert_id)
+        if alert_id is not None:
+            return f"\nCancelled alert #{alert_id}.\n" if removed else f"\nYou have no alert #{alert_id}.\n"
+        return f"\nCancelled {removed} alert{'s' if removed != 1 else ''}.\n"
+
+    match = CROSS_RE.match(text) or MOVE_RE.match(text) or THRESHOLD_RE.match(text)
+    if not match:
+        return None
+    coin_id = resolve(match.group("coin").strip())
+    if not coin_id:
+        return f"\nSorry, I don't know the coin '{match.group('coin').strip()}'.\n"
+    name = display_name(coin_id)
+    groups = match.groupdict()
+    fx = fx or get_fx_table()
+    if currency != BASE_CURRENCY and not fx.rate(currency):
+        currency = BASE_CURRENCY
+    rate = 1.0 if currency == BASE_CURRENCY else fx.rate(currency)
+    below = (groups.get("op") or "").lower() in ("below", "under")
+    # The value the new rule is checked against right away (a crossing or a move cannot hold yet)
+    current = None
+
+    if groups.get("average"):
+        average = groups["average"].upper()
+        field, low, high = groups["average"].lower() + "_gap", (0.0 if below else None), (None if below else 0.0)
+        side = "below" if below else "above"
+        latest = indicators([coin_id]).get(coin_id) if indicators is not None else None
+        gap = indicator_value(field, latest, price_of(coin_id)) if latest else None
+        if gap is None:
+            return f"\nSorry, I have no price history for {name} to compare with its {average} yet.\n"
+        if (gap < 0) if below else (gap > 0):
+            return f"\n{name} is already {side} its {average} ({gap:+.1f}%), so there is no crossing to wait for.\n"
+        label = f"{name} crosses {side} its {average}"
+    elif groups.get("pct"):
+        price = price_of(coin_id)
+        if not price:
+            return f"\nSorry, I have no live price for {name} to measure a move from.\n"
+        pct = float(groups["pct"])
+        verb = groups["verb"].lower()
+        field = "price"
+        low = None if verb.startswith(_UP) else price * (1 - pct / 100)
+        high = None if verb.startswith(_DOWN) else price * (1 + pct / 100)
+        direction = "rises" if low is None else "drops" if high is None else "moves"
+        label = f"{name} {direction} {pct:g}% from {format_money(price * rate, currency)}"
+    else:
+        field = (groups.get("field") or "price").lower()
+        value = _amount(groups["value"])
+        if field == "price":
+            shown = format_money(value, currency)
+            value /= rate
+            current = price_of(coin_id)
+        else:
+            shown = f"{value:g}"
+            latest = indicators([coin_id]).get(coin_id) if indicators is not None else None
+            current = indicator_value(field, latest) if latest else None
+        low, high = (value, None) if below else (None, value)
+        label = f"{name}{' ' + FIELD_LABELS[field] if field != 'price' else ''} {'below' if below else 'above'} {shown}"
+
+    alert = engine.add(owner, coin_id, field, low, high, label)
+    # Only this rule is checked now; everyone's rules are checked on the next snapshot or tick
+    engine.check(alert, current)
+    return f"\n🔔 Alert #{alert.id} set: {label}. I'll let you know when it happens.\n"
+
+
+def alert_message(note, currency=BASE_CURRENCY, fx=None):
+    """A fired alert as a chat line; prices in `currency`."""
+    alert, value = note.alert, note.value
+    if alert.field == "price":
+        rate = 1.0 if currency == BASE_CURRENCY else (fx or get_fx_table()).rate(currency)
+        now = format_money(value * rate, currency) if rate else format_money(value)
+    elif alert.field.endswith("_gap"):
+        now = f"{value:+.2f}% from its {alert.field[:3].upper()}"
+    else:
+        now = f"{value:.1f}"
+    return f"🔔 Alert #{alert.id}: {alert.label} (now {now})"
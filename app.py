@@ -1,223 +1,357 @@
 import os
-import time
-import requests
-import pandas as pd
-import plotly.graph_objects as go
+from datetime import timedelta
+
 import streamlit as st
-from typing import List, Optional
 
-# Config 
-st.set_page_config(page_title="CryptoBuddy Pro 🚀", page_icon="💰", layout="wide")
+import advisor
+from downsample import CHART_POINTS, downsample_indices
+from export import DATASETS, FORMATS, MIME_TYPES, to_ms
+from metrics import get_metrics, profiled, start_metrics_server, timed
+from advisor import CHART_WINDOWS, METRICS_INTERVAL, MODES, chatbot_logic, crypto_db, generate_response  # noqa: F401
+from fx import CURRENCIES, currency_symbol, format_money
+
+# Helper Functions
+# The logic lives in advisor.py (importable, no side effects); here it only gets Streamlit caching
+fetch_chart_data = st.cache_data(ttl=300)(advisor.fetch_chart_data)  # Cache charts longer (5 mins)
+fetch_chart_data_many = st.cache_data(ttl=300)(advisor.fetch_chart_data_many)
+market_table = st.cache_data(ttl=60)(advisor.market_table)
+portfolio_history = st.cache_data(ttl=300)(advisor.portfolio_history)
+# One /metrics endpoint per server process (only if CRYPTOBUDDY_METRICS_PORT is set)
+metrics_server = st.cache_resource(start_metrics_server)
+
+
+def session_alerts():
+    """This browser session's alerts, kept in memory and dropped with the session."""
+    if "alerts" not in st.session_state:
+        st.session_state.alerts = advisor.session_alerts()
+    return st.session_state.alerts
 
-COINGECKO_API_KEY = os.getenv("COINGECKO_API_KEY", "")
-COINGECKO_BASE = "https://api.coingecko.com/api/v3"
 
-#Offline Dataset 
-crypto_db = {
-    "bitcoin": {"name": "Bitcoin", "symbol": "BTC", "trend": "rising 🚀", "sustainability": 3},
-    "ethereum": {"name": "Ethereum", "symbol": "ETH", "trend": "stable ⚖️", "sustainability": 6},
-    "cardano": {"name": "Cardano", "symbol": "ADA", "trend": "rising 📈", "sustainability": 8},
-    "solana": {"name": "Solana", "symbol": "SOL", "trend": "volatile ⚡", "sustainability": 7},
-    "ripple": {"name": "XRP", "symbol": "XRP", "trend": "stable ⚖️", "sustainability": 8},
+# Indicator overlays for the price chart: label -> [(column, line style)]
+CHART_OVERLAYS = {
+    "SMA (20)": [("sma", dict(color='#636EFA', width=1))],
+    "EMA (20)": [("ema", dict(color='#FFA15A', width=1))],
+    "Bollinger Bands": [("bb_upper", dict(color='#AB63FA', width=1, dash='dot')),
+                        ("bb_lower", dict(color='#AB63FA', width=1, dash='dot'))],
 }
 
-# Helper Functions 
-def _headers():
-    headers = {"accept": "application/json"}
-    if COINGECKO_API_KEY:
-        headers["x-cg-demo-api-key"] = COINGECKO_API_KEY
-    return headers
-
-@st.cache_data(ttl=60)
-def fetch_market(ids: Optional[List[str]] = None):
-    """Fetches current market data for a list of coin IDs."""
-    params = {
-        "vs_currency": "usd",
-        "order": "market_cap_desc",
-        "sparkline": "false",
-        "price_change_percentage": "24h,7d",
-    }
-    if ids:
-        params["ids"] = ",".join(ids)
-    try:
-        r = requests.get(f"{COINGECKO_BASE}/coins/markets", headers=_headers(), params=params, timeout=10)
-        if r.status_code == 200:
-            return r.json()
-        return None
-    except Exception:
-        return None
-
-@st.cache_data(ttl=300) # Cache charts longer (5 mins)
-def fetch_chart_data(coin_id: str, days: str = "7"):
-    """Fetches historical price data for charting."""
-    try:
-        url = f"{COINGECKO_BASE}/coins/{coin_id}/market_chart"
-        params = {"vs_currency": "usd", "days": days}
-        r = requests.get(url, headers=_headers(), params=params, timeout=10)
-        if r.status_code == 200:
-            data = r.json()
-            prices = data.get("prices", [])
-            df = pd.DataFrame(prices, columns=["timestamp", "price"])
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-            return df
-        return None
-    except Exception:
-        return None
+
+# Windows this long (days) draw with WebGL; multi-coin overlays always do
+WEBGL_MIN_DAYS = 30
+
+
+def _scatter(go, webgl):
+    return go.Scattergl if webgl else go.Scatter
+
 
 # UI & Logic
+def sidebar():
+    with st.sidebar:
+        st.header("⚙️ Dashboard Settings")
+        mode = st.radio("Data Source", MODES, index=1)
+        currency = st.selectbox("Currency", list(CURRENCIES), format_func=str.upper, key="currency")
+        track_query = st.text_input("🔎 Track any coin", placeholder="Name or symbol, e.g. 'pepe' or 'Chainlink'")
+
+        st.divider()
+        st.subheader("💼 Mini Portfolio")
+        st.caption("Enter amount owned to track value:")
+
+        portfolio_holdings = {}
+        # Portfolio Inputs
+        for coin_id, meta in crypto_db.items():
+            amount = st.number_input(f"{meta['symbol']} Holdings", min_value=0.0, step=0.1, key=f"hold_{coin_id}")
+            if amount > 0:
+                portfolio_holdings[coin_id] = amount
+
+        if st.button("🧹 Clear Chat History", use_container_width=True):
+            st.session_state.history = []
+            st.rerun()
+        st.checkbox("🐞 Show debug metrics", key="debug_metrics")
+    return mode, currency, track_query, portfolio_holdings
+
+
+@st.fragment
+@timed("render", section="chart")
+def chart_section(market_data, currency):
+    """Only this block reruns when the coin, window or overlay selection changes."""
+    import plotly.graph_objects as go
+
+    st.subheader("📈 Market Trends Analysis")
+    selected_coin = st.selectbox("Select coin to view history:", [c['name'] for c in market_data])
+    window_label = st.radio("Window", list(CHART_WINDOWS), index=1, horizontal=True)
+    days = CHART_WINDOWS[window_label]
+
+    # Find ID for selected coin
+    selected_id = next(c['id'] for c in market_data if c['name'] == selected_coin)
+
+    overlays = st.multiselect("Indicators", list(CHART_OVERLAYS), key="chart_indicators")
+    # Downsampled server-side, so the payload stays the same size however long the window
+    chart_df = fetch_chart_data(selected_id, days, CHART_POINTS, currency)
+    Scatter = _scatter(go, float(days) >= WEBGL_MIN_DAYS)
+    if chart_df is not None:
+        fig = go.Figure()
+        fig.add_trace(Scatter(x=chart_df['timestamp'], y=chart_df['price'], mode='lines', name='Price', line=dict(color='#00CC96')))
+        # History was just refreshed above; the cache only appends the new points
+        ind_df = advisor.indicator_frame(selected_id, days, CHART_POINTS, currency)
+        if ind_df is not None:
+            for label in overlays:
+                for column, style in CHART_OVERLAYS[label]:
+                    fig.add_trace(Scatter(x=ind_df['timestamp'], y=ind_df[column], mode='lines', name=column.upper(), line=style))
+        fig.update_layout(
+            title=f"{selected_coin} Price History ({window_label})",
+            xaxis_title="Date",
+            yaxis_title=f"Price ({currency.upper()})",
+            margin=dict(l=20, r=20, t=40, b=20),
+            height=350
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        if ind_df is not None:
+            latest = ind_df.iloc[-1]
+            st.caption(f"RSI(14): {latest['rsi']:.0f} · Momentum (24 pts): {latest['momentum']:+.2f}% · "
+                       f"Volatility (24 pts): {latest['volatility'] * 100:.2f}%")
+    else:
+        st.warning("Chart data unavailable (API rate limit or network error).")
+
+    overlay = st.multiselect(f"Compare {window_label} performance with:", [c['name'] for c in market_data if c['name'] != selected_coin])
+    if overlay:
+        names = {c['id']: c['name'] for c in market_data if c['name'] in overlay or c['id'] == selected_id}
+        charts = fetch_chart_data_many(tuple(names), days, CHART_POINTS, currency)
+        fig = go.Figure()
+        for cid, series in charts.items():
+            if series is None or series.empty:
+                continue
+            pct = (series['price'] / series['price'].iloc[0] - 1) * 100
+            fig.add_trace(go.Scattergl(x=series['timestamp'], y=pct, mode='lines', name=names[cid]))
+        fig.update_layout(
+            title=f"{window_label} Performance (%)",
+            xaxis_title="Date",
+            yaxis_title="Change (%)",
+            margin=dict(l=20, r=20, t=40, b=20),
+            height=350
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment
+@timed("render", section="export")
+def export_section(market_data, currency):
+    st.subheader("📊 Raw Data Explorer")
+    df_display = market_table(market_data, currency)
+    st.dataframe(df_display, use_container_width=True)
+
+    csv = df_display.to_csv(index=False).encode('utf-8')
+    st.download_button(
+        "📥 Download Market Data (CSV)",
+        csv,
+        "crypto_market_data.csv",
+        "text/csv",
+        key='download-csv'
+    )
+
+    with st.expander("📦 Export more data (CSV, JSONL or Parquet)"):
+        export_panel(market_data, currency)
+
+
+def export_panel(market_data, currency):
+    """Full-market and stored-history exports, streamed to a file in chunks before download."""
+    dataset = st.radio("Data", list(advisor.EXPORT_DATASETS), format_func=advisor.EXPORT_DATASETS.get,
+                       horizontal=True, key="export_dataset")
+    fmt = st.selectbox("Format", FORMATS, key="export_format")
+    kind = "history" if dataset == "history" else "market"
+    columns = st.multiselect("Columns", DATASETS[kind], default=list(DATASETS[kind]), key=f"export_columns_{kind}")
+    coin_ids = start = end = None
+    if dataset == "history":
+        coin_ids = st.multiselect("Coins (none selected: every stored coin)", advisor.stored_history_coins(),
+                                  key="export_coins")
+        dates = st.date_input("Date range (optional)", value=(), key="export_dates")
+        if dates:
+            start, end = to_ms(dates[0]), to_ms(dates[-1] + timedelta(days=1)) - 1
+
+    if st.button("Prepare export", key="export_prepare"):
+        previous = st.session_state.pop("export_file", None)
+        if previous and os.path.exists(previous[0]):
+            os.remove(previous[0])
+        try:
+            with st.spinner("Exporting..."):
+                path, rows = advisor.export_file(dataset, fmt, columns, market_data, coin_ids, start, end, currency)
+            st.session_state["export_file"] = (path, fmt, rows)
+        except (ValueError, RuntimeError) as e:
+            st.error(f"Export failed: {e}")
+
+    prepared = st.session_state.get("export_file")
+    if prepared and os.path.exists(prepared[0]):
+        path, fmt, rows = prepared
+        with open(path, "rb") as fh:
+            st.download_button(f"📥 Download {rows:,} rows ({fmt.upper()})", fh, os.path.basename(path),
+                               MIME_TYPES[fmt], key="download-export")
+
+
+@st.fragment(run_every=METRICS_INTERVAL)
+@timed("render", section="metrics")
+def live_metrics(ids, portfolio_holdings, currency):
+    """Portfolio value and metric cards, re-rendered on a timer from the shared snapshot."""
+    market_data = advisor.market_snapshot(ids, currency)
+    # Alerts set in the chat ("tell me when BTC drops below 50000") pop up as they fire
+    for message in advisor.take_alerts(session_alerts(), currency):
+        st.toast(message)
+    if not market_data:
+        return
+
+    # 1. Calculate Portfolio Value if holdings exist
+    st.session_state.portfolio_value = advisor.portfolio_value(market_data, portfolio_holdings)
+    if portfolio_holdings:
+        st.info(f"💼 **Total Portfolio Value:** {format_money(st.session_state.portfolio_value, currency)}")
+
+    # 2. Quick Metric Cards
+    cols = st.columns(len(market_data))
+    for i, coin in enumerate(market_data):
+        with cols[i]:
+            change = coin.get('price_change_percentage_24h') or 0
+            st.metric(
+                label=coin['symbol'].upper(),
+                value=format_money(coin['current_price'], currency),
+                delta=f"{change:.2f}%"
+            )
+
+
+@st.fragment
+@timed("render", section="portfolio")
+def portfolio_section(portfolio_holdings, currency):
+    """Value over time, drawdown, volatility and per-coin contribution of the sidebar holdings."""
+    import plotly.graph_objects as go
+
+    st.subheader("💼 Portfolio Performance")
+    window_label = st.radio("Period", list(CHART_WINDOWS), index=2, horizontal=True, key="portfolio_window")
+    history = portfolio_history(portfolio_holdings, CHART_WINDOWS[window_label], currency)
+    if not len(history):
+        st.warning("Portfolio history unavailable (API rate limit or network error).")
+        return
+
+    values = history.values[:, 0]
+    change = values[-1] - values[0]
+    cols = st.columns(3)
+    cols[0].metric("Change", format_money(change, currency), f"{change / values[0] * 100:.2f}%" if values[0] else None)
+    cols[1].metric("Max Drawdown", f"{history.max_drawdown()[0] * 100:.2f}%")
+    cols[2].metric("Volatility (ann.)", f"{history.volatility()[0] * 100:.1f}%")
+
+    idx = downsample_indices(history.ts, values, CHART_POINTS)
+    timestamps = advisor.to_datetimes(history.ts[idx])
+    Scatter = _scatter(go, float(CHART_WINDOWS[window_label]) >= WEBGL_MIN_DAYS)
+    fig = go.Figure()
+    fig.add_trace(Scatter(x=timestamps, y=values[idx], mode='lines', name='Value', line=dict(color='#00CC96')))
+    fig.add_trace(Scatter(x=timestamps, y=history.drawdown()[idx, 0] * 100, mode='lines', name='Drawdown (%)',
+                             yaxis='y2', line=dict(color='#EF553B', width=1)))
+    fig.update_layout(
+        title=f"Portfolio Value ({window_label})",
+        xaxis_title="Date",
+        yaxis=dict(title=f"Value ({currency.upper()})"),
+        yaxis2=dict(title="Drawdown (%)", overlaying='y', side='right', showgrid=False),
+        margin=dict(l=20, r=20, t=40, b=20),
+        height=350
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    contributions = history.contributions()[0]
+    held = [j for j, amount in enumerate(history.holdings[0]) if amount]
+    st.bar_chart({f"Contribution ({currency_symbol(currency)})": {history.asset_ids[j]: contributions[j] for j in held}})
+    if history.missing:
+        st.caption(f"No price history for: {', '.join(history.missing)} (valued at {format_money(0, currency)}).")
+
 
-# Sidebar
-with st.sidebar:
-    st.header("⚙️ Dashboard Settings")
-    mode = st.radio("Data Source", ["Rule-based", "Live (CoinGecko)"], index=1)
-    
+def live_dashboard(track_query, portfolio_holdings, currency):
+    if advisor.quote_currency(currency) != currency:
+        st.sidebar.warning(f"No exchange rate for {currency.upper()} right now; showing USD.")
+        currency = "usd"
+    ids = list(crypto_db.keys())
+    if track_query:
+        tracked_id = advisor.load_universe().resolve(track_query)
+        if tracked_id and tracked_id not in ids:
+            ids.append(tracked_id)
+        elif not tracked_id:
+            st.sidebar.warning(f"No listed coin matches '{track_query}'.")
+    # Served from the background refresher's latest snapshot, never from a request on this rerun
+    market_data = advisor.market_snapshot(ids, currency)
+
+    if not market_data:
+        st.error("⚠️ Live data unavailable. API limit reached or offline. Switch to Rule-based mode.")
+        return
+
+    live_metrics(ids, portfolio_holdings, currency)
+    if portfolio_holdings:
+        portfolio_section(portfolio_holdings, currency)
+
+    # 3. Interactive Charting Section
+    chart_section(market_data, currency)
+    # 4. Data Export
+    export_section(market_data, currency)
+
+
+@st.fragment
+@timed("render", section="chat")
+def chat_section(mode, currency):
     st.divider()
-    st.subheader("💼 Mini Portfolio")
-    st.caption("Enter amount owned to track value:")
-    
-    portfolio_holdings = {}
-    portfolio_value = 0.0
-    
-    # Portfolio Inputs
-    for coin_id, meta in crypto_db.items():
-        amount = st.number_input(f"{meta['symbol']} Holdings", min_value=0.0, step=0.1, key=f"hold_{coin_id}")
-        if amount > 0:
-            portfolio_holdings[coin_id] = amount
-
-    if st.button("🧹 Clear Chat History", use_container_width=True):
+    st.subheader("💬 AI Chat Advisor")
+
+    if "history" not in st.session_state:
         st.session_state.history = []
-        st.rerun()
 
-# Main Header
-st.title("💰 CryptoBuddy Pro")
-st.markdown("### Your AI-Powered Financial Sidekick & Analytics Dashboard")
+    # Chat Input
+    user_input = st.chat_input("Ask a question (e.g., 'How is my portfolio?', 'Tell me when BTC drops below 50000')")
 
-# Initialize portfolio value in session state
-if "portfolio_value" not in st.session_state:
-    st.session_state.portfolio_value = 0.0
+    if user_input:
+        st.session_state.history.append(("You", user_input))
+        response = generate_response(user_input, mode, st.session_state.get("portfolio_value", 0.0), currency,
+                                     session_alerts())
+        st.session_state.history.append(("Bot", response))
 
-#Live Dashboard (Top Section)
-if mode == "Live (CoinGecko)":
-    ids = list(crypto_db.keys())
-    market_data = fetch_market(ids)
-    
-    if market_data:
-        # 1. Calculate Portfolio Value if holdings exist
-        portfolio_value = 0.0
-        if portfolio_holdings:
-            for coin in market_data:
-                cid = coin['id']
-                if cid in portfolio_holdings:
-                    value = coin['current_price'] * portfolio_holdings[cid]
-                    portfolio_value += value
-            
-            st.session_state.portfolio_value = portfolio_value
-            st.info(f"💼 **Total Portfolio Value:** ${portfolio_value:,.2f}")
-        else:
-            st.session_state.portfolio_value = 0.0
-
-        # 2. Quick Metric Cards
-        cols = st.columns(len(market_data))
-        for i, coin in enumerate(market_data):
-            with cols[i]:
-                change = coin.get('price_change_percentage_24h', 0)
-                st.metric(
-                    label=coin['symbol'].upper(),
-                    value=f"${coin['current_price']:,.2f}",
-                    delta=f"{change:.2f}%"
-                )
-        
-        # 3. Interactive Charting Section
-        st.subheader("📈 Market Trends Analysis")
-        selected_coin = st.selectbox("Select coin to view 7-day history:", [c['name'] for c in market_data])
-        
-        # Find ID for selected coin
-        selected_id = next(c['id'] for c in market_data if c['name'] == selected_coin)
-        
-        chart_df = fetch_chart_data(selected_id)
-        if chart_df is not None:
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=chart_df['timestamp'], y=chart_df['price'], mode='lines', name='Price', line=dict(color='#00CC96')))
-            fig.update_layout(
-                title=f"{selected_coin} Price History (7 Days)",
-                xaxis_title="Date",
-                yaxis_title="Price (USD)",
-                margin=dict(l=20, r=20, t=40, b=20),
-                height=350
-            )
-            st.plotly_chart(fig, use_container_width=True)
+    # Display Chat
+    for role, text in st.session_state.history:
+        if role == "You":
+            st.chat_message("user").write(text)
         else:
-            st.warning("Chart data unavailable (API rate limit or network error).")
-            
-        # 4. Data Export
-        st.subheader("📊 Raw Data Explorer")
-        df = pd.DataFrame(market_data)
-        # Clean up dataframe for display
-        display_cols = ['name', 'symbol', 'current_price', 'market_cap', 'total_volume', 'price_change_percentage_24h']
-        df_display = df[display_cols].copy()
-        df_display.columns = ['Name', 'Symbol', 'Price ($)', 'Market Cap', 'Volume', '24h Change (%)']
-        
-        st.dataframe(df_display, use_container_width=True)
-        
-        csv = df_display.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            "📥 Download Market Data (CSV)",
-            csv,
-            "crypto_market_data.csv",
-            "text/csv",
-            key='download-csv'
-        )
+            st.chat_message("assistant").write(text)
 
+
+def debug_panel():
+    """Span timings plus cache and HTTP counters of this server process."""
+    metrics = get_metrics()
+    with st.expander("🐞 Debug metrics", expanded=True):
+        rows = [{"Span": name, "Labels": ", ".join(f"{k}={v}" for k, v in labels.items()), "Count": count,
+                 "Avg (ms)": round(avg_ms, 2), "Max (ms)": round(max_ms, 2), "Total (s)": round(total, 3)}
+                for name, labels, count, total, avg_ms, max_ms in metrics.spans()]
+        st.dataframe(rows, use_container_width=True)
+        st.code(metrics.render(), language="text")
+
+
+@profiled("dashboard")
+def main():
+    # Config
+    st.set_page_config(page_title="CryptoBuddy Pro 🚀", page_icon="💰", layout="wide")
+    mode, currency, track_query, portfolio_holdings = sidebar()
+
+    # Main Header
+    st.title("💰 CryptoBuddy Pro")
+    st.markdown("### Your AI-Powered Financial Sidekick & Analytics Dashboard")
+
+    # Initialize portfolio value in session state
+    if "portfolio_value" not in st.session_state:
+        st.session_state.portfolio_value = 0.0
+
+    #Live Dashboard (Top Section)
+    if mode == "Live (CoinGecko)":
+        live_dashboard(track_query, portfolio_holdings, currency)
     else:
-        st.error("⚠️ Live data unavailable. API limit reached or offline. Switch to Rule-based mode.")
-else:
-    # Rule-based mode: reset portfolio value
-    st.session_state.portfolio_value = 0.0
-
-#Chat Interface (Bottom Section)
-st.divider()
-st.subheader("💬 AI Chat Advisor")
-
-if "history" not in st.session_state:
-    st.session_state.history = []
-
-# Chat Logic
-def generate_response(query, mode_type):
-    query = query.lower()
-    
-    # Rule-based fallback
-    if mode_type == "Rule-based":
-        if "bitcoin" in query: return "Bitcoin is rising 🚀 with a sustainability score of 3/10."
-        if "ethereum" in query: return "Ethereum is stable ⚖️ with a sustainability score of 6/10."
-        if "sustainable" in query: return "Cardano (ADA) is currently our top pick for eco-friendliness!"
-        return "I can tell you about Bitcoin, Ethereum, or sustainability trends. Try switching to Live mode for real data!"
-    
-    # Live Logic
-    if mode_type == "Live (CoinGecko)":
-        if "price" in query:
-            return "Check the dashboard above for the latest live prices! 👆"
-        if "portfolio" in query:
-            pv = st.session_state.get("portfolio_value", 0.0)
-            if pv > 0:
-                return f"Your current portfolio value is estimated at ${pv:,.2f} based on the holdings in the sidebar."
-            else:
-                return "You haven't entered any holdings yet. Use the sidebar to add your crypto holdings and track your portfolio value!"
-        if "recommend" in query:
-            return "Based on current data, Cardano scores highest on sustainability, while Bitcoin has the highest volume."
-    
-    return "I'm your CryptoBuddy! Ask me about trends, prices, or your portfolio."
-
-# Chat Input
-user_input = st.chat_input("Ask a question (e.g., 'How is my portfolio?', 'Is Bitcoin sustainable?')")
-
-if user_input:
-    st.session_state.history.append(("You", user_input))
-    response = generate_response(user_input, mode)
-    st.session_state.history.append(("Bot", response))
-
-# Display Chat
-for role, text in st.session_state.history:
-    if role == "You":
-        st.chat_message("user").write(text)
-    else:
-        st.chat_message("assistant").write(text)
\ No newline at end of file
+        # Rule-based mode: reset portfolio value
+        st.session_state.portfolio_value = 0.0
+
+    #Chat Interface (Bottom Section)
+    chat_section(mode, currency)
+
+    metrics_server()
+    if st.session_state.get("debug_metrics"):
+        debug_panel()
+
+
+# `streamlit run app.py` executes this module as __main__; importing it stays side-effect free
+if __name__ == "__main__":
+    main()
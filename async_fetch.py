@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from coingecko import get_client
+
+# Blocking requests run here rather than in asyncio's default executor so a
+# missed deadline never makes asyncio.run() wait for stragglers on shutdown.
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="coingecko-fetch")
+
+
+async def gather_json(jobs, fetch=None, limit=8, deadline=15.0):
+    """Fetch every `{key: (url, params)}` job concurrently with `fetch(url, params)`.
+
+    `fetch` defaults to the shared client's `get`. At most `limit` requests
+    are in flight at once and the whole batch shares one `deadline` in
+    seconds. Returns `{key: payload}` for every job; jobs
+    that failed or missed the deadline map to None.
+    """
+    fetch = fetch or get_client().get
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(limit)
+
+    async def one(url, params):
+        async with semaphore:
+            return await loop.run_in_executor(_executor, fetch, url, params)
+
+    tasks = {key: asyncio.ensure_future(one(url, params)) for key, (url, params) in jobs.items()}
+    if tasks:
+        await asyncio.wait(tasks.values(), timeout=deadline)
+
+    results = {}
+    for key, task in tasks.items():
+        if task.done() and not task.cancelled() and task.exception() is None:
+            results[key] = task.result()
+        else:
+            task.cancel()
+            results[key] = None
+    return results
+
+
+def fetch_many(jobs, fetch=None, limit=8, deadline=15.0):
+    """Synchronous wrapper around `gather_json` for the CLI and Streamlit code paths."""
+    if not jobs:
+        return {}
+    coro = gather_json(jobs, fetch=fetch, limit=limit, deadline=deadline)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    # Called from inside a running loop: drive ours on a helper thread
+    box = {}
+    thread = threading.Thread(target=lambda: box.setdefault("result", asyncio.run(coro)))
+    thread.start()
+    thread.join()
+    return box["result"]
+
@@ -0,0 +1,188 @@
+"""Answer many CryptoBuddy queries non-interactively, as JSON lines.
+
+Input is one query per line, either plain text or a JSON object such as a
+line of `requests.jsonl`: the text comes from "query", "message", "text",
+"title" or "body", the ID from "id" or "request_id" (default: the line
+number), and an optional "currency" overrides `--currency` for that query.
+A plain "currency eur" line switches the currency for the lines after it.
+
+Before answering, every coin the queries mention is looked up in one
+batched `/coins/markets` request per 100 coins. The market snapshot is then
+pinned, so all queries are answered from the same data on a thread pool;
+repeated queries are answered once. Alert commands change state, so they
+run one at a time in input order on the calling thread, against an
+in-memory alert engine of the run's own. Results keep the input order:
+
+    {"id": 1, "query": "...", "intent": "price", "currency": "usd", "reply": "...", "error": null, "ms": 0.4}
+
+    python batch.py queries.txt -o results.jsonl
+    cat requests.jsonl | python batch.py - --currency eur --workers 16
+"""
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from alerts import AlertEngine, is_alert_command
+from crypto_buddy import CURRENCY_RE
+from metrics import inc, span
+
+TEXT_KEYS = ("query", "message", "text", "title", "body")
+ID_KEYS = ("id", "request_id")
+# IDs per /coins/markets lookup: CoinGecko's default page size
+LOOKUP_BATCH = 100
+
+Query = namedtuple("Query", ["id", "text", "currency", "error"])
+
+
+def read_queries(lines):
+    """Queries from text or JSONL lines; blank lines and `#` comments are skipped."""
+    for n, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if not line.startswith("{"):
+            yield Query(n, line, None, None)
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield Query(n, None, None, f"invalid JSON: {e}")
+            continue
+        query_id = next((record[k] for k in ID_KEYS if record.get(k) is not None), n)
+        text = next((record[k] for k in TEXT_KEYS if isinstance(record.get(k), str) and record[k].strip()), None)
+        currency = record.get("currency")
+        yield Query(query_id, text and text.strip(), currency and str(currency).lower(),
+                    None if text else f"no query text (expected one of: {', '.join(TEXT_KEYS)})")
+
+
+def _upstream_requests(bot):
+    return sum(s["requests"] for s in bot.client.stats().values())
+
+
+def _timed_answer(bot, text, currency):
+    start = time.perf_counter()
+    with bot.in_currency(currency):
+        intent, reply = bot.answer(text)
+    return intent, reply.strip(), round((time.perf_counter() - start) * 1000, 3)
+
+
+def _prefetch(bot, queries):
+    """A fresh snapshot plus one batched lookup of the other coins the queries mention."""
+    cache = bot.market_cache
+    age = cache.age()
+    snapshot = cache.refresh() if age is None or age >= cache.ttl else cache.get()
+    present = {coin["id"] for coin in snapshot or ()}
+    wanted = sorted({cid for q in queries if q.text and not is_alert_command(q.text)
+                     for cid in bot.mentioned_coins(q.text)} - present)
+    extra = []
+    for i in range(0, len(wanted), LOOKUP_BATCH):
+        extra += bot.lookup_coins(wanted[i:i + LOOKUP_BATCH]).values()
+    return extra
+
+
+def answer_all(bot, queries, workers=8, currency=None):
+    """Yield a result dict per query, in input order, answered concurrently from one snapshot."""
+    queries = list(queries)
+    currency = (currency or bot.default_currency).lower()
+    with span("prefetch", source="batch"):
+        extra = _prefetch(bot, queries)
+    with bot.market_cache.pinned(extra), ThreadPoolExecutor(max_workers=workers,
+                                                            thread_name_prefix="batch-worker") as pool:
+        jobs, answered = [], {}
+        for q in queries:
+            result = {"id": q.id, "query": q.text, "intent": None, "currency": q.currency or currency,
+                      "reply": None, "error": q.error, "ms": 0.0}
+            match = CURRENCY_RE.match(q.text) if q.text else None
+            if match:
+                # Applies to the lines after it, so it is settled here rather than on a worker
+                code = match.group(1).lower()
+                with bot.in_currency(code):
+                    known = bot.quote_currency() == code
+                if known:
+                    currency = code
+                result.update(intent="currency", currency=currency,
+                              reply=f"Answering in {code.upper()}." if known else None,
+                              error=None if known else f"no exchange rate for {code.upper()}")
+                jobs.append((result, None))
+                continue
+            if q.error:
+                jobs.append((result, None))
+                continue
+            if is_alert_command(q.text):
+                # Set, list and cancel act in input order, so each runs here before the next line is read
+                future = Future()
+                try:
+                    future.set_result(_timed_answer(bot, q.text, result["currency"]))
+                except Exception as e:
+                    future.set_exception(e)
+                jobs.append((result, future))
+                continue
+            # Anything else is answered once per text
+            key = (q.text.lower(), result["currency"])
+            future = answered.get(key)
+            if future is None:
+                future = answered[key] = pool.submit(_timed_answer, bot, q.text, result["currency"])
+            jobs.append((result, future))
+
+        for result, future in jobs:
+            if future is not None:
+                try:
+                    result["intent"], result["reply"], result["ms"] = future.result()
+                except Exception as e:
+                    result["error"] = f"{type(e).__name__}: {e}"
+            if result["error"]:
+                inc("cryptobuddy_errors_total", where="batch")
+            yield result
+
+
+def write_results(results, out):
+    """Write results as JSON lines to a text file object; returns (count, errors)."""
+    count = errors = 0
+    for result in results:
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        count += 1
+        errors += result["error"] is not None
+    out.flush()
+    return count, errors
+
+
+def main(argv=None, bot=None):
+    parser = argparse.ArgumentParser(description="Answer CryptoBuddy queries from a file or stdin as JSON lines.")
+    parser.add_argument("input", nargs="?", default="-", help="text or JSONL file of queries, or - for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file to write, or - for stdout (default)")
+    parser.add_argument("--workers", type=int, default=8, help="threads answering queries")
+    parser.add_argument("--currency", help="answer in USD, EUR, GBP, JPY, ... (default: CRYPTOBUDDY_CURRENCY)")
+    args = parser.parse_args(argv)
+
+    if bot is None:
+        from crypto_buddy import CryptoBuddy
+
+        # Alerts set by a batch live as long as the run, not in the user's alert store
+        bot = CryptoBuddy(alerts=AlertEngine())
+    start = time.perf_counter()
+    upstream = _upstream_requests(bot)
+    if args.input == "-":
+        queries = list(read_queries(sys.stdin))
+    else:
+        try:
+            with open(args.input, encoding="utf-8") as src:
+                queries = list(read_queries(src))
+        except OSError as e:
+            parser.exit(2, f"batch: {e}\n")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        count, errors = write_results(answer_all(bot, queries, args.workers, args.currency), dst)
+    finally:
+        if dst is not sys.stdout:
+            dst.close()
+    upstream = _upstream_requests(bot) - upstream
+    print(f"Answered {count:,} queries ({errors:,} failed) in {time.perf_counter() - start:.2f}s"
+          f" with {upstream:,} CoinGecko request{'s' if upstream != 1 else ''}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
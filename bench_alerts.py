@@ -0,0 +1,72 @@
+"""Measure alert evaluation with many active rules against snapshots and ticks.
+
+    python bench_alerts.py [n_alerts] [n_coins]
+"""
+import random
+import statistics
+import sys
+import time
+
+from alerts import AlertEngine
+from market_model import MarketSnapshot
+
+
+def synthetic_alerts(engine, n_alerts, n_coins, seed=7):
+    """Thresholds spread ±50% around each coin's price of 100, a quarter of them percent moves."""
+    rnd = random.Random(seed)
+    specs = []
+    for i in range(n_alerts):
+        cid = f"coin-{rnd.randrange(n_coins)}"
+        if i % 4 == 3:
+            specs.append((f"user-{i % 1000}", cid, "price", 100 * (1 - rnd.uniform(0.02, 0.5)),
+                          100 * (1 + rnd.uniform(0.02, 0.5)), None))
+        elif rnd.random() < 0.5:
+            specs.append((f"user-{i % 1000}", cid, "price", 100 * rnd.uniform(0.5, 0.99), None, None))
+        else:
+            specs.append((f"user-{i % 1000}", cid, "price", None, 100 * rnd.uniform(1.01, 1.5), None))
+    engine.add_many(specs)
+
+
+def bench(n_alerts=100_000, n_coins=250, rounds=200, seed=11):
+    rnd = random.Random(seed)
+    engine = AlertEngine()
+    start = time.perf_counter()
+    synthetic_alerts(engine, n_alerts, n_coins)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    # Prices drift ~0.1% per round, so each snapshot crosses a handful of thresholds
+    prices = {f"coin-{i}": 100.0 for i in range(n_coins)}
+    snapshot_us, tick_us, fired = [], [], 0
+    for _ in range(rounds):
+        for cid in prices:
+            prices[cid] *= 1 + rnd.gauss(0, 0.001)
+        snapshot = MarketSnapshot([{"id": cid, "current_price": p} for cid, p in prices.items()])
+        snapshot.column("current_price")  # built once per snapshot by its first reader anyway
+        start = time.perf_counter()
+        fired += len(engine.evaluate_snapshot(snapshot))
+        snapshot_us.append((time.perf_counter() - start) * 1e6)
+
+        cid = f"coin-{rnd.randrange(n_coins)}"
+        start = time.perf_counter()
+        fired += len(engine.evaluate(((cid, prices[cid]),)))
+        tick_us.append((time.perf_counter() - start) * 1e6)
+    return {
+        "alerts": n_alerts,
+        "coins": n_coins,
+        "load_ms": load_ms,
+        "snapshot_us": statistics.median(snapshot_us),
+        "snapshot_p99_us": sorted(snapshot_us)[int(len(snapshot_us) * 0.99) - 1],
+        "tick_us": statistics.median(tick_us),
+        "fired": fired,
+        "active": len(engine),
+    }
+
+
+if __name__ == "__main__":
+    n_alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_coins = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    r = bench(n_alerts, n_coins)
+    print(f"{r['alerts']:,} alerts over {r['coins']} coins: loaded in {r['load_ms']:.0f} ms")
+    print(f"snapshot evaluation: median {r['snapshot_us']:.0f} µs, p99 {r['snapshot_p99_us']:.0f} µs")
+    print(f"tick evaluation: median {r['tick_us']:.1f} µs")
+    print(f"{r['fired']:,} fired over the run, {r['active']:,} still active")
@@ -0,0 +1,60 @@
+"""Time revaluing many client portfolios per price tick, and their history statistics.
+
+    python bench_portfolio.py [n_portfolios] [n_assets] [repeats]
+"""
+import sys
+import time
+
+import numpy as np
+
+from portfolio import PortfolioBook
+from price_history import POINT_DTYPE
+
+HOUR_MS = 3_600_000
+
+
+def synthetic_book(n, assets, seed=7):
+    rng = np.random.default_rng(seed)
+    ids = [f"coin-{j}" for j in range(assets)]
+    holdings = rng.uniform(0, 10, (n, assets)) * (rng.random((n, assets)) < 0.1)
+    return PortfolioBook.from_matrix([f"client-{i}" for i in range(n)], ids, holdings)
+
+
+def synthetic_series(ids, points=24 * 30, seed=7):
+    rng = np.random.default_rng(seed)
+    out = {}
+    for cid in ids:
+        s = np.empty(points, dtype=POINT_DTYPE)
+        s["ts"] = np.arange(points) * HOUR_MS
+        s["price"] = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, points)))
+        out[cid] = s
+    return out
+
+
+def bench(n=10_000, assets=100, repeats=50):
+    book = synthetic_book(n, assets)
+    rng = np.random.default_rng(1)
+    ticks = [dict(zip(book.asset_ids, rng.uniform(1, 1000, assets))) for _ in range(repeats)]
+
+    start = time.perf_counter()
+    for prices in ticks:
+        book.revalue(prices)
+    tick_ms = (time.perf_counter() - start) / repeats * 1000
+
+    series = synthetic_series(book.asset_ids)
+    start = time.perf_counter()
+    history = book.history(series)
+    history.max_drawdown()
+    history.volatility()
+    history.contributions()
+    history_ms = (time.perf_counter() - start) * 1000
+    return {"portfolios": n, "assets": assets, "tick_ms": tick_ms, "history_ms": history_ms, "points": len(history)}
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    assets = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    result = bench(n, assets, repeats)
+    print(f"{result['portfolios']:,} portfolios x {result['assets']} assets: revalue {result['tick_ms']:.2f} ms per tick, "
+          f"{result['points']}-point history + stats {result['history_ms']:.0f} ms")
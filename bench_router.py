@@ -0,0 +1,55 @@
+"""Measure intent-router throughput with the tracked coins and with a large coin index.
+
+    python bench_router.py [n_coins] [n_messages]
+"""
+import random
+import sys
+import time
+
+from crypto_buddy import COIN_SYMBOLS
+from intent_router import IntentRouter
+
+MESSAGES = [
+    "What's the price of Bitcoin?",
+    "Which crypto is trending right now?",
+    "What's the most sustainable coin?",
+    "Best for long-term growth?",
+    "Compare Ethereum and Cardano",
+    "Show all cryptocurrencies",
+    "Give me a recommendation",
+    "price of coin 4242 please",
+    "tell me a joke",
+]
+
+
+def synthetic_index(n, seed=3):
+    rnd = random.Random(seed)
+    index = {}
+    for i in range(n):
+        cid = f"coin-{i}"
+        index[cid] = cid
+        index[f"coin {i}"] = cid
+        index["".join(rnd.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rnd.randint(2, 5)))] = cid
+    return index
+
+
+def bench(n_coins=10_000, n_messages=50_000):
+    aliases = dict(COIN_SYMBOLS, bitcoin="bitcoin", ethereum="ethereum", cardano="cardano")
+    results = {}
+    for label, extra in (("tracked coins", None), (f"{n_coins:,}-coin index", synthetic_index(n_coins))):
+        start = time.perf_counter()
+        router = IntentRouter(aliases, extra)
+        build_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for i in range(n_messages):
+            router.route(MESSAGES[i % len(MESSAGES)])
+        elapsed = time.perf_counter() - start
+        results[label] = {"build_ms": build_ms, "messages_per_sec": n_messages / elapsed}
+    return results
+
+
+if __name__ == "__main__":
+    n_coins = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_messages = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    for label, r in bench(n_coins, n_messages).items():
+        print(f"{label}: build {r['build_ms']:.1f} ms, {r['messages_per_sec']:,.0f} messages/s")
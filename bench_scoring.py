@@ -0,0 +1,51 @@
+"""Time per-snapshot ranking over a synthetic full-market snapshot.
+
+    python bench_scoring.py [n_coins] [repeats]
+"""
+import random
+import sys
+import time
+
+from scoring import BALANCED_WEIGHTS, LONG_TERM_WEIGHTS, MarketFrame, rank
+
+
+def synthetic_snapshot(n, seed=7):
+    rnd = random.Random(seed)
+    return [
+        {
+            "id": f"coin-{i}",
+            "market_cap_rank": i + 1,
+            "price_change_percentage_24h": rnd.uniform(-15, 15) if rnd.random() > 0.02 else None,
+        }
+        for i in range(n)
+    ]
+
+
+def synthetic_sustainability(snapshot, seed=7):
+    rnd = random.Random(seed)
+    return {c["id"]: {"sustainability_score": rnd.randint(1, 10)} for c in snapshot if rnd.random() < 0.3}
+
+
+def bench(n=10_000, repeats=50):
+    snapshot = synthetic_snapshot(n)
+    sustainability = synthetic_sustainability(snapshot)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        frame = MarketFrame.from_snapshot(snapshot, sustainability)
+    load_ms = (time.perf_counter() - start) / repeats * 1000
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        rank(frame, LONG_TERM_WEIGHTS, 10)
+        rank(frame, BALANCED_WEIGHTS, 1)
+    rank_ms = (time.perf_counter() - start) / repeats * 1000
+    return {"coins": n, "load_ms": load_ms, "rank_ms": rank_ms}
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    result = bench(n, repeats)
+    print(f"{result['coins']:,} coins: load columns {result['load_ms']:.2f} ms, "
+          f"score + top-k (both rankings) {result['rank_ms']:.2f} ms per snapshot")
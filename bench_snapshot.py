@@ -0,0 +1,75 @@
+"""Compare raw `/coins/markets` dicts with the compact MarketSnapshot: decode time and retained memory.
+
+    python bench_snapshot.py [n_coins]
+"""
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from market_model import MarketSnapshot, decode_markets
+
+
+def synthetic_payload(n, seed=5):
+    """A markets response shaped like CoinGecko's, with every key it sends."""
+    rnd = random.Random(seed)
+    coins = []
+    for i in range(n):
+        price = rnd.uniform(0.0001, 60000)
+        coins.append({
+            "id": f"coin-{i}", "symbol": f"c{i}", "name": f"Coin {i}",
+            "image": f"https://coin-images.coingecko.com/coins/images/{i}/large/coin.png",
+            "current_price": price, "market_cap": price * 1e7, "market_cap_rank": i + 1,
+            "fully_diluted_valuation": price * 2e7, "total_volume": price * 1e5,
+            "high_24h": price * 1.05, "low_24h": price * 0.95, "price_change_24h": price * 0.01,
+            "price_change_percentage_24h": rnd.uniform(-10, 10), "market_cap_change_24h": price * 1e5,
+            "market_cap_change_percentage_24h": rnd.uniform(-10, 10), "circulating_supply": 1e7,
+            "total_supply": 2e7, "max_supply": None, "ath": price * 2, "ath_change_percentage": -50.0,
+            "ath_date": "2021-11-10T14:24:11.849Z", "atl": price / 10, "atl_change_percentage": 900.0,
+            "atl_date": "2013-07-06T00:00:00.000Z", "roi": None, "last_updated": "2026-01-01T00:00:00.000Z",
+            "price_change_percentage_24h_in_currency": rnd.uniform(-10, 10),
+        })
+    return json.dumps(coins).encode()
+
+
+def _retained(decode, body):
+    gc.collect()
+    tracemalloc.start()
+    value = decode(body)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return retained
+
+
+def _ms(fn, repeats=5):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench(n=10_000):
+    import pandas as pd
+
+    body = synthetic_payload(n)
+    raw, snapshot = json.loads(body), decode_markets(body)
+    return {
+        "raw dicts (json)": {"decode_ms": _ms(lambda: json.loads(body)),
+                             "bytes_per_coin": _retained(json.loads, body) / n,
+                             "to_frame_ms": _ms(lambda: pd.DataFrame(raw))},
+        "MarketSnapshot": {"decode_ms": _ms(lambda: decode_markets(body)),
+                           "bytes_per_coin": _retained(decode_markets, body) / n,
+                           "to_frame_ms": _ms(lambda: MarketSnapshot(snapshot).to_frame())},
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    for label, r in bench(n).items():
+        print(f"{label}: decode {r['decode_ms']:.1f} ms, {r['bytes_per_coin']:,.0f} bytes/coin retained, "
+              f"DataFrame {r['to_frame_ms']:.1f} ms")
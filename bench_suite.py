@@ -0,0 +1,174 @@
+"""End-to-end benchmarks against a local fake CoinGecko, compared with stored baselines.
+
+Times every CryptoBuddy command (cold: a new bot with empty caches; warm:
+the median of repeated calls), intent-router throughput and the dashboard's
+data preparation, all offline. Exits 1 when a metric regresses past the
+tolerance, so it can gate CI.
+
+    python bench_suite.py                   # compare with bench_baselines.json
+    python bench_suite.py --save            # record new baselines
+    python bench_suite.py --fixtures DIR    # serve recorded responses (see fake_coingecko.py record)
+    python bench_suite.py --latency 0.02    # simulate API round trips
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from fake_coingecko import FakeCoinGecko
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baselines.json")
+
+COMMANDS = {
+    "price": "What's the price of Bitcoin?",
+    "trending": "Which crypto is trending right now?",
+    "sustainable": "What's the most sustainable coin?",
+    "long_term": "Best for long-term growth?",
+    "compare": "Compare Bitcoin and Ethereum",
+    "show_all": "Show all cryptocurrencies",
+    "recommendation": "Give me a recommendation",
+}
+
+DASHBOARD_COINS = ["bitcoin", "ethereum", "cardano", "solana"]
+
+
+def _ms(fn, repeats=1):
+    """Median wall time of `fn()` in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def bench_commands(repeats=20):
+    from crypto_buddy import CryptoBuddy
+    from disk_cache import DiskCache
+
+    results = {}
+    for name, message in COMMANDS.items():
+        bot = CryptoBuddy(disk_cache=DiskCache(":memory:"))
+        results[f"command.{name}.cold_ms"] = _ms(lambda: bot.process_response(message))
+        results[f"command.{name}.warm_ms"] = _ms(lambda: bot.process_response(message), repeats)
+    return results
+
+
+def bench_router(n_coins=10_000, n_messages=20_000):
+    import bench_router
+
+    results = {}
+    for label, r in bench_router.bench(n_coins, n_messages).items():
+        key = "tracked" if label == "tracked coins" else "index"
+        results[f"router.{key}.build_ms"] = r["build_ms"]
+        results[f"router.{key}.messages_per_sec"] = r["messages_per_sec"]
+    return results
+
+
+def bench_dashboard(repeats=5):
+    import advisor
+    from downsample import CHART_POINTS
+
+    holdings = {"bitcoin": 0.5, "ethereum": 4.0, "cardano": 1000.0}
+    results = {
+        # What the dashboard reads: the first call loads through the refresher, later ones are published reads
+        "dashboard.market_snapshot_cold_ms": _ms(lambda: advisor.market_snapshot(DASHBOARD_COINS)),
+        "dashboard.chart_cold_ms": _ms(lambda: advisor.fetch_chart_data("bitcoin", "90", CHART_POINTS)),
+    }
+    market = advisor.market_snapshot(DASHBOARD_COINS)
+    results.update({
+        "dashboard.market_snapshot_warm_ms": _ms(lambda: advisor.market_snapshot(DASHBOARD_COINS), repeats),
+        "dashboard.chart_warm_ms": _ms(lambda: advisor.fetch_chart_data("bitcoin", "90", CHART_POINTS), repeats),
+        "dashboard.charts_many_ms": _ms(lambda: advisor.fetch_chart_data_many(tuple(DASHBOARD_COINS), "30",
+                                                                              CHART_POINTS), repeats),
+        "dashboard.indicators_ms": _ms(lambda: advisor.indicator_frame("bitcoin", "30", CHART_POINTS), repeats),
+        "dashboard.portfolio_history_ms": _ms(lambda: advisor.portfolio_history(holdings, "30"), repeats),
+        "dashboard.market_table_ms": _ms(lambda: advisor.market_table(market), repeats),
+    })
+    return results
+
+
+def run(fixtures=None, latency=0.0, repeats=20):
+    """All metrics as {name: value}; `*_ms` are lower-is-better, `*_per_sec` higher-is-better."""
+    with FakeCoinGecko(fixtures=fixtures, latency=latency) as fake:
+        # Before anything creates the shared client, disk cache or history store
+        os.environ["COINGECKO_BASE_URL"] = fake.base_url
+        os.environ.setdefault("COINGECKO_API_TIER", "pro")
+        os.environ["CRYPTOBUDDY_CACHE_DIR"] = tempfile.mkdtemp(prefix="cryptobuddy-bench-")
+        results = bench_commands(repeats)
+        results.update(bench_dashboard(max(1, repeats // 4)))
+    results.update(bench_router())
+    return results
+
+
+def compare(results, baselines, tolerance=0.5, slack_ms=1.0):
+    """Regressions as (metric, baseline, current) for metrics worse than the baseline by more than `tolerance`.
+
+    Millisecond timings also get `slack_ms` of absolute headroom so
+    sub-millisecond metrics do not fail on scheduler noise. Metrics missing
+    on either side are ignored.
+    """
+    regressions = []
+    for name, base in baselines.items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if name.endswith("_per_sec"):
+            worse = current < base / (1 + tolerance)
+        else:
+            worse = current > base * (1 + tolerance) + slack_ms
+        if worse:
+            regressions.append((name, base, current))
+    return regressions
+
+
+def load_baselines(path=BASELINE_PATH):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)["metrics"]
+    except FileNotFoundError:
+        return None
+
+
+def save_baselines(results, path=BASELINE_PATH):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                   "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "metrics": results}, fh, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the CryptoBuddy benchmark suite against a fake CoinGecko.")
+    parser.add_argument("--save", action="store_true", help="store these results as the new baselines")
+    parser.add_argument("--baselines", default=BASELINE_PATH)
+    parser.add_argument("--fixtures", help="directory of recorded CoinGecko responses")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated API latency in seconds")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown, as a fraction")
+    args = parser.parse_args(argv)
+
+    results = run(args.fixtures, args.latency, args.repeats)
+    baselines = load_baselines(args.baselines)
+    for name in sorted(results):
+        base = (baselines or {}).get(name)
+        vs = f"  (baseline {base:,.2f})" if base is not None else ""
+        print(f"{name:40s} {results[name]:>14,.2f}{vs}")
+
+    if args.save:
+        save_baselines(results, args.baselines)
+        print(f"Saved baselines to {args.baselines}")
+        return 0
+    if baselines is None:
+        print(f"No baselines at {args.baselines}; run with --save to record them.")
+        return 0
+    regressions = compare(results, baselines, args.tolerance)
+    for name, base, current in regressions:
+        print(f"REGRESSION {name}: {base:,.2f} -> {current:,.2f}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
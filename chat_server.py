@@ -0,0 +1,265 @@
+"""Multi-session CryptoBuddy server: an asyncio line protocol over TCP.
+
+Each connection is a session. A client sends one message per line, either
+as plain text or as `{"message": "..."}`, and gets one JSON line back:
+`{"reply": "...", "ms": 12.3}`. Alerts ("tell me when BTC drops below 50k",
+"my alerts", "cancel alert 3") fire as unsolicited `{"alert": "..."}` lines.
+Session commands:
+
+    /user <name>            name the session, so its alerts outlive the connection (one open connection per name)
+    /hold <coin> <amount>   set a holding (0 removes it)
+    /portfolio              value the session's holdings at current prices
+    /currency <code>        answer in USD, EUR, GBP, JPY, ... (converted locally)
+    /history                the session's recent questions
+    /metrics                server metrics in Prometheus text format
+
+    python chat_server.py [--host 127.0.0.1] [--port 8765] [--workers 8]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from crypto_buddy import CURRENCY_RE
+from metrics import get_metrics, start_metrics_server
+from portfolio import PortfolioBook
+
+HISTORY_SIZE = 50
+
+
+class ChatSession:
+    """Per-connection state: holdings and recent questions."""
+
+    def __init__(self, session_id):
+        self.id = session_id
+        self.holdings = {}
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.currency = None
+        self.user = None
+        # Delivers fired alerts to the connection; set while it is open
+        self.push = None
+
+    @property
+    def owner(self):
+        """Alert owner: the named user, or this connection only."""
+        return f"chat:{self.user}" if self.user else f"chat:session-{self.id}"
+
+
+class ChatServer:
+    """Serves many sessions from one shared CryptoBuddy (and so one snapshot, client and caches).
+
+    The event loop only parses and writes lines; every answer is computed on
+    a bounded thread pool of `workers` threads, so blocking CoinGecko
+    requests never stall other sessions.
+    """
+
+    def __init__(self, bot=None, host="127.0.0.1", port=8765, workers=8):
+        if bot is None:
+            from crypto_buddy import CryptoBuddy
+
+            bot = CryptoBuddy()
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chat-worker")
+        self.sessions = {}
+        # Names held by open sessions, so a second connection cannot take over a user's alerts
+        self._users = {}
+        self._users_lock = threading.Lock()
+        self.requests = 0
+        self._server = None
+        self._next_id = 0
+        get_metrics().register("chat_server", self.metric_samples)
+
+    def metric_samples(self):
+        return [("chat_sessions", "gauge", {}, len(self.sessions)),
+                ("chat_requests_total", "counter", {}, self.requests)]
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def start(self):
+        self.bot.start_alert_watch()
+        self._server = await asyncio.start_server(self._serve_client, self.host, self.port)
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # -------------------- Protocol --------------------
+    async def _serve_client(self, reader, writer):
+        self._next_id += 1
+        session = self.sessions[self._next_id] = ChatSession(self._next_id)
+        loop = asyncio.get_running_loop()
+
+        def push(note):
+            # Called on whichever thread evaluated the alert
+            with self.bot.in_currency(session.currency):
+                line = json.dumps({"alert": self.bot.alert_message(note)}).encode() + b"\n"
+            loop.call_soon_threadsafe(writer.write, line)
+
+        session.push = push
+        self.bot.alerts.subscribe(session.owner, push)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                text = _message(line)
+                if not text:
+                    continue
+                start = time.perf_counter()
+                try:
+                    reply = await loop.run_in_executor(self.executor, self.handle, session, text)
+                except Exception as e:
+                    reply = f"\nSorry, something went wrong: {e}\n"
+                self.requests += 1
+                payload = {"reply": reply, "ms": round((time.perf_counter() - start) * 1000, 3)}
+                writer.write(json.dumps(payload).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            self.sessions.pop(session.id, None)
+            self._release(session)
+            writer.close()
+
+    # -------------------- Answers (worker threads) --------------------
+    def handle(self, session, text):
+        session.history.append(text)
+        command, _, rest = text.partition(" ")
+        if command == "/hold":
+            return self._hold(session, rest)
+        if command == "/user":
+            return self._user(session, rest.strip())
+        if command == "/currency" or CURRENCY_RE.match(text):
+            return self._currency(session, rest.strip() if command == "/currency" else CURRENCY_RE.match(text).group(1))
+        if command == "/metrics":
+            return get_metrics().render()
+        if command == "/history":
+            return "\n".join(f"{i}. {q}" for i, q in enumerate(list(session.history)[:-1], 1)) or "No questions yet."
+        with self.bot.in_currency(session.currency), self.bot.as_user(session.owner):
+            if command == "/portfolio":
+                return self._portfolio(session)
+            return self.bot.process_response(text)
+
+    def _currency(self, session, code):
+        if not code:
+            return f"Answering in {(session.currency or self.bot.default_currency).upper()}."
+        with self.bot.in_currency(code.lower()):
+            if self.bot.quote_currency() != code.lower():
+                return f"No exchange rate for {code.upper()}."
+        session.currency = code.lower()
+        return f"Answering in {code.upper()}."
+
+    def _user(self, session, name):
+        if not name or not name.replace("-", "").replace("_", "").isalnum():
+            return "Usage: /user <name> (letters, digits, - and _)"
+        with self._users_lock:
+            holder = self._users.get(name)
+            if holder is not None and holder is not session:
+                return f"The name {name} is in use by another connection."
+            self._users[name] = session
+            if session.user is not None and session.user != name:
+                self._users.pop(session.user, None)
+        anonymous = session.owner if session.user is None else None
+        self.bot.alerts.unsubscribe(session.owner, session.push)
+        session.user = name
+        if anonymous is not None:
+            # Alerts set before naming the session now belong to the user
+            self.bot.alerts.reassign(anonymous, session.owner)
+        if session.push is not None:
+            # Alerts that fired while this user was away are pushed as well
+            self.bot.alerts.subscribe(session.owner, session.push)
+        active = len(self.bot.alerts.alerts(session.owner))
+        return f"Hello {name}. You have {active} active alert{'s' if active != 1 else ''}."
+
+    def _release(self, session):
+        """Stop pushing to the session and free its name; an unnamed session's alerts go with it."""
+        alerts = self.bot.alerts
+        alerts.unsubscribe(session.owner, session.push)
+        if session.user is not None:
+            with self._users_lock:
+                if self._users.get(session.user) is session:
+                    del self._users[session.user]
+        else:
+            alerts.cancel(session.owner)
+            alerts.take(session.owner)
+
+    def _hold(self, session, args):
+        parts = args.rsplit(" ", 1)
+        if len(parts) != 2:
+            return "Usage: /hold <coin> <amount>"
+        name = parts[0].strip()
+        coin_id = self.bot.resolve_coin(name) or self.bot.coin_aliases.get(name.lower())
+        if not coin_id:
+            return f"Unknown coin: {name}"
+        try:
+            amount = float(parts[1])
+        except ValueError:
+            return f"Not an amount: {parts[1]}"
+        if amount > 0:
+            session.holdings[coin_id] = amount
+        else:
+            session.holdings.pop(coin_id, None)
+        return f"Holding {amount:g} {self.bot.display_name(coin_id)}."
+
+    def _portfolio(self, session):
+        if not session.holdings:
+            return "No holdings yet. Add some with /hold <coin> <amount>."
+        records = self.bot.lookup_coins(list(session.holdings), fields=("current_price",))
+        book = PortfolioBook()
+        book.set(session.id, session.holdings)
+        lines = [f"   {self.bot.display_name(cid)}: {amount:g}" for cid, amount in session.holdings.items()]
+        missing = [cid for cid in session.holdings if cid not in records]
+        total = self.bot.to_currency(book.value(session.id, list(records.values())))
+        lines.append(f"Total value: {self.bot.money(total)}")
+        if missing:
+            lines.append(f"(no live price for {', '.join(missing)})")
+        return "\n".join(lines)
+
+
+def _message(line):
+    text = line.decode("utf-8", "replace").strip()
+    if text.startswith("{"):
+        try:
+            return str(json.loads(text).get("message", "")).strip()
+        except (ValueError, AttributeError):
+            return text
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve CryptoBuddy to many clients over a JSON line protocol.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=8, help="threads computing answers")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        start_metrics_server()
+        server = await ChatServer(host=args.host, port=args.port, workers=args.workers).start()
+        print(f"CryptoBuddy chat server on {server.address[0]}:{server.address[1]}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
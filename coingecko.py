@@ -0,0 +1,260 @@
+import os
+import re
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from market_model import loads
+from metrics import get_metrics, inc, span
+
+COINGECKO_BASE = "https://api.coingecko.com/api/v3"
+COINGECKO_PRO_BASE = "https://pro-api.coingecko.com/api/v3"
+
+# Requests per minute allowed by each CoinGecko plan
+TIER_RATE_LIMITS = {
+    "public": 10,
+    "demo": 30,
+    "pro": 500,
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Longest a request queues for a token: a full minute refills any tier's bucket
+QUEUE_WAIT = 60.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1, max_wait=None):
+        """Take `tokens`, sleeping until they are available. Returns False if that would exceed `max_wait`."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                delay = (tokens - self.tokens) / self.rate
+            if max_wait is not None and waited + delay > max_wait:
+                return False
+            self._sleep(delay)
+            waited += delay
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttled = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.statuses = {}
+
+    def record(self, status, latency):
+        self.requests += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "avg_latency": self.total_latency / self.requests if self.requests else 0.0,
+            "max_latency": self.max_latency,
+            "statuses": dict(self.statuses),
+        }
+
+
+_ID_SEGMENT = re.compile(r"^/coins/(?!markets$|list$|categories$)[^/]+")
+
+
+def endpoint_key(path):
+    """Collapse coin IDs so '/coins/bitcoin/market_chart' and '/coins/solana/market_chart' share counters."""
+    return _ID_SEGMENT.sub("/coins/{id}", path)
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (now if now is not None else time.time()))
+
+
+class CoinGeckoClient:
+    """Pooled, rate-limited CoinGecko client shared by the CLI and the dashboard.
+
+    Keeps one keep-alive `requests.Session`, spends a token per request from a
+    bucket sized to the API tier, retries 429/5xx with exponential backoff that
+    honours `Retry-After`, and tracks latency/status counters per endpoint.
+    CoinGecko counts calls per minute, so the bucket holds a whole minute's
+    budget: a fan-out spends it at once, and the rest queue for up to
+    `queue_wait` seconds. A request that would wait longer is counted as
+    throttled (`coingecko_throttled_total`, `cryptobuddy_errors_total`).
+    `get` returns the decoded JSON or None, matching the old `_fetch` contract.
+    """
+
+    def __init__(self, api_key=None, tier=None, base_url=None, timeout=10, max_retries=3,
+                 backoff_base=0.5, backoff_max=30.0, pool_size=10, session=None,
+                 clock=time.monotonic, sleep=time.sleep, queue_wait=QUEUE_WAIT):
+        self.api_key = os.getenv("COINGECKO_API_KEY", "") if api_key is None else api_key
+        self.tier = tier or os.getenv("COINGECKO_API_TIER") or ("demo" if self.api_key else "public")
+        if base_url is None:
+            base_url = os.getenv("COINGECKO_BASE_URL") or (COINGECKO_PRO_BASE if self.tier == "pro" else COINGECKO_BASE)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.queue_wait = queue_wait
+        self._sleep = sleep
+        self._clock = clock
+
+        per_minute = TIER_RATE_LIMITS.get(self.tier, TIER_RATE_LIMITS["public"])
+        self.limiter = TokenBucket(per_minute / 60.0, capacity=per_minute, clock=clock, sleep=sleep)
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self.session.headers.update(self._headers())
+
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _headers(self):
+        headers = {"accept": "application/json", "Connection": "keep-alive"}
+        if self.api_key:
+            header = "x-cg-pro-api-key" if self.tier == "pro" else "x-cg-demo-api-key"
+            headers[header] = self.api_key
+        return headers
+
+    def _endpoint(self, url):
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        return endpoint_key(path.split("?", 1)[0])
+
+    def _counter(self, endpoint):
+        with self._stats_lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = EndpointStats()
+            return stats
+
+    def _backoff(self, attempt, retry_after=None):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = random.uniform(delay / 2, delay)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def get(self, url, params=None):
+        """GET a full URL or a path relative to `base_url`; JSON on 200, otherwise None."""
+        if not url.startswith("http"):
+            url = f"{self.base_url}/{url.lstrip('/')}"
+        endpoint = self._endpoint(url)
+        stats = self._counter(endpoint)
+
+        for attempt in range(self.max_retries + 1):
+            if not self.limiter.acquire(max_wait=self.queue_wait):
+                with self._stats_lock:
+                    stats.throttled += 1
+                inc("cryptobuddy_errors_total", where="throttled")
+                return None
+            start = self._clock()
+            try:
+                with span("fetch", endpoint=endpoint):
+                    res = self.session.get(url, params=params or {}, timeout=self.timeout)
+            except requests.RequestException:
+                with self._stats_lock:
+                    stats.record("error", self._clock() - start)
+                    stats.errors += 1
+                if attempt < self.max_retries:
+                    with self._stats_lock:
+                        stats.retries += 1
+                    self._sleep(self._backoff(attempt))
+                    continue
+                return None
+            with self._stats_lock:
+                stats.record(res.status_code, self._clock() - start)
+
+            if res.status_code == 200:
+                try:
+                    with span("parse", endpoint=endpoint):
+                        return loads(res.content)
+                except ValueError:
+                    with self._stats_lock:
+                        stats.errors += 1
+                    return None
+            if res.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                with self._stats_lock:
+                    stats.retries += 1
+                self._sleep(self._backoff(attempt, parse_retry_after(res.headers.get("Retry-After"))))
+                continue
+            with self._stats_lock:
+                stats.errors += 1
+            return None
+        return None
+
+    def stats(self):
+        """Per-endpoint counters, e.g. {'/coins/markets': {'requests': 3, 'statuses': {200: 3}, ...}}."""
+        with self._stats_lock:
+            return {endpoint: s.as_dict() for endpoint, s in self._stats.items()}
+
+    def metric_samples(self):
+        """`stats()` as (name, type, labels, value) samples for the /metrics endpoint."""
+        out = []
+        for endpoint, s in self.stats().items():
+            for status, n in s["statuses"].items():
+                out.append(("coingecko_requests_total", "counter", {"endpoint": endpoint, "status": status}, n))
+            for field in ("errors", "retries", "throttled"):
+                out.append((f"coingecko_{field}_total", "counter", {"endpoint": endpoint}, s[field]))
+        return out
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide client so every caller shares one connection pool and rate budget."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = CoinGeckoClient()
+                get_metrics().register("coingecko", _client.metric_samples)
+    return _client
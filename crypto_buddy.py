@@ -1,23 +1,127 @@
 import os
+import re
 import sys
 import json
-import requests
+import math
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
 from datetime import datetime
 
-# Optional: ChatterBot fallback if available
-try:
-    from chatterbot import ChatBot
-    from chatterbot.trainers import ListTrainer
-    CHATTERBOT_AVAILABLE = True
-except Exception:
-    CHATTERBOT_AVAILABLE = False
+from alerts import AlertEngine, alert_message, answer_alert_command, get_alert_engine, is_alert_command
+from async_fetch import fetch_many
+from coingecko import get_client
+from disk_cache import get_disk_cache
+from fx import BASE_CURRENCY, format_money, get_fx_table
+from indicators import get_indicator_cache
+from intent_router import IntentRouter
+from market_cache import MarketSnapshotCache
+from market_model import decode_markets
+from metrics import get_metrics, inc, profiled, span, start_metrics_server
+from price_feed import get_price_table
+from report_cache import ReportCache, cached_report
+from scoring import (
+    BALANCED_WEIGHTS,
+    LONG_TERM_WEIGHTS,
+    OFFLINE_BALANCED_WEIGHTS,
+    OFFLINE_LONG_TERM_WEIGHTS,
+    MarketFrame,
+    rank,
+)
+from universe import ingest_universe
+
+CHATBOT_DB = "cryptobuddy.db"
+CHATBOT_WAIT = 2.0
+
+TRAINING_DATA = [
+    "Hello",
+    "Hi! I'm CryptoBuddy, your crypto advisor with REAL-TIME data!",
+    "Hi",
+    "Hey there! Ready to explore live cryptocurrency prices?",
+    "Hey",
+    "Hello! Let's find you the perfect crypto investment!",
+    "What's the price of Bitcoin?",
+    "Let me fetch the current Bitcoin price for you!",
+    "Show me crypto prices",
+    "I'll get you the latest cryptocurrency prices!",
+    "Which crypto is trending?",
+    "Let me show you the trending cryptocurrencies from the market!",
+    "What's the most sustainable coin?",
+    "I'll find you the greenest crypto option!",
+    "Compare Bitcoin and Ethereum",
+    "I'll compare these cryptocurrencies with live data!",
+    "Help",
+    "I can help with live prices, trends, sustainability, comparisons, and advice!",
+    "Bye",
+    "Goodbye! Stay green and grow your wealth!",
+]
+CORPUS_FINGERPRINT = hashlib.sha256(json.dumps(TRAINING_DATA).encode()).hexdigest()
+
+
+def _load_chatterbot():
+    """Optional: ChatterBot fallback if available. Imported on first use, not at startup."""
+    try:
+        from chatterbot import ChatBot
+        from chatterbot.trainers import ListTrainer
+    except Exception:
+        return None
+    return ChatBot, ListTrainer
+
+
+def _stored_fingerprint(db_path):
+    try:
+        with closing(sqlite3.connect(db_path)) as conn:
+            row = conn.execute("SELECT value FROM cryptobuddy_meta WHERE key = 'corpus_fingerprint'").fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def _store_fingerprint(db_path, fingerprint):
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS cryptobuddy_meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT OR REPLACE INTO cryptobuddy_meta VALUES ('corpus_fingerprint', ?)", (fingerprint,))
+
+
+DETAIL_PARAMS = {
+    "localization": "false",
+    "tickers": "false",
+    "community_data": "false",
+    "developer_data": "false",
+}
+
+UNIVERSE_MAX_AGE = 600
+# Coins per page of "show all"; ask for "show all page 2" and so on
+PAGE_SIZE = int(os.getenv("CRYPTOBUDDY_PAGE_SIZE", "25"))
+PAGE_RE = re.compile(r"\bpage\s+(\d+)")
+CURRENCY_RE = re.compile(r"^\s*(?:set\s+)?currency\s+([a-z]{3})\s*$", re.IGNORECASE)
+
+# Ticker symbols and nicknames for the tracked coins
+COIN_SYMBOLS = {
+    "btc": "bitcoin",
+    "eth": "ethereum",
+    "ether": "ethereum",
+    "ada": "cardano",
+    "sol": "solana",
+    "xrp": "ripple",
+    "binance coin": "binancecoin",
+    "doge": "dogecoin",
+    "dot": "polkadot",
+}
+
+# Fields every feature reads; all of them are in the /coins/markets payload
+MARKET_FIELDS = ("name", "symbol", "current_price", "price_change_percentage_24h", "market_cap", "total_volume")
 
 
 class CryptoBuddy:
-    def __init__(self):
+    def __init__(self, disk_cache=None, price_table=None, fx=None, alerts=None):
         self.name = "CryptoBuddy"
-        self.api_key = os.getenv("COINGECKO_API_KEY", "")  # No hardcoded key - use environment variable
-        self.base_url = "https://api.coingecko.com/api/v3"
+        # Shared pooled client; the key comes from COINGECKO_API_KEY - no hardcoded key
+        self.client = get_client()
+        self.api_key = self.client.api_key
+        self.base_url = self.client.base_url
 
         # Map friendly names to CoinGecko IDs
         self.crypto_ids = {
@@ -65,53 +169,121 @@ class CryptoBuddy:
             },
         }
 
+        # One /coins/markets snapshot answers every command until it expires.
+        # The last good one is kept on disk so startup and offline use real numbers.
+        self.disk_cache = disk_cache or get_disk_cache()
+        self.market_cache = MarketSnapshotCache(
+            self._load_market_snapshot,
+            ttl=float(os.getenv("CRYPTOBUDDY_CACHE_TTL", "60")),
+            stale_ttl=float(os.getenv("CRYPTOBUDDY_CACHE_STALE_TTL", "300")),
+        )
+        last_known = self.disk_cache.get(self._snapshot_key())
+        if last_known:
+            self.market_cache.seed(decode_markets(last_known.value))
+        # Streamed prices (CRYPTOBUDDY_FEED_URL) override the snapshot's price and 24h change
+        self.price_table = price_table if price_table is not None else get_price_table()
+
+        # Data stays in USD upstream; other currencies are converted locally (CRYPTOBUDDY_CURRENCY)
+        self.fx = fx
+        self.default_currency = os.getenv("CRYPTOBUDDY_CURRENCY", BASE_CURRENCY).lower()
+        self._local = threading.local()
+
+        # Alerts are checked against every new snapshot (not the seeded one) and every streamed tick.
+        # A throwaway disk cache gets throwaway alerts rather than the persistent engine.
+        if alerts is None:
+            alerts = AlertEngine() if self.disk_cache.path == ":memory:" else get_alert_engine()
+        self.alerts = alerts
+        self.market_cache.subscribe(self.check_alerts)
+        if self.price_table is not None:
+            self.price_table.subscribe(self.alerts.evaluate_tick)
+        self._alert_watch = None
+
+        # Ranking rules; swap these for custom ScoringWeights to retune the advisor
+        self.long_term_weights = LONG_TERM_WEIGHTS
+        self.balanced_weights = BALANCED_WEIGHTS
+        self.offline_long_term_weights = OFFLINE_LONG_TERM_WEIGHTS
+        self.offline_balanced_weights = OFFLINE_BALANCED_WEIGHTS
+        self._frame = None
+        self._frame_source = None
+        # Rendered answers per (command, snapshot version, args)
+        self.report_cache = ReportCache()
+        # Indicators over locally stored price history (never fetched just for ranking)
+        self.indicator_cache = None
+        self.indicator_days = os.getenv("CRYPTOBUDDY_INDICATOR_DAYS", "7")
+
+        # Optional full-market mode: resolve and price any listed coin
+        self.universe_pages = int(os.getenv("CRYPTOBUDDY_UNIVERSE_PAGES", "0"))
+        self._universe = None
+
+        # Names, IDs and ticker aliases the intent router recognises for tracked coins
+        self._names_by_id = {cid: name for name, cid in self.crypto_ids.items()}
+        self.coin_aliases = {name.lower(): cid for name, cid in self.crypto_ids.items()}
+        self.coin_aliases.update({cid: cid for cid in self.crypto_ids.values()})
+        self.coin_aliases.update(COIN_SYMBOLS)
+        self._router_cache = None
+        self._router_universe = None
+        self.intent_handlers = {
+            "price": self._answer_price,
+            "trending": lambda route, text: self.find_trending(),
+            "sustainable": lambda route, text: self.find_sustainable(),
+            "long_term": lambda route, text: self.find_long_term(),
+            "compare": lambda route, text: self.compare_coins(text, route.coins),
+            "show_all": lambda route, text: self.show_all(_page_number(text)),
+            "recommend": lambda route, text: self.balanced_recommendation(),
+        }
+
+        # ChatterBot small-talk fallback, built on the first message no intent matches
         self.chatbot = None
-        if CHATTERBOT_AVAILABLE:
-            try:
-                self.chatbot = ChatBot(
-                    "CryptoBuddy",
-                    storage_adapter="chatterbot.storage.SQLStorageAdapter",
-                    database_uri="sqlite:///cryptobuddy.db",
-                    logic_adapters=[
-                        {
-                            "import_path": "chatterbot.logic.BestMatch",
-                            "default_response": "I'm not sure about that. Try asking about trending coins, prices, sustainability, or investment advice!",
-                            "maximum_similarity_threshold": 0.90,
-                        }
-                    ],
-                )
-                self._train_chatbot()
-            except Exception:
-                # If ChatterBot fails to init, stay in rule-based mode
-                self.chatbot = None
+        self.chatbot_db = CHATBOT_DB
+        self._chatbot_thread = None
+        self._chatbot_lock = threading.Lock()
+
+        # Cache counters are read when /metrics is scraped
+        get_metrics().register("crypto_buddy", self.metric_samples)
+
+    def _ensure_chatbot(self, wait=CHATBOT_WAIT):
+        """Start building the fallback bot once and wait up to `wait` seconds for it."""
+        if self.chatbot is not None:
+            return self.chatbot
+        with self._chatbot_lock:
+            if self._chatbot_thread is None:
+                self._chatbot_thread = threading.Thread(target=self._init_chatbot, name="chatterbot-init", daemon=True)
+                self._chatbot_thread.start()
+        self._chatbot_thread.join(wait)
+        return self.chatbot
+
+    def _init_chatbot(self):
+        chatterbot = _load_chatterbot()
+        if chatterbot is None:
+            return
+        ChatBot, ListTrainer = chatterbot
+        try:
+            bot = ChatBot(
+                "CryptoBuddy",
+                storage_adapter="chatterbot.storage.SQLStorageAdapter",
+                database_uri=f"sqlite:///{self.chatbot_db}",
+                logic_adapters=[
+                    {
+                        "import_path": "chatterbot.logic.BestMatch",
+                        "default_response": "I'm not sure about that. Try asking about trending coins, prices, sustainability, or investment advice!",
+                        "maximum_similarity_threshold": 0.90,
+                    }
+                ],
+            )
+            self._train_chatbot(bot, ListTrainer)
+            self.chatbot = bot
+        except Exception:
+            # If ChatterBot fails to init, stay in rule-based mode
+            inc("cryptobuddy_errors_total", where="chatbot_init")
+            self.chatbot = None
 
-    def _train_chatbot(self):
-        if not self.chatbot:
+    def _train_chatbot(self, bot, trainer_cls):
+        # Retraining appends duplicate statements, so only train when the corpus changed
+        if _stored_fingerprint(self.chatbot_db) == CORPUS_FINGERPRINT:
             return
-        trainer = ListTrainer(self.chatbot)
-        training_data = [
-            "Hello",
-            "Hi! I'm CryptoBuddy, your crypto advisor with REAL-TIME data!",
-            "Hi",
-            "Hey there! Ready to explore live cryptocurrency prices?",
-            "Hey",
-            "Hello! Let's find you the perfect crypto investment!",
-            "What's the price of Bitcoin?",
-            "Let me fetch the current Bitcoin price for you!",
-            "Show me crypto prices",
-            "I'll get you the latest cryptocurrency prices!",
-            "Which crypto is trending?",
-            "Let me show you the trending cryptocurrencies from the market!",
-            "What's the most sustainable coin?",
-            "I'll find you the greenest crypto option!",
-            "Compare Bitcoin and Ethereum",
-            "I'll compare these cryptocurrencies with live data!",
-            "Help",
-            "I can help with live prices, trends, sustainability, comparisons, and advice!",
-            "Bye",
-            "Goodbye! Stay green and grow your wealth!",
-        ]
-        trainer.train(training_data)
+        bot.storage.drop()
+        trainer_cls(bot).train(TRAINING_DATA)
+        _store_fingerprint(self.chatbot_db, CORPUS_FINGERPRINT)
 
     def greet(self):
         print("\n" + "=" * 70)
@@ -122,157 +294,374 @@ class CryptoBuddy:
 
     # -------------------- Live Data Helpers --------------------
     def _fetch(self, url, params=None):
-        headers = {"accept": "application/json"}
-        if self.api_key:
-            headers["x-cg-demo-api-key"] = self.api_key
-        try:
-            res = requests.get(url, headers=headers, params=params or {}, timeout=10)
-            if res.status_code == 200:
-                return res.json()
-            return None
-        except Exception:
-            return None
+        return self.client.get(url, params)
 
     def fetch_coin_data(self, coin_id):
         url = f"{self.base_url}/coins/{coin_id}"
-        params = {
-            "localization": "false",
-            "tickers": "false",
-            "community_data": "false",
-            "developer_data": "false",
-        }
-        return self._fetch(url, params)
+        return self._fetch(url, DETAIL_PARAMS)
 
-    def fetch_market_data(self):
+    def fetch_market_data(self, coin_ids=None):
         url = f"{self.base_url}/coins/markets"
         params = {
             "vs_currency": "usd",
-            "ids": ",".join(self.crypto_ids.values()),
+            "ids": ",".join(coin_ids or self.crypto_ids.values()),
             "order": "market_cap_desc",
             "sparkline": "false",
-            "price_change_percentage": "24h,7d",
+            "price_change_percentage": "24h",
+        }
+        return decode_markets(self._fetch(url, params))
+
+    def _snapshot_key(self):
+        return "markets:" + ",".join(self.crypto_ids.values())
+
+    def _load_market_snapshot(self):
+        data = self.fetch_market_data()
+        if data:
+            self.disk_cache.put(self._snapshot_key(), data)
+        return data
+
+    def universe(self):
+        """Full-market table (CRYPTOBUDDY_UNIVERSE_PAGES pages of 250), or None when that mode is off."""
+        if not self.universe_pages:
+            return None
+        if self._universe is None or time.time() - self._universe.loaded_at > UNIVERSE_MAX_AGE:
+            table = ingest_universe(self.universe_pages, fetch=self._fetch)
+            if len(table) or self._universe is None:
+                self._universe = table
+        return self._universe
+
+    def resolve_coin(self, text):
+        """CoinGecko ID for a tracked coin name or ID, or any name/symbol/ID in the universe."""
+        if text.title() in self.crypto_ids:
+            return self.crypto_ids[text.title()]
+        if text in self._names_by_id:
+            return text
+        universe = self.universe()
+        return universe.resolve(text) if universe else None
+
+    def display_name(self, coin_id):
+        if coin_id in self._names_by_id:
+            return self._names_by_id[coin_id]
+        record = self.universe().record(coin_id) if self.universe_pages else None
+        return record["name"] if record else coin_id.title()
+
+    def market_snapshot(self):
+        """The shared snapshot, in the current currency."""
+        return self._convert(self.market_cache.get())
+
+    def report_version(self):
+        """Identifies the data a rendered report was built from; refreshes the snapshot if due."""
+        snapshot = self.market_cache.get()
+        universe = self.universe()
+        currency = self.quote_currency()
+        fx_version = None if currency == BASE_CURRENCY else self._fx().version
+        return (self.market_cache.version, universe.loaded_at if universe is not None else None, currency, fx_version,
+                self.history_version([c["id"] for c in snapshot or ()]))
+
+    def history_version(self, coin_ids):
+        """Changes whenever the stored history behind `coin_ids`' indicators gains or corrects points."""
+        store = (self.indicator_cache or get_indicator_cache()).store
+        return tuple((series.last_ts, series.revision) for series in map(store.series, coin_ids))
+
+    # -------------------- Currency --------------------
+    @property
+    def currency(self):
+        """Requested quote currency: a session's override (see `in_currency`) or the default."""
+        return getattr(self._local, "currency", None) or self.default_currency
+
+    @contextmanager
+    def in_currency(self, currency):
+        """Answer in `currency` on this thread for the duration of the block."""
+        previous = getattr(self._local, "currency", None)
+        self._local.currency = currency
+        try:
+            yield
+        finally:
+            self._local.currency = previous
+
+    def _fx(self):
+        return self.fx or get_fx_table()
+
+    def quote_currency(self):
+        """`currency` if there is a rate for it, else USD; USD never touches the rate table."""
+        currency = self.currency
+        if currency == BASE_CURRENCY or self._fx().rate(currency) is None:
+            return BASE_CURRENCY
+        return currency
+
+    def _convert(self, records):
+        """USD markets records (or snapshot) in the quote currency."""
+        currency = self.quote_currency()
+        if not records or currency == BASE_CURRENCY:
+            return records
+        return self._fx().convert_snapshot(records, currency)
+
+    def to_currency(self, usd_amount):
+        currency = self.quote_currency()
+        return usd_amount if currency == BASE_CURRENCY else self._fx().convert(usd_amount, currency)
+
+    def money(self, amount, decimals=None):
+        return format_money(amount, self.quote_currency(), decimals)
+
+    def set_currency(self, code):
+        """Switch the default quote currency; the reply says whether it worked."""
+        code = code.lower()
+        if code != BASE_CURRENCY and self._fx().rate(code) is None:
+            return f"\nSorry, no exchange rate for {code.upper()}. Try: USD, EUR, GBP, JPY.\n"
+        self.default_currency = code
+        return f"\nPrices are now shown in {code.upper()}.\n"
+
+    # -------------------- Alerts --------------------
+    @property
+    def alert_owner(self):
+        """Whose alerts commands on this thread manage: a chat user (see `as_user`) or the CLI."""
+        return getattr(self._local, "owner", None) or "cli"
+
+    @contextmanager
+    def as_user(self, owner):
+        previous = getattr(self._local, "owner", None)
+        self._local.owner = owner
+        try:
+            yield
+        finally:
+            self._local.owner = previous
+
+    def answer_alert(self, text):
+        def resolve(name):
+            return self.resolve_coin(name) or self.coin_aliases.get(name.lower())
+
+        def price_of(coin_id):
+            record = self.lookup_coins([coin_id], fields=("current_price",)).get(coin_id)
+            return record.get("current_price") if record else None
+
+        return answer_alert_command(text, self.alerts, self.alert_owner, resolve, price_of, self.display_name,
+                                    self.quote_currency(), self._fx(), self.indicators)
+
+    def check_alerts(self, snapshot):
+        """Evaluate alerts against a new USD snapshot; coins it lacks are priced in one batched request."""
+        if not len(self.alerts):
+            return []
+        fired = self.alerts.evaluate_snapshot(snapshot or (), self.indicators)
+        present = {coin["id"] for coin in snapshot or ()}
+        missing = [cid for cid in self.alerts.watched() if cid not in present]
+        if missing:
+            records = self.lookup_coins(missing, fields=("current_price",))
+            fired += self.alerts.evaluate((cid, rec.get("current_price")) for cid, rec in records.items())
+        return fired
+
+    def alert_message(self, notification):
+        return alert_message(notification, self.quote_currency(), self._fx())
+
+    def start_alert_watch(self, interval=None):
+        """Keep the snapshot refreshing while idle, so alerts fire without anyone asking."""
+        if self._alert_watch is not None:
+            return
+        interval = interval or self.market_cache.ttl
+
+        def run():
+            while True:
+                time.sleep(interval)
+                if len(self.alerts):
+                    try:
+                        self.market_cache.get()
+                    except Exception:
+                        inc("cryptobuddy_errors_total", where="alert_watch")
+
+        self._alert_watch = threading.Thread(target=run, name="alert-watch", daemon=True)
+        self._alert_watch.start()
+
+    def _market_frame(self, market_data):
+        # Columns are rebuilt only when the snapshot object or the history behind its trend column changes
+        ids = [c["id"] for c in market_data]
+        source = (market_data, self.history_version(ids))
+        if self._frame_source is None or self._frame_source[0] is not market_data or self._frame_source[1] != source[1]:
+            with span("frame"):
+                frame = MarketFrame.from_snapshot(market_data, self.sustainability_data)
+                indicators = self.indicators(frame.ids)
+                frame.trend[:] = [indicators[cid]["momentum"] if cid in indicators else float("nan")
+                                  for cid in frame.ids]
+            self._frame = frame
+            self._frame_source = source
+        return self._frame
+
+    def indicators(self, coin_ids):
+        """{id: latest indicator values} for coins with stored price history; no requests are made."""
+        cache = self.indicator_cache or get_indicator_cache()
+        out = {}
+        for cid in coin_ids:
+            series = cache.get(cid, self.indicator_days)
+            if series is not None:
+                out[cid] = series.latest()
+        return out
+
+    def metric_samples(self):
+        """Cache hit/miss counters as (name, type, labels, value) samples for /metrics."""
+        caches = {"market_snapshot": self.market_cache, "report": self.report_cache, "disk": self.disk_cache}
+        out = []
+        for name, cache in caches.items():
+            out.append(("cryptobuddy_cache_hits_total", "counter", {"cache": name}, cache.hits))
+            out.append(("cryptobuddy_cache_misses_total", "counter", {"cache": name}, cache.misses))
+        indicators = self.indicator_cache or get_indicator_cache()
+        out.append(("cryptobuddy_indicator_rebuilds_total", "counter", {}, indicators.rebuilds))
+        out.append(("cryptobuddy_snapshot_version", "gauge", {}, self.market_cache.version))
+        return out
+
+    def lookup_coins(self, coin_ids, fields=MARKET_FIELDS):
+        """Flat /coins/markets records for `coin_ids`, keyed by ID.
+
+        Hits come from the snapshot; misses are batched into a single
+        /coins/markets request. /coins/{id} is only used for a coin whose
+        markets record lacks one of the requested `fields`.
+        """
+        found = self.market_cache.coins(coin_ids)
+        missing = [cid for cid in coin_ids if cid not in found]
+        upstream_ok = True
+        if missing:
+            batch = self.fetch_market_data(missing)
+            upstream_ok = batch is not None
+            for coin in batch or []:
+                found[coin["id"]] = coin
+        need_detail = [
+            cid for cid in coin_ids
+            if (found.get(cid) is None and upstream_ok)
+            or (found.get(cid) is not None and any(found[cid].get(f) is None for f in fields))
+        ]
+        # Markets endpoint down means the heavier detail endpoint won't fare better,
+        # so coins with no record at all only get a detail fetch when it answered
+        for cid, detail in self.fetch_coin_details(need_detail).items():
+            try:
+                found[cid] = {**found.get(cid, {}), **self._flatten_detail(detail)}
+            except (KeyError, TypeError):
+                continue
+        return found
+
+    def fetch_coin_details(self, coin_ids):
+        """/coins/{id} for several coins at once; wall time is the slowest call, not the sum."""
+        jobs = {cid: (f"{self.base_url}/coins/{cid}", DETAIL_PARAMS) for cid in coin_ids}
+        return fetch_many(jobs, fetch=self._fetch)
+
+    @staticmethod
+    def _flatten_detail(data):
+        md = data["market_data"]
+        return {
+            "id": data["id"],
+            "name": data["name"],
+            "symbol": data["symbol"],
+            "current_price": md["current_price"]["usd"],
+            "price_change_percentage_24h": md["price_change_percentage_24h"],
+            "market_cap": md["market_cap"]["usd"],
+            "market_cap_rank": data.get("market_cap_rank"),
+            "total_volume": md["total_volume"]["usd"],
         }
-        return self._fetch(url, params)
 
     # -------------------- Features --------------------
     def get_price(self, crypto_name):
-        if crypto_name.title() not in self.crypto_ids:
+        coin_id = self.resolve_coin(crypto_name)
+        if not coin_id:
             return f"\n			Sorry, I don't have data for {crypto_name}. Try: {', '.join(self.crypto_ids.keys())}\n"
-        coin_id = self.crypto_ids[crypto_name.title()]
-        data = self.fetch_coin_data(coin_id)
+        data = self.lookup_coins([coin_id]).get(coin_id)
         if not data:
             # Offline fallback
             return self._offline_price(crypto_name.title())
+        if self.price_table is not None:
+            data = self.price_table.overlay([data], max_age=self.market_cache.ttl)[0]
+        data = self._convert([data])[0]
 
         try:
-            price = data["market_data"]["current_price"]["usd"]
-            change_24h = data["market_data"]["price_change_percentage_24h"]
-            market_cap = data["market_data"]["market_cap"]["usd"]
-            volume = data["market_data"]["total_volume"]["usd"]
-            response = f"\n			{data['name']} ({data['symbol'].upper()}) - LIVE DATA\n"
-            response += "-" * 70 + "\n"
-            response += f"   Current Price: ${price:,.2f}\n"
-            response += (
+            price = data["current_price"]
+            change_24h = data.get("price_change_percentage_24h") or 0
+            market_cap = data["market_cap"]
+            volume = data["total_volume"]
+            parts = [f"\n			{data['name']} ({data['symbol'].upper()}) - LIVE DATA\n"]
+            parts.append("-" * 70 + "\n")
+            parts.append(f"   Current Price: {self.money(price)}\n")
+            parts.append(
                 f"   24h Change:  {change_24h:+.2f}%\n".replace("\u000f", "\U0001F4C8" if change_24h and change_24h > 0 else "\U0001F4C9")
             )
-            response += f"   Market Cap: ${market_cap:,.0f}\n"
-            response += f"   24h Volume: ${volume:,.0f}\n"
+            parts.append(f"   Market Cap: {self.money(market_cap, 0)}\n")
+            parts.append(f"   24h Volume: {self.money(volume, 0)}\n")
             if coin_id in self.sustainability_data:
                 sus = self.sustainability_data[coin_id]
-                response += f"\n   			Sustainability: {sus['sustainability_score']}/10\n"
-                response += f"   			Energy Use: {sus['energy_use'].upper()}\n"
-                response += f"   			Consensus: {sus['consensus']}\n"
-            response += "\n"
-            return response
+                parts.append(f"\n   			Sustainability: {sus['sustainability_score']}/10\n")
+                parts.append(f"   			Energy Use: {sus['energy_use'].upper()}\n")
+                parts.append(f"   			Consensus: {sus['consensus']}\n")
+            parts.append("\n")
+            return "".join(parts)
         except Exception as e:
+            inc("cryptobuddy_errors_total", where="get_price")
             return f"\n			Error parsing price data: {e}\n"
 
+    @cached_report("find_trending")
     def find_trending(self):
-        market_data = self.fetch_market_data()
+        market_data = self.market_snapshot()
         if not market_data:
             return self._offline_trending()
         trending = [c for c in market_data if c.get("price_change_percentage_24h", 0) > 0]
         trending.sort(key=lambda x: x.get("price_change_percentage_24h", 0), reverse=True)
-        response = "\n			TRENDING CRYPTOCURRENCIES (LIVE DATA):\n" + "=" * 70 + "\n"
+        indicators = self.indicators([c["id"] for c in trending[:5]])
+        parts = ["\n			TRENDING CRYPTOCURRENCIES (LIVE DATA):\n" + "=" * 70 + "\n"]
         for coin in trending[:5]:
             change_24h = coin.get("price_change_percentage_24h", 0)
-            response += f"\n			{coin['name']} ({coin['symbol'].upper()})\n"
-            response += f"   Price: ${coin['current_price']:,.2f}\n"
-            response += f"   24h Change: {change_24h:+.2f}%\n"
-            response += f"   Market Cap: ${coin['market_cap']:,.0f}\n"
+            parts.append(f"\n			{coin['name']} ({coin['symbol'].upper()})\n")
+            parts.append(f"   Price: {self.money(coin['current_price'])}\n")
+            parts.append(f"   24h Change: {change_24h:+.2f}%\n")
+            parts.append(f"   Market Cap: {self.money(coin['market_cap'], 0)}\n")
+            ind = indicators.get(coin["id"])
+            if ind and not (math.isnan(ind["rsi"]) or math.isnan(ind["momentum"])):
+                parts.append(f"   RSI(14): {ind['rsi']:.0f} | Momentum: {ind['momentum']:+.2f}%\n")
             if coin["id"] in self.sustainability_data:
                 sus = self.sustainability_data[coin["id"]]["sustainability_score"]
-                response += f"   Sustainability: {sus}/10\n"
-        response += "\n"
-        return response
+                parts.append(f"   Sustainability: {sus}/10\n")
+        parts.append("\n")
+        return "".join(parts)
 
     def find_sustainable(self):
         most_id = max(self.sustainability_data.items(), key=lambda x: x[1]["sustainability_score"])[0]
-        data = self.fetch_coin_data(most_id)
+        data = self.lookup_coins([most_id], fields=("current_price", "price_change_percentage_24h")).get(most_id)
+        if data:
+            data = self._convert([data])[0]
         if not data:
             # Offline
             best = max(self.offline_db.items(), key=lambda x: x[1]["sustainability_score"])[0]
             return f"\n			Most sustainable (offline): {best} \U0001F331\n"
         sus = self.sustainability_data[most_id]
-        price = data["market_data"]["current_price"]["usd"]
-        change = data["market_data"]["price_change_percentage_24h"]
-        response = "\n			MOST SUSTAINABLE CRYPTO (LIVE DATA):\n" + "=" * 70 + "\n"
-        response += f"{data['name']} ({data['symbol'].upper()})\n\n"
-        response += f"   Price: ${price:,.2f}\n"
-        response += f"   24h Change: {change:+.2f}%\n"
-        response += f"   Sustainability: {sus['sustainability_score']}/10\n"
-        response += f"   Energy: {sus['energy_use'].upper()}\n"
-        response += f"   Consensus: {sus['consensus']}\n\n"
-        return response
-
+        price = data["current_price"]
+        change = data["price_change_percentage_24h"]
+        parts = ["\n			MOST SUSTAINABLE CRYPTO (LIVE DATA):\n" + "=" * 70 + "\n"]
+        parts.append(f"{data['name']} ({data['symbol'].upper()})\n\n")
+        parts.append(f"   Price: {self.money(price)}\n")
+        parts.append(f"   24h Change: {change:+.2f}%\n")
+        parts.append(f"   Sustainability: {sus['sustainability_score']}/10\n")
+        parts.append(f"   Energy: {sus['energy_use'].upper()}\n")
+        parts.append(f"   Consensus: {sus['consensus']}\n\n")
+        return "".join(parts)
+
+    @cached_report("find_long_term")
     def find_long_term(self):
-        market_data = self.fetch_market_data()
+        market_data = self.market_snapshot()
         if not market_data:
             # Offline heuristic: rising + high/medium cap, high sustainability
-            ranked = []
-            for name, meta in self.offline_db.items():
-                score = 0
-                if meta["price_trend"] == "rising":
-                    score += 3
-                if meta["market_cap"] == "high":
-                    score += 2
-                elif meta["market_cap"] == "medium":
-                    score += 1
-                score += meta["sustainability_score"] * 0.3
-                ranked.append((name, score))
-            ranked.sort(key=lambda x: x[1], reverse=True)
-            top = ", ".join([f"{n} ({s:.1f})" for n, s in ranked[:3]])
+            frame = MarketFrame.from_offline(self.offline_db)
+            ranked = rank(frame, self.offline_long_term_weights, 3)
+            top = ", ".join([f"{frame.ids[i]} ({s:.1f})" for i, s in ranked])
             return f"\n			Best for long-term (offline): {top}\n"
 
-        candidates = []
-        for coin in market_data:
-            score = 0
-            if coin.get("price_change_percentage_24h", 0) > 0:
-                score += 3
-            if coin["market_cap_rank"] <= 10:
-                score += 2
-            cid = coin["id"]
-            if cid in self.sustainability_data:
-                sus = self.sustainability_data[cid]["sustainability_score"]
-                if sus >= 7:
-                    score += 3
-                score += sus * 0.2
-            candidates.append((coin, score))
-        candidates.sort(key=lambda x: x[1], reverse=True)
-        response = "\n			BEST FOR LONG-TERM GROWTH (LIVE DATA):\n" + "=" * 70 + "\n"
-        for i, (coin, score) in enumerate(candidates[:3], 1):
-            response += f"\n{i}. {coin['name']} ({coin['symbol'].upper()}) - Score: {score:.1f}/10\n"
-            response += f"   Price: ${coin['current_price']:,.2f}\n"
-            response += f"   24h Change: {coin.get('price_change_percentage_24h', 0):+.2f}%\n"
-            response += f"   Market Cap Rank: #{coin['market_cap_rank']}\n"
+        candidates = [(market_data[i], s) for i, s in rank(self._market_frame(market_data), self.long_term_weights, 3)]
+        parts = ["\n			BEST FOR LONG-TERM GROWTH (LIVE DATA):\n" + "=" * 70 + "\n"]
+        for i, (coin, score) in enumerate(candidates, 1):
+            parts.append(f"\n{i}. {coin['name']} ({coin['symbol'].upper()}) - Score: {score:.1f}/10\n")
+            parts.append(f"   Price: {self.money(coin['current_price'])}\n")
+            parts.append(f"   24h Change: {coin.get('price_change_percentage_24h', 0):+.2f}%\n")
+            parts.append(f"   Market Cap Rank: #{coin['market_cap_rank']}\n")
             if coin["id"] in self.sustainability_data:
                 sus = self.sustainability_data[coin["id"]]["sustainability_score"]
-                response += f"   Sustainability: {sus}/10\n"
-        response += "\n"
-        return response
+                parts.append(f"   Sustainability: {sus}/10\n")
+        parts.append("\n")
+        return "".join(parts)
 
-    def show_all(self):
-        market_data = self.fetch_market_data()
+    @cached_report("show_all")
+    def show_all(self, page=1):
+        market_data = self.market_snapshot()
         if not market_data:
             # Offline list
             lines = ["\n			ALL CRYPTOCURRENCIES (OFFLINE):", "=" * 70]
@@ -280,26 +669,43 @@ class CryptoBuddy:
                 lines.append(f"\n{name}\n   Trend: {meta['price_trend']} | Cap: {meta['market_cap']} | Sustainability: {meta['sustainability_score']}/10")
             lines.append("\n")
             return "\n".join(lines)
-        response = "\n			ALL CRYPTOCURRENCIES (LIVE DATA):\n" + "=" * 70 + "\n"
-        for coin in market_data:
-            response += f"\n{coin['name']} ({coin['symbol'].upper()})\n"
-            response += f"   Price: ${coin['current_price']:,.2f} | 24h: {coin.get('price_change_percentage_24h', 0):+.2f}%\n"
-            response += f"   Market Cap: ${coin['market_cap']:,.0f}\n"
+        # Full-market mode lists the whole universe; only the requested page is rendered
+        universe = self.universe()
+        ids = universe.ids if universe is not None and len(universe) else [c["id"] for c in market_data]
+        pages = max(1, -(-len(ids) // PAGE_SIZE))
+        page = min(max(page, 1), pages)
+        if universe is not None and len(universe):
+            coins = self._convert([universe.record(cid) for cid in ids[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]])
+        else:
+            coins = market_data[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+
+        parts = ["\n			ALL CRYPTOCURRENCIES (LIVE DATA):\n" + "=" * 70 + "\n"]
+        for coin in coins:
+            parts.append(f"\n{coin['name']} ({coin['symbol'].upper()})\n")
+            parts.append(f"   Price: {self.money(coin['current_price'])} | 24h: {coin.get('price_change_percentage_24h') or 0:+.2f}%\n")
+            parts.append(f"   Market Cap: {self.money(coin['market_cap'], 0)}\n")
             if coin["id"] in self.sustainability_data:
                 sus = self.sustainability_data[coin["id"]]
-                response += f"   Sustainability: {sus['sustainability_score']}/10 | Energy: {sus['energy_use']}\n"
-        response += "\n" + "=" * 70 + "\n"
-        return response
-
-    def compare_coins(self, query):
-        names = [n for n in self.crypto_ids.keys() if n.lower() in query.lower()]
-        if len(names) < 2:
+                parts.append(f"   Sustainability: {sus['sustainability_score']}/10 | Energy: {sus['energy_use']}\n")
+        if pages > 1:
+            more = f" - say 'show all page {page + 1}' for more" if page < pages else ""
+            parts.append(f"\nPage {page}/{pages} ({len(ids)} coins){more}\n")
+        parts.append("\n" + "=" * 70 + "\n")
+        return "".join(parts)
+
+    def compare_coins(self, query, coin_ids=None):
+        if coin_ids is None:
+            coin_ids = self._router().route(query).coins
+        if len(coin_ids) < 2:
             return ("\nPlease specify two cryptocurrencies to compare.\n"
                     f"Available: {', '.join(self.crypto_ids.keys())}\n"
                     "Example: 'compare Bitcoin and Ethereum'\n")
-        c1, c2 = names[0], names[1]
-        id1, id2 = self.crypto_ids[c1], self.crypto_ids[c2]
-        d1, d2 = self.fetch_coin_data(id1), self.fetch_coin_data(id2)
+        id1, id2 = coin_ids[0], coin_ids[1]
+        c1, c2 = self.display_name(id1), self.display_name(id2)
+        coins = self.lookup_coins([id1, id2], fields=("current_price", "price_change_percentage_24h", "market_cap"))
+        d1, d2 = coins.get(id1), coins.get(id2)
+        if d1 and d2:
+            d1, d2 = self._convert([d1, d2])
         if not d1 or not d2:
             # Offline compare by sustainability + trend
             s1 = self.sustainability_data.get(id1, {}).get("sustainability_score", 0)
@@ -310,20 +716,18 @@ class CryptoBuddy:
                     f"   Sustainability: {s1}/10 vs {s2}/10\n"
                     f"   Trend: {t1} vs {t2}\n")
         try:
-            p1 = d1["market_data"]["current_price"]["usd"]
-            p2 = d2["market_data"]["current_price"]["usd"]
-            ch1 = d1["market_data"]["price_change_percentage_24h"]
-            ch2 = d2["market_data"]["price_change_percentage_24h"]
-            m1 = d1["market_data"]["market_cap"]["usd"]
-            m2 = d2["market_data"]["market_cap"]["usd"]
+            p1, p2 = d1["current_price"], d2["current_price"]
+            ch1, ch2 = d1["price_change_percentage_24h"], d2["price_change_percentage_24h"]
+            m1, m2 = d1["market_cap"], d2["market_cap"]
         except Exception:
+            inc("cryptobuddy_errors_total", where="compare_coins")
             return "\nUnable to parse comparison data.\n"
         lines = [
             f"\nComparison (live): {c1} vs {c2}",
             "=" * 70,
-            f"Current Price\t ${p1:,.2f}\t\t ${p2:,.2f}",
+            f"Current Price\t {self.money(p1)}\t\t {self.money(p2)}",
             f"24h Change\t {ch1:+.2f}%\t\t {ch2:+.2f}%",
-            f"Market Cap\t ${m1:,.0f}\t ${m2:,.0f}",
+            f"Market Cap\t {self.money(m1, 0)}\t {self.money(m2, 0)}",
         ]
         if id1 in self.sustainability_data and id2 in self.sustainability_data:
             s1 = self.sustainability_data[id1]
@@ -332,47 +736,24 @@ class CryptoBuddy:
             lines.append(f"Energy Use\t {s1['energy_use']}\t\t {s2['energy_use']}")
         return "\n".join(lines) + "\n"
 
+    @cached_report("balanced_recommendation")
     def balanced_recommendation(self):
-        market_data = self.fetch_market_data()
+        market_data = self.market_snapshot()
         if not market_data:
             # Offline balanced: rising + medium/high cap + sustainability
-            best_name = None
-            best_score = -1
-            for name, meta in self.offline_db.items():
-                score = 0
-                if meta["price_trend"] == "rising":
-                    score += 3
-                if meta["market_cap"] == "high":
-                    score += 2
-                elif meta["market_cap"] == "medium":
-                    score += 1
-                score += meta["sustainability_score"] * 0.4
-                if score > best_score:
-                    best_name, best_score = name, score
-            return f"\nBalanced pick (offline): {best_name} with score {best_score:.1f}/10\n"
-
-        scores = {}
-        for coin in market_data:
-            score = 0
-            change = coin.get("price_change_percentage_24h", 0)
-            if change > 0:
-                score += 3 + min(change * 0.1, 2)
-            if coin["market_cap_rank"] <= 5:
-                score += 2
-            elif coin["market_cap_rank"] <= 15:
-                score += 1
-            cid = coin["id"]
-            if cid in self.sustainability_data:
-                score += self.sustainability_data[cid]["sustainability_score"] * 0.4
-            scores[cid] = (score, coin)
-        winner_id = max(scores, key=lambda x: scores[x][0])
-        winner_score, coin = scores[winner_id]
+            frame = MarketFrame.from_offline(self.offline_db)
+            (best, best_score), = rank(frame, self.offline_balanced_weights, 1)
+            return f"\nBalanced pick (offline): {frame.ids[best]} with score {best_score:.1f}/10\n"
+
+        (winner, winner_score), = rank(self._market_frame(market_data), self.balanced_weights, 1)
+        coin = market_data[winner]
+        winner_id = coin["id"]
         lines = [
             "\nCRYPTOBUDDY'S BALANCED PICK (LIVE DATA):",
             "=" * 70,
             f"Winner: {coin['name']} ({coin['symbol'].upper()})",
             f"Score: {winner_score:.1f}/10",
-            f"Price: ${coin['current_price']:,.2f}",
+            f"Price: {self.money(coin['current_price'])}",
             f"24h: {coin.get('price_change_percentage_24h', 0):+.2f}%",
             f"Market Cap Rank: #{coin['market_cap_rank']}",
         ]
@@ -383,6 +764,10 @@ class CryptoBuddy:
         return "\n".join(lines)
 
     # -------------------- Offline Helpers --------------------
+    def _offline_trending(self):
+        rising = [name for name, meta in self.offline_db.items() if meta["price_trend"] == "rising"]
+        return f"\n			Trending (offline): {', '.join(rising) or 'no rising coins'}\n"
+
     def _offline_price(self, name):
         meta = self.offline_db.get(name)
         if not meta:
@@ -392,33 +777,52 @@ class CryptoBuddy:
                 f"   Sustainability: {meta['sustainability_score']}/10 | Energy: {meta['energy_use']}\n")
 
     # -------------------- Router --------------------
+    def _router(self):
+        # Rebuilt only when the full-market table behind it changes
+        universe = self.universe()
+        if self._router_cache is None or self._router_universe is not universe:
+            self._router_cache = IntentRouter(self.coin_aliases, universe.index if universe else None)
+            self._router_universe = universe
+        return self._router_cache
+
+    def _answer_price(self, route, user_input):
+        if route.coins:
+            return self.get_price(route.coins[0])
+        return self.show_all()
+
+    def mentioned_coins(self, user_input):
+        """Coin IDs the router finds in a message, without answering it."""
+        return self._router().route(user_input).coins
+
     def process_response(self, user_input):
-        q = user_input.lower()
-        if "price" in q:
-            for coin in self.crypto_ids.keys():
-                if coin.lower() in q:
-                    return self.get_price(coin)
-            return self.show_all()
-        if any(w in q for w in ["trending", "rising", "hot", "growing"]):
-            return self.find_trending()
-        if any(w in q for w in ["sustainable", "green", "eco", "environment"]):
-            return self.find_sustainable()
-        if any(w in q for w in ["long-term", "long term", "growth", "future"]):
-            return self.find_long_term()
-        if "compare" in q:
-            return self.compare_coins(user_input)
-        if any(w in q for w in ["all", "list", "show all"]):
-            return self.show_all()
-        if any(w in q for w in ["recommend", "best", "balanced", "invest"]):
-            return self.balanced_recommendation()
-        if self.chatbot:
+        return self.answer(user_input)[1]
+
+    def answer(self, user_input):
+        """`(intent, reply)` for one message; `process_response` without the intent."""
+        match = CURRENCY_RE.match(user_input)
+        if match:
+            return "currency", self.set_currency(match.group(1))
+        if is_alert_command(user_input):
+            with span("command", intent="alert"):
+                return "alert", self.answer_alert(user_input)
+        route = self._router().route(user_input)
+        intent = route.intent or "fallback"
+        with profiled(intent), span("command", intent=intent):
+            return intent, self._respond(route, user_input)
+
+    def _respond(self, route, user_input):
+        handler = self.intent_handlers.get(route.intent)
+        if handler:
+            return handler(route, user_input)
+        if self._ensure_chatbot():
             try:
                 return f"\n{self.chatbot.get_response(user_input)}\n"
             except Exception:
-                pass
+                inc("cryptobuddy_errors_total", where="chatbot")
         return "\nI'm not sure about that. Try asking about trending coins, prices, sustainability, or investment advice!\n"
 
     def run(self):
+        start_metrics_server()
         self.greet()
         print("Disclaimer: This bot may use real-time data from CoinGecko. Crypto is risky.")
         print("Always do your own research!\n")
@@ -430,8 +834,13 @@ class CryptoBuddy:
         print(" - Compare Bitcoin and Ethereum")
         print(" - Show all cryptocurrencies")
         print(" - Give me a recommendation")
+        print(" - Currency EUR (or USD, GBP, JPY)")
+        print(" - Tell me when BTC drops below 50000 (then: my alerts, cancel alert 1)")
         print("\nType 'bye', 'exit', or 'quit' to end\n")
         print("-" * 70)
+        # Fired alerts (including ones queued while the bot was closed) print as they arrive
+        self.alerts.subscribe(self.alert_owner, lambda note: print(f"\n{self.alert_message(note)}\n"))
+        self.start_alert_watch()
         while True:
             try:
                 user_input = input("\nYou: ").strip()
@@ -450,6 +859,11 @@ class CryptoBuddy:
             print("-" * 70)
 
 
+def _page_number(text):
+    match = PAGE_RE.search(text.lower())
+    return int(match.group(1)) if match else 1
+
+
 def print_installation():
     print(
         """
@@ -462,8 +876,22 @@ pip install chatterbot==1.0.8 chatterbot-corpus SQLAlchemy==1.4.46 pytz
 Run the bot:
 python crypto_buddy.py
 
+Serve it to many clients (JSON lines over TCP):
+python crypto_buddy.py serve --port 8765
+
+Answer a file of queries (text or JSONL) as JSON lines, from one snapshot:
+python crypto_buddy.py batch queries.txt -o results.jsonl
+
+Export the market or stored price history (CSV, JSONL or Parquet, streamed in chunks):
+python crypto_buddy.py export market -o market.parquet
+python crypto_buddy.py export history --coins bitcoin --start 2024-01-01 -o bitcoin.csv
+
 Set an API key (optional, demo key by default):
 export COINGECKO_API_KEY=your_key_here
+
+Diagnostics (optional):
+export CRYPTOBUDDY_METRICS_PORT=9108       # Prometheus text at http://127.0.0.1:9108/metrics
+export CRYPTOBUDDY_PROFILE=./profiles      # cProfile + tracemalloc dump per command
         """
     )
 
@@ -472,5 +900,18 @@ if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "install":
         print_installation()
         sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from chat_server import main
+
+        main(sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        from export import main
+
+        sys.exit(main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from batch import main
+
+        sys.exit(main(sys.argv[2:]))
     bot = CryptoBuddy()
     bot.run() 
\ No newline at end of file
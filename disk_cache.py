@@ -0,0 +1,136 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from collections.abc import Mapping, Sequence
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+Entry = namedtuple("Entry", ["value", "fetched_at"])
+
+
+def default_cache_path():
+    root = os.getenv("CRYPTOBUDDY_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "cryptobuddy")
+    return os.path.join(root, "cache.sqlite3")
+
+
+class DiskCache:
+    """SQLite-backed last-known-good store for market snapshots and chart series.
+
+    Values are JSON documents stamped with the time they were fetched. When
+    the stored payloads grow past `max_bytes`, the least recently read entries
+    are evicted first. Pass ":memory:" as `path` for a throwaway cache.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES, clock=time.time):
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        self._clock = clock
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, fetched_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (self._clock(), key))
+        return Entry(json.loads(row[0]), row[1])
+
+    def put(self, key, value, fetched_at=None):
+        blob = json.dumps(value, separators=(",", ":"), default=_plain)
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), fetched_at if fetched_at is not None else now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def size(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+
+    def cached_fetch(self, key, loader, max_age):
+        """Stored value if younger than `max_age`; an older one is returned at once while
+        `loader` refreshes it in the background. With nothing stored, load synchronously."""
+        entry = self.get(key)
+        if entry is None:
+            value = loader()
+            if value:
+                self.put(key, value)
+            return value
+        if self._clock() - entry.fetched_at >= max_age:
+            self._refresh_in_background(key, loader)
+        return entry.value
+
+    def _refresh_in_background(self, key, loader):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                value = loader()
+                if value:
+                    self.put(key, value)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f"disk-cache-refresh:{key}", daemon=True).start()
+
+
+def _plain(value):
+    """JSON fallback for read-only mappings and sequences such as MarketRecord and MarketSnapshot."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, Sequence):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_disk_cache():
+    """Process-wide cache at `default_cache_path()` (override with CRYPTOBUDDY_CACHE_DIR)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache()
+    return _cache
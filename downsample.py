@@ -0,0 +1,58 @@
+import numpy as np
+
+# Roughly two points per horizontal pixel of a full-width chart
+CHART_POINTS = 1500
+
+
+def lttb_indices(x, y, n):
+    """Indices of the `n` points Largest-Triangle-Three-Buckets keeps from (x, y).
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the next bucket's average, which preserves peaks and
+    troughs far better than striding. Returns all indices when `n >= len(y)`.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+
+    edges = (np.arange(n - 1) * (size - 2) / (n - 2)).astype(np.intp) + 1
+    edges[-1] = size - 1
+    # Bucket averages up front; bucket n-2 is the last point on its own
+    starts = np.append(edges[:-1], size - 1)
+    counts = np.diff(np.append(starts, size))
+    avg_x = np.add.reduceat(x, starts) / counts
+    avg_y = np.add.reduceat(y, starts) / counts
+
+    out = np.empty(n, dtype=np.intp)
+    out[0], out[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, n):
+    """Indices of each bucket's minimum and maximum (about `n` points in all), in order."""
+    y = np.asarray(y, dtype=np.float64)
+    size = len(y)
+    buckets = max(1, n // 2)
+    if n >= size or size <= 2:
+        return np.arange(size)
+    bucket = np.arange(size) * buckets // size
+    order = np.lexsort((y, bucket))
+    first = np.flatnonzero(np.diff(bucket[order], prepend=-1))
+    last = np.append(first[1:] - 1, size - 1)
+    keep = np.union1d(order[first], order[last])
+    return np.union1d(keep, [0, size - 1])
+
+
+def downsample_indices(x, y, n=CHART_POINTS, method="lttb"):
+    if method == "minmax":
+        return minmax_indices(y, n)
+    return lttb_indices(x, y, n)
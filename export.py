@@ -0,0 +1,295 @@
+"""Chunked export of market snapshots and stored price history to CSV, JSONL or Parquet.
+
+Sources yield column chunks (`{column: list or array}`) of bounded size and
+`export` writes each one out before asking for the next: market data a
+`/coins/markets` page at a time, history a memory-mapped slice of each
+coin's log at a time. Memory use therefore depends on the chunk size, not
+on how much is exported.
+
+    python export.py market -o market.parquet                     # whole market, page by page
+    python export.py history --coins bitcoin,ethereum --start 2024-01-01 -o btc_eth.csv
+    python export.py history --days 30 --columns coin_id,price --format jsonl -o -
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+
+import numpy as np
+
+from fx import BASE_CURRENCY, get_fx_table
+from market_model import FIELDS, MarketSnapshot, decode_markets
+from metrics import inc, span
+from price_history import DAY_MS, get_history_store
+from universe import PER_PAGE, page_params
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is the fallback
+    orjson = None
+
+FORMATS = ("csv", "jsonl", "parquet")
+MIME_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+CHUNK_ROWS = 50_000
+
+MARKET_COLUMNS = FIELDS
+HISTORY_COLUMNS = ("coin_id", "timestamp", "price")
+DATASETS = {"market": MARKET_COLUMNS, "history": HISTORY_COLUMNS}
+
+# Parquet types other than float64; CSV and JSONL write timestamps as ISO 8601 UTC strings
+_TYPES = {"id": "string", "symbol": "string", "name": "string", "coin_id": "string", "market_cap_rank": "int64",
+          "timestamp": "timestamp"}
+
+
+def columns_for(dataset, wanted=None):
+    """The dataset's columns, or the `wanted` subset in the order given; ValueError on unknown names."""
+    available = DATASETS[dataset]
+    if not wanted:
+        return available
+    wanted = tuple(c.strip() for c in wanted if c.strip())
+    unknown = [c for c in wanted if c not in available]
+    if unknown:
+        raise ValueError(f"unknown {dataset} column(s): {', '.join(unknown)} (choose from {', '.join(available)})")
+    return wanted
+
+
+def to_ms(value):
+    """Epoch milliseconds from None, a number (already ms), a date/datetime or an ISO 8601 string."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    return int(np.datetime64(value, "ms").astype("i8"))
+
+
+# -------------------- Sources --------------------
+def _market_chunk(records):
+    return {f: [getattr(r, f) for r in records] for f in MARKET_COLUMNS}
+
+
+def _in_currency(snapshot, currency):
+    return snapshot if currency == BASE_CURRENCY else get_fx_table().convert_snapshot(snapshot, currency)
+
+
+def snapshot_chunks(snapshot, chunk_rows=CHUNK_ROWS, currency=BASE_CURRENCY):
+    """Chunks of a snapshot that is already in memory (e.g. the dashboard's current view)."""
+    if not isinstance(snapshot, MarketSnapshot):
+        snapshot = MarketSnapshot(snapshot or ())
+    snapshot = _in_currency(snapshot, currency)
+    for i in range(0, len(snapshot), chunk_rows):
+        yield _market_chunk(snapshot[i:i + chunk_rows])
+
+
+def market_chunks(pages=None, per_page=PER_PAGE, fetch=None, currency=BASE_CURRENCY):
+    """The market by market cap, one `/coins/markets` page per chunk, up to `pages` pages (default: all).
+
+    The market ends at an empty or short page; a page that cannot be fetched
+    raises RuntimeError rather than passing a truncated export off as whole.
+    """
+    if fetch is None:
+        from coingecko import get_client
+
+        fetch = get_client().get
+    page = 1
+    while pages is None or page <= pages:
+        records = decode_markets(fetch("/coins/markets", page_params(page, per_page)))
+        if records is None:
+            raise RuntimeError(f"could not fetch markets page {page}")
+        if not records:
+            break
+        yield _market_chunk(_in_currency(records, currency))
+        if len(records) < per_page:
+            break
+        page += 1
+
+
+def history_chunks(coin_ids=None, start=None, end=None, store=None, chunk_rows=CHUNK_ROWS, currency=BASE_CURRENCY):
+    """Stored price points of `coin_ids` (default: every stored coin) between `start` and `end`.
+
+    Rows are grouped by coin, each in time order. Small coins are batched
+    together up to `chunk_rows` rows; nothing is fetched from CoinGecko.
+    """
+    store = store or get_history_store()
+    start_ms, end_ms = to_ms(start), to_ms(end)
+    fx = get_fx_table()
+    pending, size = [], 0
+    for coin_id in coin_ids or store.coins():
+        for points in store.iter_points(coin_id, start_ms, end_ms, chunk_rows):
+            pending.append((coin_id, fx.convert_points(points, currency)))
+            size += len(points)
+            if size >= chunk_rows:
+                yield _history_chunk(pending)
+                pending, size = [], 0
+    if pending:
+        yield _history_chunk(pending)
+
+
+def _history_chunk(parts):
+    points = np.concatenate([p for _, p in parts])
+    return {
+        "coin_id": [cid for cid, p in parts for _ in range(len(p))],
+        "timestamp": points["ts"].astype("datetime64[ms]"),
+        "price": points["price"],
+    }
+
+
+# -------------------- Writers --------------------
+def _cells(values):
+    """Plain Python values for CSV/JSON: NaN becomes None, timestamps ISO strings."""
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == "M":
+            return np.datetime_as_string(values, unit="ms", timezone="UTC").tolist()
+        return [None if v != v else v for v in values.tolist()]
+    return values
+
+
+class _CsvWriter:
+    def __init__(self, fh, columns):
+        self.columns = columns
+        self._text = io.TextIOWrapper(fh, encoding="utf-8", newline="", write_through=True)
+        self._csv = csv.writer(self._text)
+        self._csv.writerow(columns)
+
+    def write(self, chunk):
+        self._csv.writerows(zip(*(_cells(chunk[c]) for c in self.columns)))
+
+    def close(self):
+        self._text.flush()
+        self._text.detach()
+
+
+class _JsonlWriter:
+    def __init__(self, fh, columns):
+        self.columns = columns
+        self._fh = fh
+
+    def write(self, chunk):
+        rows = zip(*(_cells(chunk[c]) for c in self.columns))
+        columns = self.columns
+        # Lines go straight to the file: orjson's per-line buffers are far larger than the lines
+        if orjson is not None:
+            self._fh.writelines(orjson.dumps(dict(zip(columns, row)), option=orjson.OPT_APPEND_NEWLINE)
+                                for row in rows)
+        else:
+            self._fh.writelines((json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n").encode()
+                                for row in rows)
+
+    def close(self):
+        pass
+
+
+class _ParquetWriter:
+    """One row group per chunk."""
+
+    def __init__(self, fh, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        self.columns = columns
+        types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(),
+                 "timestamp": pa.timestamp("ms", tz="UTC")}
+        self.schema = pa.schema([(c, types[_TYPES.get(c, "float64")]) for c in columns])
+        self._writer = pq.ParquetWriter(fh, self.schema)
+
+    def write(self, chunk):
+        columns = {}
+        for c, field in zip(self.columns, self.schema):
+            values = chunk[c]
+            if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+                values = self._pa.array(values, from_pandas=True)  # NaN -> null
+            columns[c] = values
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+_WRITERS = {"csv": _CsvWriter, "jsonl": _JsonlWriter, "parquet": _ParquetWriter}
+
+
+def export(chunks, out, fmt="csv", columns=MARKET_COLUMNS):
+    """Write `chunks` to `out` (a path, "-" for stdout, or a binary file object); returns the row count.
+
+    A path is written to `<path>.part` and renamed when complete, so a
+    failed export never leaves a truncated file behind.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"unknown export format {fmt!r} (choose from {', '.join(FORMATS)})")
+    if out == "-":
+        return _write(chunks, sys.stdout.buffer, fmt, columns)
+    if not isinstance(out, (str, os.PathLike)):
+        return _write(chunks, out, fmt, columns)
+    part = f"{out}.part"
+    try:
+        with open(part, "wb") as fh:
+            rows = _write(chunks, fh, fmt, columns)
+        os.replace(part, out)
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+    return rows
+
+
+def _write(chunks, fh, fmt, columns):
+    rows = 0
+    with span("export", format=fmt):
+        writer = _WRITERS[fmt](fh, tuple(columns))
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+                rows += len(chunk[columns[0]])
+        finally:
+            writer.close()
+    inc("cryptobuddy_export_rows_total", rows, format=fmt)
+    return rows
+
+
+def format_for(path, default="csv"):
+    """Export format implied by a file name's extension."""
+    ext = os.path.splitext(str(path))[1].lstrip(".").lower()
+    return {"ndjson": "jsonl", "pq": "parquet"}.get(ext, ext if ext in FORMATS else default)
+
+
+# -------------------- CLI --------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream CryptoBuddy market data or stored price history to a file.")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("-o", "--output", default="-", help="file to write, or - for stdout (default)")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the output's extension, else csv")
+    parser.add_argument("--columns", help="comma-separated subset of columns, in output order")
+    parser.add_argument("--currency", default=BASE_CURRENCY, help="convert prices from USD (e.g. eur)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--pages", type=int, help="market: pages of 250 coins (default: the whole market)")
+    parser.add_argument("--coins", help="history: comma-separated coin IDs (default: every stored coin)")
+    parser.add_argument("--start", help="history: ISO date/time or epoch ms")
+    parser.add_argument("--end", help="history: ISO date/time or epoch ms")
+    parser.add_argument("--days", type=float, help="history: the last N days (instead of --start)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or format_for(args.output)
+    currency = args.currency.lower()
+    try:
+        columns = columns_for(args.dataset, args.columns.split(",") if args.columns else None)
+        if args.dataset == "market":
+            chunks = market_chunks(args.pages, currency=currency)
+        else:
+            start = args.start
+            if args.days is not None:
+                start = int(np.datetime64("now", "ms").astype("i8")) - int(args.days * DAY_MS)
+            coins = [c.strip() for c in args.coins.split(",") if c.strip()] if args.coins else None
+            chunks = history_chunks(coins, start, args.end, chunk_rows=args.chunk_rows, currency=currency)
+        rows = export(chunks, args.output, fmt, columns)
+    except (ValueError, RuntimeError) as e:
+        parser.exit(2, f"export: {e}\n")
+    if args.output != "-":
+        print(f"Wrote {rows:,} rows to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_COINS = [
+    {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin", "current_price": 60000.0, "market_cap": 1.18e12,
+     "market_cap_rank": 1, "total_volume": 3.1e10, "price_change_percentage_24h": 1.8},
+    {"id": "ethereum", "symbol": "eth", "name": "Ethereum", "current_price": 3000.0, "market_cap": 3.6e11,
+     "market_cap_rank": 2, "total_volume": 1.5e10, "price_change_percentage_24h": -0.6},
+    {"id": "binancecoin", "symbol": "bnb", "name": "BNB", "current_price": 550.0, "market_cap": 8.1e10,
+     "market_cap_rank": 4, "total_volume": 1.2e9, "price_change_percentage_24h": 0.4},
+    {"id": "solana", "symbol": "sol", "name": "Solana", "current_price": 150.0, "market_cap": 6.9e10,
+     "market_cap_rank": 5, "total_volume": 2.4e9, "price_change_percentage_24h": 3.2},
+    {"id": "ripple", "symbol": "xrp", "name": "XRP", "current_price": 0.52, "market_cap": 2.9e10,
+     "market_cap_rank": 7, "total_volume": 1.1e9, "price_change_percentage_24h": -1.1},
+    {"id": "dogecoin", "symbol": "doge", "name": "Dogecoin", "current_price": 0.12, "market_cap": 1.7e10,
+     "market_cap_rank": 9, "total_volume": 6.0e8, "price_change_percentage_24h": 5.5},
+    {"id": "cardano", "symbol": "ada", "name": "Cardano", "current_price": 0.45, "market_cap": 1.6e10,
+     "market_cap_rank": 10, "total_volume": 4.0e8, "price_change_percentage_24h": 2.1},
+    {"id": "polkadot", "symbol": "dot", "name": "Polkadot", "current_price": 6.5, "market_cap": 9.0e9,
+     "market_cap_rank": 14, "total_volume": 2.0e8, "price_change_percentage_24h": -2.4},
+]
+
+# Units of each currency per US dollar
+EXCHANGE_RATES = {
+    "usd": ("US Dollar", "$", 1.0),
+    "eur": ("Euro", "€", 0.92),
+    "gbp": ("British Pound Sterling", "£", 0.79),
+    "jpy": ("Japanese Yen", "¥", 150.0),
+}
+
+_COIN_PATH = re.compile(r"^/api/v3/coins/([^/]+)(/market_chart(/range)?)?$")
+
+
+class FakeCoinGecko:
+    """Local stand-in for the CoinGecko v3 API, for tests and benchmarks.
+
+    Serves /coins/markets, /coins/{id}, /coins/{id}/market_chart and
+    /coins/{id}/market_chart/range and /exchange_rates on a random localhost port, from
+    `coins`, from a `fixtures` directory written by `record_fixtures`, or
+    from built-in sample coins. Charts without a recording get a
+    deterministic synthetic series.
+
+    Failure injection: `latency` (+ up to `jitter`) delays every response,
+    IDs in `fail_ids` always answer HTTP 500, `error_rate` of all requests
+    answer 500 at random, and more than `rate_limit` requests within a
+    second answer 429 with `Retry-After: retry_after`.
+    """
+
+    def __init__(self, coins=None, latency=0.0, fail_ids=(), fixtures=None, jitter=0.0, error_rate=0.0,
+                 rate_limit=None, retry_after=1, seed=0, port=0):
+        self.charts = {}
+        if fixtures:
+            coins, self.charts = load_fixtures(fixtures)
+        self.coins = {c["id"]: c for c in (coins or DEFAULT_COINS)}
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_ids = set(fail_ids)
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.requests = []
+        self.statuses = Counter()
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._anchor_ms = int(time.time() * 1000)
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v3"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-coingecko", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -------------------- Payloads --------------------
+    def markets(self, query):
+        ids = query.get("ids", [""])[0]
+        coins = [self.coins[i] for i in ids.split(",") if i in self.coins] if ids else list(self.coins.values())
+        coins.sort(key=lambda c: c["market_cap_rank"])
+        if "page" in query:
+            per_page = int(query.get("per_page", ["100"])[0])
+            page = int(query["page"][0])
+            coins = coins[(page - 1) * per_page:page * per_page]
+        return coins
+
+    def coin(self, coin_id):
+        c = self.coins[coin_id]
+        return {
+            "id": c["id"],
+            "symbol": c["symbol"],
+            "name": c["name"],
+            "market_cap_rank": c["market_cap_rank"],
+            "market_data": {
+                "current_price": {"usd": c["current_price"]},
+                "price_change_percentage_24h": c["price_change_percentage_24h"],
+                "market_cap": {"usd": c["market_cap"]},
+                "total_volume": {"usd": c["total_volume"]},
+            },
+        }
+
+    def market_chart(self, coin_id, query):
+        days = float(query.get("days", ["7"])[0])
+        end = int(time.time() * 1000)
+        return self._series(coin_id, end - int(days * 86_400_000), end)
+
+    def market_chart_range(self, coin_id, query):
+        start = int(float(query["from"][0]) * 1000)
+        end = int(float(query["to"][0]) * 1000)
+        return self._series(coin_id, start, end)
+
+    def _series(self, coin_id, start, end):
+        """Recorded points in [start, end] if there is a fixture, else a synthetic path."""
+        if coin_id in self.charts:
+            return {"prices": [p for p in self.charts[coin_id] if start <= p[0] <= end]}
+        return self._synthetic_series(coin_id, start, end)
+
+    def _synthetic_series(self, coin_id, start, end):
+        """Deterministic price path: 5-minute points up to a day, hourly beyond, like CoinGecko."""
+        c = self.coins[coin_id]
+        step_ms = 300_000 if end - start <= 86_400_000 else 3_600_000
+        first = -(-start // step_ms) * step_ms
+        drift = c["price_change_percentage_24h"] / 100 / 86_400_000
+        prices = [
+            [ts, c["current_price"] * (1 + drift * (ts - self._anchor_ms))]
+            for ts in range(first, end + 1, step_ms)
+        ]
+        return {"prices": prices}
+
+    def _injected_failure(self):
+        """(status, payload, headers) for a throttled or randomly failed request, else None."""
+        with self._lock:
+            if self.rate_limit is not None:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] > 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.rate_limit:
+                    return 429, {"status": {"error_code": 429, "error_message": "rate limited"}}, \
+                        {"Retry-After": str(self.retry_after)}
+                self._recent.append(now)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return 500, {"error": "internal error"}, {}
+        return None
+
+    def exchange_rates(self):
+        """BTC-denominated rates, shaped like CoinGecko's /exchange_rates."""
+        btc_usd = self.coins["bitcoin"]["current_price"] if "bitcoin" in self.coins else 60000.0
+        return {"rates": {code: {"name": name, "unit": unit, "value": btc_usd * per_usd, "type": "fiat"}
+                          for code, (name, unit, per_usd) in EXCHANGE_RATES.items()}}
+
+    def _route(self, path, query):
+        if path == "/api/v3/coins/markets":
+            return 200, self.markets(query)
+        if path == "/api/v3/exchange_rates":
+            return 200, self.exchange_rates()
+        match = _COIN_PATH.match(path)
+        if not match or match.group(1) not in self.coins:
+            return 404, {"error": "coin not found"}
+        coin_id = match.group(1)
+        if coin_id in self.fail_ids:
+            return 500, {"error": "internal error"}
+        if match.group(3):
+            return 200, self.market_chart_range(coin_id, query)
+        if match.group(2):
+            return 200, self.market_chart(coin_id, query)
+        return 200, self.coin(coin_id)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                fake.requests.append(url.path)
+                if fake.latency or fake.jitter:
+                    time.sleep(fake.latency + (fake._random.random() * fake.jitter if fake.jitter else 0.0))
+                failure = fake._injected_failure()
+                if failure is not None:
+                    status, payload, headers = failure
+                else:
+                    (status, payload), headers = fake._route(url.path, parse_qs(url.query)), {}
+                fake.statuses[status] += 1
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+# -------------------- Fixtures --------------------
+def load_fixtures(directory):
+    """(coins, {coin_id: [[ts, price], ...]}) from `markets.json` and `market_chart/<id>.json`."""
+    with open(os.path.join(directory, "markets.json"), encoding="utf-8") as fh:
+        coins = json.load(fh)
+    charts = {}
+    chart_dir = os.path.join(directory, "market_chart")
+    if os.path.isdir(chart_dir):
+        for name in sorted(os.listdir(chart_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(chart_dir, name), encoding="utf-8") as fh:
+                    charts[name[:-5]] = sorted((json.load(fh) or {}).get("prices") or [])
+    return coins, charts
+
+
+def record_fixtures(directory, fetch=None, ids=None, per_page=100, days="30"):
+    """Record live `/coins/markets` and `market_chart` responses into `directory` for FakeCoinGecko.
+
+    `fetch(path, params)` defaults to the shared client. Charts are recorded
+    for `ids` (default: the first ten coins of the markets page).
+    """
+    if fetch is None:
+        from coingecko import get_client
+
+        fetch = get_client().get
+    markets = fetch("/coins/markets", {"vs_currency": "usd", "order": "market_cap_desc", "per_page": per_page,
+                                       "page": 1, "sparkline": "false", "price_change_percentage": "24h,7d"})
+    if not markets:
+        raise RuntimeError("could not fetch /coins/markets")
+    os.makedirs(os.path.join(directory, "market_chart"), exist_ok=True)
+    with open(os.path.join(directory, "markets.json"), "w", encoding="utf-8") as fh:
+        json.dump(markets, fh)
+    recorded = []
+    for coin_id in ids or [c["id"] for c in markets[:10]]:
+        chart = fetch(f"/coins/{coin_id}/market_chart", {"vs_currency": "usd", "days": days})
+        if chart:
+            with open(os.path.join(directory, "market_chart", f"{coin_id}.json"), "w", encoding="utf-8") as fh:
+                json.dump({"prices": chart.get("prices", [])}, fh)
+            recorded.append(coin_id)
+    return recorded
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a fake CoinGecko API, or record fixtures for it.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="record live responses into a fixtures directory")
+    rec.add_argument("directory")
+    rec.add_argument("--ids", help="comma-separated coin IDs to record charts for")
+    rec.add_argument("--days", default="30")
+    srv = sub.add_parser("serve", help="serve the fake API")
+    srv.add_argument("--fixtures")
+    srv.add_argument("--port", type=int, default=8000)
+    srv.add_argument("--latency", type=float, default=0.0)
+    srv.add_argument("--error-rate", type=float, default=0.0)
+    srv.add_argument("--rate-limit", type=int)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        ids = args.ids.split(",") if args.ids else None
+        print("Recorded charts for:", ", ".join(record_fixtures(args.directory, ids=ids, days=args.days)))
+    else:
+        with FakeCoinGecko(fixtures=args.fixtures, latency=args.latency, error_rate=args.error_rate,
+                           rate_limit=args.rate_limit, port=args.port) as fake:
+            print(f"Fake CoinGecko at {fake.base_url} (export COINGECKO_BASE_URL={fake.base_url})")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,170 @@
+"""Local currency conversion over USD market data.
+
+Every upstream request stays in USD. One `/exchange_rates` call per TTL
+gives USD -> X multipliers for every currency CoinGecko knows, and
+prices, market caps and chart series are converted on read by
+multiplying whole arrays. A EUR, GBP or JPY view therefore costs the same
+upstream traffic as the USD one. Historical charts use the current rate.
+"""
+import os
+import threading
+import time
+
+from market_model import MarketRecord, MarketSnapshot
+
+BASE_CURRENCY = "usd"
+FX_TTL = float(os.getenv("CRYPTOBUDDY_FX_TTL", "3600"))
+# Seconds between checks while the rates are missing or past their TTL
+FX_RETRY = 60.0
+
+# Display symbol and decimals for the currencies offered in the UI; others print their code
+CURRENCIES = {
+    "usd": ("$", 2),
+    "eur": ("€", 2),
+    "gbp": ("£", 2),
+    "jpy": ("¥", 0),
+}
+
+
+def format_money(value, currency=BASE_CURRENCY, decimals=None):
+    """'$1,234.57', '¥185,186' or '1,234.57 CHF'; `decimals` defaults to the currency's own."""
+    symbol, default = CURRENCIES.get(currency, (None, 2))
+    digits = default if decimals is None else min(decimals, default)
+    if value is None:
+        value = 0.0
+    amount = f"{value:,.{digits}f}"
+    if symbol is None:
+        return f"{amount} {currency.upper()}"
+    if amount.startswith("-"):
+        return f"-{symbol}{amount[1:]}"
+    return f"{symbol}{amount}"
+
+
+def currency_symbol(currency):
+    return CURRENCIES.get(currency, (currency.upper(), 2))[0]
+
+
+def parse_exchange_rates(payload):
+    """{code: units per USD} from CoinGecko's BTC-denominated /exchange_rates payload, or None."""
+    try:
+        rates = payload["rates"]
+        per_btc_usd = float(rates[BASE_CURRENCY]["value"])
+        return {code: float(r["value"]) / per_btc_usd for code, r in rates.items() if r.get("type") == "fiat"
+                or code == BASE_CURRENCY}
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+class FxTable:
+    """USD -> currency multipliers, refreshed from `/exchange_rates` once per `ttl`.
+
+    Rates are kept in memory and, through the disk cache, across restarts.
+    Only the very first load blocks; after that an expired table is served
+    while the disk cache refreshes it in the background, and the new rates
+    are picked up within `retry` seconds. A failed load is retried after
+    `retry` seconds too. With no rates at all, only USD is available.
+    """
+
+    def __init__(self, fetch=None, disk_cache=None, ttl=FX_TTL, clock=time.time, retry=FX_RETRY):
+        self._fetch = fetch
+        self._disk_cache = disk_cache
+        self.ttl = ttl
+        self.retry = retry
+        self._clock = clock
+        self._rates = None
+        self._loaded_at = None
+        self._next_check = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        fetch = self._fetch
+        if fetch is None:
+            from coingecko import get_client
+
+            fetch = get_client().get
+        return parse_exchange_rates(fetch("/exchange_rates"))
+
+    def _check(self, now):
+        if self._disk_cache is None:
+            from disk_cache import get_disk_cache
+
+            self._disk_cache = get_disk_cache()
+        # Loads synchronously when nothing is stored, otherwise starts a background refresh once expired
+        self._disk_cache.cached_fetch("fx:rates", self._load, max_age=self.ttl)
+        entry = self._disk_cache.get("fx:rates")
+        if entry is not None and entry.value:
+            self._rates = entry.value
+            self._loaded_at = entry.fetched_at
+            expires = entry.fetched_at + self.ttl
+            if expires > now:
+                self._next_check = expires
+                return
+        self._next_check = now + min(self.retry, self.ttl)
+
+    def rates(self):
+        """{code: units per USD}; always contains USD."""
+        next_check = self._next_check
+        if next_check is None or self._clock() >= next_check:
+            with self._lock:
+                now = self._clock()
+                if self._next_check is None or now >= self._next_check:
+                    self._check(now)
+        return self._rates or {BASE_CURRENCY: 1.0}
+
+    @property
+    def version(self):
+        """When the rates in use were fetched; part of rendered-report cache keys."""
+        return self._loaded_at
+
+    def currencies(self):
+        return sorted(self.rates())
+
+    def rate(self, currency):
+        """Units of `currency` per USD, or None if it is unknown."""
+        if currency == BASE_CURRENCY:
+            return 1.0
+        return self.rates().get(currency)
+
+    def _rate_or_raise(self, currency):
+        rate = self.rate(currency)
+        if rate is None:
+            raise ValueError(f"no exchange rate for {currency!r}")
+        return rate
+
+    def convert(self, values, currency):
+        """USD amounts (scalar or array) in `currency`."""
+        return values * self._rate_or_raise(currency)
+
+    def convert_snapshot(self, snapshot, currency):
+        """MarketSnapshot (or markets records) with prices, caps and volumes in `currency`."""
+        if not isinstance(snapshot, MarketSnapshot):
+            snapshot = MarketSnapshot(snapshot or ())
+        return snapshot.scaled(self._rate_or_raise(currency))
+
+    def convert_record(self, record, currency):
+        if record is None or currency == BASE_CURRENCY:
+            return record
+        return self.convert_snapshot([MarketRecord.from_json(record)], currency)[0]
+
+    def convert_points(self, points, currency):
+        """Copy of a (ts, price) point array with prices in `currency`; the array itself if USD."""
+        if points is None or currency == BASE_CURRENCY:
+            return points
+        rate = self._rate_or_raise(currency)
+        out = points.copy()
+        out["price"] *= rate
+        return out
+
+
+_fx = None
+_fx_lock = threading.Lock()
+
+
+def get_fx_table():
+    """Process-wide rate table (TTL from CRYPTOBUDDY_FX_TTL, default one hour)."""
+    global _fx
+    if _fx is None:
+        with _fx_lock:
+            if _fx is None:
+                _fx = FxTable()
+    return _fx
@@ -0,0 +1,354 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from price_history import get_history_store
+
+# Window lengths are in points, one per hour (see `hourly`), so "24 pts" is always a day
+IndicatorParams = namedtuple(
+    "IndicatorParams",
+    ["sma", "ema", "rsi", "bollinger", "bollinger_k", "volatility", "momentum"],
+    defaults=[20, 20, 14, 20, 2.0, 24, 24],
+)
+DEFAULT_PARAMS = IndicatorParams()
+INDICATORS = ("sma", "ema", "rsi", "bb_mid", "bb_upper", "bb_lower", "volatility", "momentum")
+HOUR_MS = 3_600_000
+
+
+def hourly(points, bucket_ms=HOUR_MS):
+    """The first point of each `bucket_ms` bucket, stamped at the bucket's start.
+
+    `/market_chart/range` answers 5-minute points for ranges under a day and
+    hourly ones otherwise, so stored history mixes both spacings; resampled,
+    every indicator window covers the same span wherever it sits.
+    """
+    if not len(points):
+        return points
+    buckets = points["ts"] // bucket_ms
+    first = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    out = points[first]
+    out["ts"] = buckets[first] * bucket_ms
+    return out
+
+
+# -------------------- Vectorized full-series versions --------------------
+def _ewm(x, alpha, y0):
+    """y[t] = (1 - alpha) * y[t-1] + alpha * x[t] with y[-1] = y0, without a Python loop per point.
+
+    Each block uses the closed form y[s+i] = b^(i+1) y[s-1] + alpha * b^i * sum_j<=i x[s+j] b^-j,
+    with blocks short enough that b^-i stays well inside float64 range.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.empty_like(x)
+    b = 1.0 - alpha
+    if b <= 0.0:
+        out[:] = x
+        return out
+    block = max(1, int(27.6 / -np.log(b)))  # b^-block <= 1e12
+    prev = y0
+    for s in range(0, len(x), block):
+        chunk = x[s:s + block]
+        i = np.arange(len(chunk))
+        scale = b ** -i
+        out[s:s + len(chunk)] = b ** (i + 1) * prev + alpha * np.cumsum(chunk * scale) / scale
+        prev = out[s + len(chunk) - 1]
+    return out
+
+
+def sma(x, n):
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        c = np.concatenate([[0.0], np.cumsum(x)])
+        out[n - 1:] = (c[n:] - c[:-n]) / n
+    return out
+
+
+def ema(x, n):
+    """Exponential moving average with alpha = 2 / (n + 1), seeded with the first price."""
+    x = np.asarray(x, dtype=np.float64)
+    if not len(x):
+        return x.copy()
+    return _ewm(x, 2.0 / (n + 1), x[0])
+
+
+def _rsi_averages(x, n):
+    """Wilder-smoothed average gain and loss per point (NaN until n price changes are known)."""
+    x = np.asarray(x, dtype=np.float64)
+    gain = np.full(len(x), np.nan)
+    loss = np.full(len(x), np.nan)
+    if len(x) > n:
+        d = np.diff(x)
+        g, l = np.maximum(d, 0.0), np.maximum(-d, 0.0)
+        g0, l0 = g[:n].mean(), l[:n].mean()
+        gain[n], loss[n] = g0, l0
+        gain[n + 1:] = _ewm(g[n:], 1.0 / n, g0)
+        loss[n + 1:] = _ewm(l[n:], 1.0 / n, l0)
+    return gain, loss
+
+
+def _rsi_from(gain, loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(loss > 0, 100.0 - 100.0 / (1.0 + gain / loss), np.where(np.isnan(loss), np.nan, 100.0))
+
+
+def rsi(x, n):
+    return _rsi_from(*_rsi_averages(x, n))
+
+
+def bollinger(x, n, k=2.0):
+    """(middle, upper, lower) bands: SMA(n) +/- k population standard deviations."""
+    x = np.asarray(x, dtype=np.float64)
+    mid = sma(x, n)
+    std = np.full(len(x), np.nan)
+    if len(x) >= n:
+        std[n - 1:] = sliding_window_view(x, n).std(axis=1)
+    return mid, mid + k * std, mid - k * std
+
+
+def volatility(x, n):
+    """Sample standard deviation of the last n log returns, per point (not annualized)."""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) > n:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.diff(np.log(x))
+        out[n:] = sliding_window_view(r, n).std(axis=1, ddof=1)
+    return out
+
+
+def momentum(x, n):
+    """Percent change over the last n points."""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) > n:
+        out[n:] = (x[n:] / x[:-n] - 1.0) * 100.0
+    return out
+
+
+# -------------------- Incremental series --------------------
+class IndicatorSeries:
+    """A coin's price window together with every indicator, extendable one point at a time.
+
+    The initial points are computed with the vectorized functions above;
+    `append` then updates each indicator in O(1) per new point from running
+    sums and the previous smoothed values, and `trim` drops points from the
+    front without touching the rest. Arrays grow by doubling, so the
+    accessors return views.
+    """
+
+    def __init__(self, points, params=DEFAULT_PARAMS):
+        self.params = params
+        ts = np.asarray(points["ts"], dtype=np.int64)
+        px = np.asarray(points["price"], dtype=np.float64)
+        n = len(px)
+        self._cap = max(16, 2 * n)
+        self._len = n
+        self._start = 0
+        self._ts = np.empty(self._cap, dtype=np.int64)
+        self._ts[:n] = ts
+        self._px = np.empty(self._cap)
+        self._px[:n] = px
+        self._logret = np.full(self._cap, np.nan)
+        if n > 1:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self._logret[1:n] = np.diff(np.log(px))
+
+        p = params
+        mid, upper, lower = bollinger(px, p.bollinger, p.bollinger_k)
+        gain, loss = _rsi_averages(px, p.rsi)
+        columns = {
+            "sma": sma(px, p.sma), "ema": ema(px, p.ema), "rsi": _rsi_from(gain, loss),
+            "bb_mid": mid, "bb_upper": upper, "bb_lower": lower,
+            "volatility": volatility(px, p.volatility), "momentum": momentum(px, p.momentum),
+        }
+        self._cols = {}
+        for name, values in columns.items():
+            buf = np.full(self._cap, np.nan)
+            buf[:n] = values
+            self._cols[name] = buf
+
+        # Running state for O(1) appends
+        self._sma_sum = px[-p.sma:].sum() if n else 0.0
+        self._bb_sum = px[-p.bollinger:].sum() if n else 0.0
+        self._bb_sumsq = (px[-p.bollinger:] ** 2).sum() if n else 0.0
+        rets = self._logret[max(1, n - p.volatility):n]
+        self._vol_sum, self._vol_sumsq = rets.sum(), (rets ** 2).sum()
+        self._ema = columns["ema"][-1] if n else None
+        self._gain = gain[-1] if n else np.nan
+        self._loss = loss[-1] if n else np.nan
+        self._seed_gain = np.maximum(np.diff(px[:p.rsi + 1]), 0).sum() if n else 0.0
+        self._seed_loss = np.maximum(-np.diff(px[:p.rsi + 1]), 0).sum() if n else 0.0
+
+    def __len__(self):
+        return self._len - self._start
+
+    @property
+    def ts(self):
+        return self._ts[self._start:self._len]
+
+    @property
+    def price(self):
+        return self._px[self._start:self._len]
+
+    @property
+    def first_ts(self):
+        return int(self._ts[self._start]) if len(self) else None
+
+    @property
+    def last_ts(self):
+        return int(self._ts[self._len - 1]) if len(self) else None
+
+    def values(self, name):
+        return self._cols[name][self._start:self._len]
+
+    def latest(self):
+        """{indicator: last value (NaN until its window has filled)}."""
+        if not len(self):
+            return {name: np.nan for name in INDICATORS}
+        return {name: float(self._cols[name][self._len - 1]) for name in INDICATORS}
+
+    def trim(self, start_ts):
+        """Drop points older than `start_ts` from the view (indicator values are unchanged)."""
+        self._start += int(np.searchsorted(self.ts, start_ts, side="left"))
+
+    def _grow(self):
+        self._cap *= 2
+        for attr in ("_ts", "_px", "_logret"):
+            old = getattr(self, attr)
+            new = np.full(self._cap, np.nan) if old.dtype.kind == "f" else np.empty(self._cap, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+        for name, old in self._cols.items():
+            new = np.full(self._cap, np.nan)
+            new[:len(old)] = old
+            self._cols[name] = new
+
+    def append(self, points):
+        """Extend with points newer than the last one; returns how many were added."""
+        added = 0
+        last = self.last_ts if self._len else None
+        for ts, price in zip(points["ts"], points["price"]):
+            if last is not None and ts <= last:
+                continue
+            self._push(int(ts), float(price))
+            last = ts
+            added += 1
+        return added
+
+    def _push(self, ts, x):
+        if self._len == self._cap:
+            self._grow()
+        p, t, px, cols = self.params, self._len, self._px, self._cols
+        px[t] = x
+        self._ts[t] = ts
+        self._len += 1
+
+        # Simple averages over the last n prices
+        self._sma_sum += x - (px[t - p.sma] if t >= p.sma else 0.0)
+        cols["sma"][t] = self._sma_sum / p.sma if t >= p.sma - 1 else np.nan
+        old = px[t - p.bollinger] if t >= p.bollinger else 0.0
+        self._bb_sum += x - old
+        self._bb_sumsq += x * x - old * old
+        if t >= p.bollinger - 1:
+            mean = self._bb_sum / p.bollinger
+            std = np.sqrt(max(self._bb_sumsq / p.bollinger - mean * mean, 0.0))
+            cols["bb_mid"][t] = mean
+            cols["bb_upper"][t] = mean + p.bollinger_k * std
+            cols["bb_lower"][t] = mean - p.bollinger_k * std
+
+        alpha = 2.0 / (p.ema + 1)
+        self._ema = x if self._ema is None else self._ema + alpha * (x - self._ema)
+        cols["ema"][t] = self._ema
+
+        if t == 0:
+            return
+        d = x - px[t - 1]
+        g, l = max(d, 0.0), max(-d, 0.0)
+        if t < p.rsi:
+            self._seed_gain += g
+            self._seed_loss += l
+        elif t == p.rsi:
+            self._gain = (self._seed_gain + g) / p.rsi
+            self._loss = (self._seed_loss + l) / p.rsi
+        else:
+            self._gain += (g - self._gain) / p.rsi
+            self._loss += (l - self._loss) / p.rsi
+        if t >= p.rsi:
+            cols["rsi"][t] = 100.0 if self._loss == 0 else 100.0 - 100.0 / (1.0 + self._gain / self._loss)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.log(x / px[t - 1])
+        self._logret[t] = r
+        old = self._logret[t - p.volatility] if t > p.volatility else 0.0
+        self._vol_sum += r - old
+        self._vol_sumsq += r * r - old * old
+        if t >= p.volatility:
+            n = p.volatility
+            var = (self._vol_sumsq - self._vol_sum * self._vol_sum / n) / (n - 1)
+            cols["volatility"][t] = np.sqrt(max(var, 0.0))
+        if t >= p.momentum:
+            cols["momentum"][t] = (x / px[t - p.momentum] - 1.0) * 100.0
+
+
+class IndicatorCache:
+    """IndicatorSeries per (coin, window), kept in step with the price history store.
+
+    Series are computed over the window resampled to one point per
+    `bucket_ms`. On each `get`, points that slid out of the window are
+    trimmed and only the new tail is appended; the series is rebuilt from
+    scratch only when the stored history changed underneath it (a backfill
+    or a corrected price).
+    """
+
+    def __init__(self, store=None, params=DEFAULT_PARAMS, max_entries=64, bucket_ms=HOUR_MS):
+        self.store = store or get_history_store()
+        self.params = params
+        self.bucket_ms = bucket_ms
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def get(self, coin_id, days="7", refresh=False):
+        """IndicatorSeries for the window, or None without any stored history."""
+        points = hourly(self.store.window(coin_id, days, refresh=refresh), self.bucket_ms)
+        if not len(points):
+            return None
+        key = (coin_id, str(days))
+        revision = self.store.series(coin_id).revision
+        with self._lock:
+            series, built_at = self._entries.get(key, (None, None))
+            if series is not None and len(series) and built_at == revision:
+                series.trim(int(points["ts"][0]))
+                k = int(np.searchsorted(points["ts"], series.last_ts, side="right"))
+                if len(series) == k and k and series.first_ts == points["ts"][0] and series.last_ts == points["ts"][k - 1]:
+                    series.append(points[k:])
+                else:
+                    series = None
+            else:
+                series = None
+            if series is None:
+                series = IndicatorSeries(points, self.params)
+                self.rebuilds += 1
+            self._entries[key] = (series, revision)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return series
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_indicator_cache():
+    """Process-wide cache over `get_history_store()`."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = IndicatorCache()
+    return _cache
@@ -0,0 +1,91 @@
+import re
+from collections import namedtuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Checked in this order when a message hits several intents, so
+# "best for long-term growth" is long_term rather than recommend.
+INTENT_KEYWORDS = [
+    ("price", ["price", "prices"]),
+    ("trending", ["trending", "rising", "hot", "growing"]),
+    ("sustainable", ["sustainable", "sustainability", "green", "greenest", "eco", "environment", "environmental"]),
+    ("long_term", ["long term", "growth", "future"]),
+    ("compare", ["compare", "comparison", "vs", "versus"]),
+    ("show_all", ["all", "list", "show all"]),
+    ("recommend", ["recommend", "recommendation", "recommendations", "best", "balanced", "invest", "investing",
+                   "investment"]),
+]
+INTENT_PRIORITY = {intent: i for i, (intent, _) in enumerate(INTENT_KEYWORDS)}
+
+# Everyday words that also happen to be tickers of obscure coins
+STOPWORDS = {"what", "whats", "is", "the", "of", "for", "a", "an", "me", "show", "tell", "current", "today", "now",
+             "how", "much", "usd", "in", "coin", "coins", "crypto", "please", "and", "to", "s", "it", "on", "my",
+             "i", "you", "which", "about", "give", "one", "top", "buy", "sell", "with", "get", "can", "do"}
+
+Route = namedtuple("Route", ["intent", "coins"])
+
+_END = object()
+
+
+class IntentRouter:
+    """Token-trie matcher that finds a message's intent and coin mentions in one pass.
+
+    Keywords and coin names/symbols/aliases are compiled into a single trie
+    over word tokens, so multi-word entries ("long term", "binance coin")
+    match as phrases and "hot" no longer matches inside "photo". At each
+    position the longest entry wins; a phrase that is both a keyword and a
+    coin counts as the keyword.
+    """
+
+    def __init__(self, coin_aliases, extra_coins=None):
+        self._trie = {}
+        for intent, keywords in INTENT_KEYWORDS:
+            for keyword in keywords:
+                self._insert(keyword, intent=intent)
+        for alias, coin_id in coin_aliases.items():
+            self._insert(alias, coin_id=coin_id)
+        # Bulk entries (the full-market index) never shadow a stopword or a curated alias
+        for alias, coin_id in (extra_coins or {}).items():
+            if alias not in STOPWORDS:
+                self._insert(alias, coin_id=coin_id, overwrite=False)
+
+    def _insert(self, phrase, intent=None, coin_id=None, overwrite=True):
+        tokens = TOKEN_RE.findall(phrase.lower())
+        if not tokens:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        old_intent, old_coin = node.get(_END, (None, None))
+        if not overwrite and old_coin is not None:
+            coin_id = old_coin
+        node[_END] = (intent or old_intent, coin_id or old_coin)
+
+    def route(self, text):
+        """Route(intent or None, [coin ids in order of mention])."""
+        tokens = TOKEN_RE.findall(text.lower())
+        n = len(tokens)
+        best_intent = None
+        coins = []
+        i = 0
+        while i < n:
+            node = self._trie
+            j = i
+            match = None
+            end = i + 1
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    match, end = node[_END], j
+            if match is not None:
+                intent, coin_id = match
+                if intent is not None:
+                    if best_intent is None or INTENT_PRIORITY[intent] < INTENT_PRIORITY[best_intent]:
+                        best_intent = intent
+                elif coin_id not in coins:
+                    coins.append(coin_id)
+            i = end
+        return Route(best_intent, coins)
@@ -0,0 +1,81 @@
+"""Load-test the chat server against a local fake CoinGecko.
+
+    python loadtest_chat.py [clients] [messages_per_client] [workers] [api_latency_s]
+
+Reports p50/p99 round-trip latency and requests per second.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from fake_coingecko import FakeCoinGecko
+
+MESSAGES = [
+    "What's the price of Bitcoin?",
+    "Which crypto is trending?",
+    "What's the most sustainable coin?",
+    "Best for long-term growth?",
+    "Compare Bitcoin and Ethereum",
+    "Show all cryptocurrencies",
+    "Give me a recommendation",
+    "/hold bitcoin 0.5",
+    "/portfolio",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def client(host, port, n, offset, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    for i in range(n):
+        message = MESSAGES[(offset + i) % len(MESSAGES)]
+        start = time.perf_counter()
+        writer.write(json.dumps({"message": message}).encode() + b"\n")
+        await writer.drain()
+        reply = json.loads(await reader.readline())
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert reply["reply"]
+    writer.close()
+
+
+async def run(clients, per_client, workers, host, port):
+    from chat_server import ChatServer
+    from crypto_buddy import CryptoBuddy
+    from disk_cache import DiskCache
+
+    server = await ChatServer(CryptoBuddy(disk_cache=DiskCache(":memory:")), host, port, workers).start()
+    host, port = server.address
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, per_client, i, latencies) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    await server.close()
+    return {"requests": len(latencies), "rps": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50), "p99_ms": percentile(latencies, 99)}
+
+
+def main(clients=50, per_client=20, workers=8, latency=0.05):
+    with FakeCoinGecko(latency=latency) as fake:
+        os.environ["COINGECKO_BASE_URL"] = fake.base_url
+        os.environ.setdefault("CRYPTOBUDDY_CACHE_DIR", tempfile.mkdtemp())
+        result = asyncio.run(run(clients, per_client, workers, "127.0.0.1", 0))
+        result["api_requests"] = len(fake.requests)
+    return result
+
+
+if __name__ == "__main__":
+    args = [float(a) for a in sys.argv[1:]]
+    clients = int(args[0]) if len(args) > 0 else 50
+    per_client = int(args[1]) if len(args) > 1 else 20
+    workers = int(args[2]) if len(args) > 2 else 8
+    latency = args[3] if len(args) > 3 else 0.05
+    r = main(clients, per_client, workers, latency)
+    print(f"{clients} clients x {per_client} messages ({workers} workers, {latency * 1000:.0f} ms API latency): "
+          f"{r['requests']} requests, {r['rps']:.0f} req/s, p50 {r['p50_ms']:.2f} ms, p99 {r['p99_ms']:.2f} ms, "
+          f"{r['api_requests']} CoinGecko requests")
@@ -0,0 +1,249 @@
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from types import MappingProxyType
+
+from market_model import MarketSnapshot
+
+
+class MarketSnapshotCache:
+    """In-memory `/coins/markets` snapshot shared by every command of a process.
+
+    Within `ttl` seconds the cached snapshot is returned as-is. Between `ttl`
+    and `stale_ttl` it is still returned, but a background refresh is started
+    (stale-while-revalidate). Past `stale_ttl`, or when empty, the caller loads
+    synchronously. A failed load (loader returns a falsy value) keeps the
+    previous snapshot. Concurrent refreshes share one in-flight load.
+    """
+
+    def __init__(self, loader, ttl=60, stale_ttl=300, clock=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._inflight = None
+        self._snapshot = None
+        self._by_id = {}
+        self._loaded_at = None
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._listeners = []
+        self.listener_errors = 0
+        # (snapshot, by_id) served unchanged while a `pinned` block runs
+        self._pin = None
+
+    def age(self):
+        if self._loaded_at is None:
+            return None
+        return self._clock() - self._loaded_at
+
+    def _store(self, snapshot):
+        with self._lock:
+            self._snapshot = snapshot
+            self._by_id = {coin["id"]: coin for coin in snapshot if "id" in coin}
+            self._loaded_at = self._clock()
+            self.version += 1
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception:
+                self.listener_errors += 1
+
+    def subscribe(self, listener):
+        """Call `listener(snapshot)` after every new snapshot is stored (on the loading thread)."""
+        self._listeners.append(listener)
+
+    def seed(self, snapshot):
+        """Preload a last-known-good snapshot; it is served at once and refreshed on first use."""
+        if snapshot and self._snapshot is None:
+            self._store(snapshot)
+            with self._lock:
+                self._loaded_at = self._clock() - self.ttl
+
+    def refresh(self):
+        """Load a new snapshot now; returns the current snapshot (new or previous).
+
+        Single-flight: callers arriving while a load is running wait for it
+        instead of starting their own.
+        """
+        with self._lock:
+            flight = self._inflight
+            leader = flight is None
+            if leader:
+                flight = self._inflight = threading.Event()
+        if not leader:
+            flight.wait()
+            return self._snapshot
+        try:
+            snapshot = self.loader()
+            if snapshot:
+                self._store(snapshot)
+        finally:
+            with self._lock:
+                self._inflight = None
+            flight.set()
+        return self._snapshot
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="market-snapshot-refresh", daemon=True).start()
+
+    @contextmanager
+    def pinned(self, extra=()):
+        """Serve the current snapshot unchanged, with no refreshes, for the duration of the block.
+
+        `extra` records (e.g. coins looked up ahead of a batch) are found by
+        `coin`/`coins` but not listed in the snapshot. Process-wide: every
+        reader sees the pinned snapshot until the block ends.
+        """
+        snapshot = self.get()
+        with self._lock:
+            by_id = dict(self._by_id)
+            by_id.update((coin["id"], coin) for coin in extra if "id" in coin)
+            previous, self._pin = self._pin, (snapshot, by_id)
+        try:
+            yield snapshot
+        finally:
+            with self._lock:
+                self._pin = previous
+
+    def get(self):
+        pin = self._pin
+        if pin is not None:
+            self.hits += 1
+            return pin[0]
+        age = self.age()
+        if age is not None and age < self.ttl:
+            self.hits += 1
+            return self._snapshot
+        if age is not None and age < self.stale_ttl:
+            self.hits += 1
+            snapshot = self._snapshot
+            self._refresh_in_background()
+            return snapshot
+        self.misses += 1
+        return self.refresh()
+
+    def _records(self):
+        pin = self._pin
+        if pin is not None:
+            return pin[1]
+        return {} if self.get() is None else self._by_id
+
+    def coin(self, coin_id):
+        """Per-coin record from the current snapshot, or None if it is not in it."""
+        return self._records().get(coin_id)
+
+    def coins(self, coin_ids):
+        """{id: record} for the requested IDs present in the current snapshot."""
+        by_id = self._records()
+        return {cid: by_id[cid] for cid in coin_ids if cid in by_id}
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+Snapshot = namedtuple("Snapshot", ["version", "fetched_at", "coins", "by_id"])
+EMPTY_SNAPSHOT = Snapshot(0, None, MarketSnapshot(), MappingProxyType({}))
+
+
+class MarketRefresher:
+    """One daemon thread per process that keeps a market snapshot warm for every reader.
+
+    The thread reloads every `interval` seconds (or at once when `watch`
+    adds coins) and publishes each result as an immutable `Snapshot`.
+    Readers never wait on the network unless nothing has been loaded yet,
+    and then they join the same single-flight load. Records are shared
+    between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, loader, ids=(), interval=30, clock=time.time):
+        self.interval = interval
+        self._ids = tuple(ids)
+        self._loader = loader
+        self._clock = clock
+        self.cache = MarketSnapshotCache(lambda: self._loader(self._ids), ttl=interval,
+                                         stale_ttl=float("inf"), clock=clock)
+        self._published = EMPTY_SNAPSHOT
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.errors = 0
+
+    @property
+    def ids(self):
+        return self._ids
+
+    def watch(self, ids):
+        """Add coins to the polled set; the next poll starts right away if any are new."""
+        with self._lock:
+            new = [cid for cid in ids if cid not in self._ids]
+            if not new:
+                return False
+            self._ids = self._ids + tuple(new)
+        self._wake.set()
+        return True
+
+    def seed(self, snapshot):
+        self.cache.seed(snapshot)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name="market-refresher", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.cache.refresh()
+            except Exception:
+                self.errors += 1
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def refresh(self):
+        """Reload now (joining any load already in flight) and return the new snapshot."""
+        self.cache.refresh()
+        return self.snapshot(block=False)
+
+    def snapshot(self, block=True):
+        """The latest published Snapshot; only waits for the network before the first load."""
+        cache = self.cache
+        if cache.version == 0 and block:
+            cache.refresh()
+        published = self._published
+        if published.version != cache.version:
+            with cache._lock:
+                coins, loaded_at, version = cache._snapshot, cache._loaded_at, cache.version
+            if not isinstance(coins, MarketSnapshot):
+                coins = MarketSnapshot(coins or ())
+            by_id = MappingProxyType({coin["id"]: coin for coin in coins if "id" in coin})
+            published = Snapshot(version, loaded_at, coins, by_id)
+            self._published = published
+        return published
@@ -0,0 +1,210 @@
+"""Compact, typed `/coins/markets` snapshots.
+
+CoinGecko returns ~30 keys per coin; the project reads eight. `decode_markets`
+parses the response body (with orjson when it is installed) and keeps only
+those, as `__slots__` records with interned IDs and symbols. Records are
+read-only mappings, so code written against the raw dicts (`coin["name"]`,
+`coin.get(...)`, `dict(coin)`) keeps working. A `MarketSnapshot` also builds
+float64 columns once, on first use, for scoring and for the dashboard's
+DataFrames.
+"""
+import json
+import sys
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib parser is the fallback
+    orjson = None
+
+# Every markets field the project reads
+FIELDS = ("id", "symbol", "name", "current_price", "market_cap", "market_cap_rank", "total_volume",
+          "price_change_percentage_24h")
+NUMERIC_FIELDS = FIELDS[3:]
+# Fields denominated in the quote currency (the rest are ranks, percentages and names)
+MONEY_FIELDS = ("current_price", "market_cap", "total_volume")
+
+
+def loads(payload):
+    """Parse JSON from bytes or str with the fastest available parser."""
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+class MarketRecord(Mapping):
+    """One coin's markets fields; a read-only mapping over `FIELDS` (missing values are None)."""
+
+    __slots__ = FIELDS
+
+    def __init__(self, id, symbol=None, name=None, current_price=None, market_cap=None, market_cap_rank=None,
+                 total_volume=None, price_change_percentage_24h=None):
+        self.id = id
+        self.symbol = symbol
+        self.name = name
+        self.current_price = current_price
+        self.market_cap = market_cap
+        self.market_cap_rank = market_cap_rank
+        self.total_volume = total_volume
+        self.price_change_percentage_24h = price_change_percentage_24h
+
+    @classmethod
+    def from_json(cls, raw):
+        """Record from a markets dict (or another record); unused keys are dropped."""
+        if isinstance(raw, cls):
+            return raw
+        get = raw.get
+        intern = sys.intern
+        symbol = get("symbol")
+        return cls(intern(raw["id"]), intern(symbol) if symbol else symbol, get("name"), get("current_price"),
+                   get("market_cap"), get("market_cap_rank"), get("total_volume"),
+                   get("price_change_percentage_24h"))
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __repr__(self):
+        return f"MarketRecord({self.id!r}, price={self.current_price!r})"
+
+    def __reduce__(self):
+        return MarketRecord, tuple(getattr(self, f) for f in FIELDS)
+
+
+def _usable(raw):
+    """Whether a markets entry can become a record: a mapping with a string ID and a string (or no) symbol."""
+    if isinstance(raw, MarketRecord):
+        return True
+    if not isinstance(raw, Mapping) or not isinstance(raw.get("id"), str) or not raw["id"]:
+        return False
+    symbol = raw.get("symbol")
+    return symbol is None or isinstance(symbol, str)
+
+
+class MarketSnapshot(Sequence):
+    """Immutable sequence of MarketRecords in market cap order, with lazily built columns.
+
+    Accepts records or raw markets dicts; malformed entries (no string ID,
+    a null entry, a non-string symbol) are skipped. Indexing with a slice or `select`
+    gives another snapshot; `column`, `to_numpy` and `to_frame` share the
+    same cached arrays, so repeated conversions copy nothing.
+    """
+
+    __slots__ = ("_records", "_columns", "_scaled")
+
+    def __init__(self, records=()):
+        from_json = MarketRecord.from_json
+        self._records = tuple(from_json(r) for r in records if _usable(r))
+        self._columns = {}
+        self._scaled = {}
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return MarketSnapshot(self._records[index])
+        return self._records[index]
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __eq__(self, other):
+        if isinstance(other, (MarketSnapshot, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"MarketSnapshot({len(self)} coins)"
+
+    def __reduce__(self):
+        return MarketSnapshot, (self._records,)
+
+    @property
+    def ids(self):
+        return self.column("id")
+
+    def select(self, ids):
+        """Snapshot of the records whose ID is in `ids`, keeping snapshot order."""
+        wanted = set(ids)
+        return MarketSnapshot(r for r in self._records if r.id in wanted)
+
+    def column(self, field):
+        """A field for every coin: a float64 array (NaN if missing) for numbers, else a list of strings."""
+        col = self._columns.get(field)
+        if col is None:
+            records = self._records
+            if field in NUMERIC_FIELDS:
+                col = np.fromiter((np.nan if v is None else v for v in (getattr(r, field) for r in records)),
+                                  np.float64, len(records))
+                col.flags.writeable = False
+            else:
+                col = [getattr(r, field) for r in records]
+            self._columns[field] = col
+        return col
+
+    def to_numpy(self, fields=NUMERIC_FIELDS):
+        """{field: read-only float64 array}; the arrays are shared, not copied."""
+        return {f: self.column(f) for f in fields}
+
+    def to_frame(self, fields=FIELDS):
+        """pandas DataFrame over the cached columns, without copying the numeric ones."""
+        import pandas as pd
+
+        return pd.DataFrame({f: self.column(f) for f in fields}, copy=False)
+
+    def scaled(self, factor, fields=MONEY_FIELDS):
+        """Snapshot with `fields` multiplied by `factor` (e.g. an FX rate); cached per factor.
+
+        The multiplication is done on whole columns, which the new snapshot
+        keeps, so its frames and scores need no second pass over records.
+        """
+        if factor == 1.0:
+            return self
+        view = self._scaled.get((factor, fields))
+        if view is None:
+            columns = {f: self.column(f) * factor for f in fields}
+            values = [[None if np.isnan(v) else float(v) for v in columns[f]] for f in fields]
+            records = []
+            for i, rec in enumerate(self._records):
+                copy = MarketRecord(*(getattr(rec, f) for f in FIELDS))
+                for f, column in zip(fields, values):
+                    setattr(copy, f, column[i])
+                records.append(copy)
+            view = MarketSnapshot(records)
+            for f, column in columns.items():
+                column.flags.writeable = False
+                view._columns[f] = column
+            if len(self._scaled) >= 8:
+                self._scaled.clear()
+            self._scaled[(factor, fields)] = view
+        return view
+
+    def to_json(self):
+        """Plain list of dicts, for storage and JSON responses."""
+        return [dict(r) for r in self._records]
+
+
+def decode_markets(payload):
+    """MarketSnapshot from a `/coins/markets` body (bytes/str), decoded list, or snapshot; None if unusable."""
+    if payload is None or isinstance(payload, MarketSnapshot):
+        return payload
+    if isinstance(payload, (bytes, bytearray, memoryview, str)):
+        try:
+            payload = loads(payload)
+        except ValueError:
+            return None
+    if not isinstance(payload, list):
+        return None
+    return MarketSnapshot(payload)
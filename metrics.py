@@ -0,0 +1,286 @@
+"""Timing spans, counters and a Prometheus-style /metrics surface.
+
+Hot paths wrap their stages in `span("fetch")`, `span("parse")`,
+`span("score")`, `span("render")` etc.; components with their own counters
+(HTTP statuses, cache hits) register a collector that is read at scrape
+time, so nothing is double-counted. Set CRYPTOBUDDY_METRICS_PORT to serve
+the text format over HTTP, and CRYPTOBUDDY_PROFILE to a directory to dump a
+cProfile + tracemalloc profile per command.
+"""
+import cProfile
+import functools
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the span histogram buckets
+SPAN_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class SpanStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(SPAN_BUCKETS)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(SPAN_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class Metrics:
+    """Process-wide registry of span timings, counters and scrape-time collectors.
+
+    A collector is a callable returning `(name, type, labels, value)`
+    samples; registering under an existing key replaces it.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._counters = {}
+        self._collectors = {}
+
+    @contextmanager
+    def span(self, name, **labels):
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self._clock() - start, **labels)
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            stats = self._spans.get(key)
+            if stats is None:
+                stats = self._spans[key] = SpanStats()
+            stats.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def register(self, key, collector):
+        with self._lock:
+            self._collectors[key] = collector
+
+    def spans(self):
+        """[(name, labels, count, total_s, avg_ms, max_ms)] for debug views, slowest total first."""
+        with self._lock:
+            rows = [(name, dict(labels), s.count, s.total, s.total / s.count * 1000, s.max * 1000)
+                    for (name, labels), s in self._spans.items()]
+        return sorted(rows, key=lambda r: -r[3])
+
+    def samples(self):
+        """Every counter and collector sample as (name, type, labels, value)."""
+        with self._lock:
+            out = [(name, "counter", dict(labels), value) for (name, labels), value in self._counters.items()]
+            collectors = list(self._collectors.values())
+        for collect in collectors:
+            out.extend(collect())
+        return out
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            spans = [(name, dict(labels), s.count, s.total, list(s.buckets)) for (name, labels), s in self._spans.items()]
+        if spans:
+            lines.append("# HELP cryptobuddy_span_seconds Time spent in instrumented stages.")
+            lines.append("# TYPE cryptobuddy_span_seconds histogram")
+        for name, labels, count, total, buckets in sorted(spans, key=lambda s: (s[0], sorted(s[1].items()))):
+            labels = dict(labels, span=name)
+            cumulative = 0
+            for bound, n in zip(SPAN_BUCKETS, buckets):
+                cumulative += n
+                lines.append(f"cryptobuddy_span_seconds_bucket{_labels(dict(labels, le=repr(bound)))} {cumulative}")
+            lines.append(f"cryptobuddy_span_seconds_bucket{_labels(dict(labels, le='+Inf'))} {count}")
+            lines.append(f"cryptobuddy_span_seconds_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"cryptobuddy_span_seconds_count{_labels(labels)} {count}")
+
+        typed = set()
+        for name, kind, labels, value in sorted(self.samples(), key=lambda s: (s[0], sorted(s[2].items()))):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+
+def span(name, **labels):
+    """Time a block into the shared registry: `with span("fetch", endpoint="/coins/markets"): ...`."""
+    return get_metrics().span(name, **labels)
+
+
+def inc(name, amount=1, **labels):
+    get_metrics().inc(name, amount, **labels)
+
+
+def timed(name, **labels):
+    """Decorator form of `span`."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_metrics().span(name, **labels):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+# -------------------- HTTP endpoint --------------------
+class MetricsServer:
+    """Serves `metrics.render()` at /metrics from a daemon thread."""
+
+    def __init__(self, metrics=None, host="127.0.0.1", port=0):
+        self.metrics = metrics or get_metrics()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def _handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server():
+    """Start the shared /metrics endpoint once if CRYPTOBUDDY_METRICS_PORT is set; None otherwise."""
+    global _server
+    port = os.getenv("CRYPTOBUDDY_METRICS_PORT")
+    if not port:
+        return None
+    if _server is None:
+        with _server_lock:
+            if _server is None:
+                host = os.getenv("CRYPTOBUDDY_METRICS_HOST", "127.0.0.1")
+                _server = MetricsServer(host=host, port=int(port)).start()
+    return _server
+
+
+# -------------------- Profiling --------------------
+_profile_lock = threading.Lock()
+_profile_seq = 0
+
+
+@contextmanager
+def profiled(command, directory=None):
+    """Profile the block with cProfile and tracemalloc when CRYPTOBUDDY_PROFILE names a directory.
+
+    Writes `<command>-<n>.prof` (load with pstats or snakeviz) and a
+    `<command>-<n>.txt` summary of the slowest functions and largest
+    allocations. Profiles are serialised, since cProfile is per-thread and
+    tracemalloc is process-wide; without the variable this is a no-op.
+    """
+    global _profile_seq
+    directory = directory or os.getenv("CRYPTOBUDDY_PROFILE")
+    if not directory:
+        yield
+        return
+    os.makedirs(directory, exist_ok=True)
+    with _profile_lock:
+        _profile_seq += 1
+        base = os.path.join(directory, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', command)}-{_profile_seq}")
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            profile.dump_stats(base + ".prof")
+            text = io.StringIO()
+            text.write(f"{command}: peak traced memory {peak / 1024:.1f} KiB\n\n")
+            pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(25)
+            text.write("Largest allocations:\n")
+            for stat in after.compare_to(before, "lineno")[:10]:
+                text.write(f"  {stat}\n")
+            with open(base + ".txt", "w", encoding="utf-8") as fh:
+                fh.write(text.getvalue())
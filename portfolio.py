@@ -0,0 +1,161 @@
+import numpy as np
+
+from price_history import DAY_MS
+
+YEAR_MS = 365 * DAY_MS
+
+
+class PortfolioBook:
+    """Many portfolios as one holdings matrix: row i is `names[i]`, column j is `asset_ids[j]`.
+
+    Revaluing every portfolio against a price vector is a single
+    matrix-vector product; valuing them over a price history is one
+    matrix-matrix product.
+    """
+
+    def __init__(self, asset_ids=()):
+        self.asset_ids = []
+        self._col = {}
+        self.names = []
+        self._row = {}
+        self.holdings = np.zeros((0, 0))
+        self._ensure_assets(asset_ids)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_matrix(cls, names, asset_ids, holdings):
+        book = cls(asset_ids)
+        book.names = list(names)
+        book._row = {name: i for i, name in enumerate(book.names)}
+        book.holdings = np.array(holdings, dtype=np.float64).reshape(len(book.names), len(book.asset_ids))
+        return book
+
+    def _ensure_assets(self, asset_ids):
+        new = [a for a in dict.fromkeys(asset_ids) if a not in self._col]
+        if not new:
+            return
+        for a in new:
+            self._col[a] = len(self.asset_ids)
+            self.asset_ids.append(a)
+        self.holdings = np.hstack([self.holdings, np.zeros((len(self.names), len(new)))])
+
+    def set(self, name, positions):
+        """Replace `name`'s positions with `{asset_id: amount}`, adding the portfolio if needed."""
+        self._ensure_assets(positions)
+        row = self._row.get(name)
+        if row is None:
+            row = self._row[name] = len(self.names)
+            self.names.append(name)
+            self.holdings = np.vstack([self.holdings, np.zeros((1, len(self.asset_ids)))])
+        self.holdings[row] = 0.0
+        for asset, amount in positions.items():
+            self.holdings[row, self._col[asset]] = amount
+        return row
+
+    def positions(self, name):
+        row = self.holdings[self._row[name]]
+        return {a: float(row[j]) for j, a in enumerate(self.asset_ids) if row[j]}
+
+    def price_vector(self, prices):
+        """Prices aligned to `asset_ids` from a `{id: price}` dict or markets-style records; NaN if unknown."""
+        if not isinstance(prices, dict):
+            prices = {rec["id"]: rec.get("current_price") for rec in prices}
+        return np.array([np.nan if prices.get(a) is None else prices[a] for a in self.asset_ids], dtype=np.float64)
+
+    def revalue(self, prices):
+        """Current value of every portfolio; assets without a price count as 0."""
+        vector = prices if isinstance(prices, np.ndarray) else self.price_vector(prices)
+        return self.holdings @ np.nan_to_num(vector, nan=0.0)
+
+    def value(self, name, prices):
+        return float(self.revalue(prices)[self._row[name]])
+
+    def history(self, series, rows=None):
+        """PortfolioHistory over `{asset_id: (ts, price) point array}`, on a shared time grid.
+
+        The grid is the timestamps of the densest series within the span all
+        series cover; each asset's price is its last observation at or before
+        a grid point. Assets without a series are valued at 0 and listed in
+        `missing`.
+        """
+        holdings = self.holdings if rows is None else self.holdings[rows]
+        names = self.names if rows is None else [self.names[i] for i in rows]
+        held = [a for j, a in enumerate(self.asset_ids) if np.any(holdings[:, j])]
+        available = [a for a in held if series.get(a) is not None and len(series[a])]
+        missing = [a for a in held if a not in available]
+        if not available:
+            return PortfolioHistory(np.empty(0, dtype=np.int64), np.zeros((0, len(self.asset_ids))), holdings, names,
+                                    self.asset_ids, missing)
+
+        start = max(int(series[a]["ts"][0]) for a in available)
+        end = min(int(series[a]["ts"][-1]) for a in available)
+        densest = max(available, key=lambda a: len(series[a]))
+        grid = series[densest]["ts"]
+        grid = grid[(grid >= start) & (grid <= end)]
+
+        prices = np.zeros((len(grid), len(self.asset_ids)))
+        for a in available:
+            ts, px = series[a]["ts"], series[a]["price"]
+            idx = np.searchsorted(ts, grid, side="right") - 1
+            prices[:, self._col[a]] = px[np.clip(idx, 0, len(px) - 1)]
+        return PortfolioHistory(grid, prices, holdings, names, self.asset_ids, missing)
+
+
+class PortfolioHistory:
+    """Values of a set of portfolios over time (`values[t, i]`) and the statistics derived from them."""
+
+    def __init__(self, ts, prices, holdings, names, asset_ids, missing=()):
+        self.ts = ts
+        self.prices = prices
+        self.holdings = holdings
+        self.names = names
+        self.asset_ids = asset_ids
+        self.missing = list(missing)
+        self.values = prices @ holdings.T
+
+    def __len__(self):
+        return len(self.ts)
+
+    def drawdown(self):
+        """Fractional distance below the running peak, per point and portfolio (0 at a new high)."""
+        if not len(self):
+            return self.values
+        peak = np.maximum.accumulate(self.values, axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(peak > 0, self.values / peak - 1.0, 0.0)
+
+    def max_drawdown(self):
+        return self.drawdown().min(axis=0) if len(self) else np.zeros(len(self.names))
+
+    def volatility(self, annualize=True):
+        """Standard deviation of log returns per portfolio, annualized from the median step."""
+        if len(self) < 3:
+            return np.full(len(self.names), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.diff(np.log(np.where(self.values > 0, self.values, np.nan)), axis=0)
+        # nanstd by hand, so empty portfolios give NaN without a warning
+        valid = ~np.isnan(returns)
+        n = valid.sum(axis=0)
+        mean = np.where(valid, returns, 0.0).sum(axis=0) / np.maximum(n, 1)
+        sq = np.where(valid, (returns - mean) ** 2, 0.0).sum(axis=0)
+        vol = np.where(n > 1, np.sqrt(sq / np.maximum(n - 1, 1)), np.nan)
+        if annualize:
+            vol = vol * np.sqrt(YEAR_MS / np.median(np.diff(self.ts)))
+        return vol
+
+    def contributions(self):
+        """Value change over the period by portfolio and asset; rows sum to the total change."""
+        if not len(self):
+            return np.zeros_like(self.holdings)
+        return self.holdings * (self.prices[-1] - self.prices[0])
+
+    def weights(self):
+        """Each asset's share of each portfolio's latest value."""
+        if not len(self):
+            return np.zeros_like(self.holdings)
+        latest = self.holdings * self.prices[-1]
+        total = latest.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(total > 0, latest / total, 0.0)
@@ -0,0 +1,281 @@
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+import requests
+
+DAY_MS = 86_400_000
+
+Tick = namedtuple("Tick", ["coin_id", "price", "ts"])
+Quote = namedtuple("Quote", ["price", "ts", "change_24h"])
+
+
+def parse_tick(payload):
+    """Tick from a `{"id", "price", "ts"}` message (ts in ms, defaults to now), or None."""
+    if isinstance(payload, (str, bytes)):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            return None
+    try:
+        ts = payload.get("ts")
+        return Tick(payload["id"], float(payload["price"]), int(ts) if ts is not None else int(time.time() * 1000))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class LatestPriceTable:
+    """Latest price and rolling 24h change per coin, fed by a single writer thread.
+
+    Readers never take a lock: each coin's current `Quote` is an immutable
+    tuple swapped into a dict in one assignment. The writer keeps at most one
+    point per second per coin for the 24h window; until a coin has a full day
+    of ticks its change is None. Staleness (`max_age`) is measured from when
+    a tick arrived, so a dead feed stops overriding fresher snapshots while a
+    replayed recording with old timestamps still counts as live.
+    """
+
+    def __init__(self, clock=time.time):
+        self._quotes = {}
+        self._received = {}
+        self._windows = {}
+        self._clock = clock
+        self._listeners = []
+        self.ticks = 0
+        self.listener_errors = 0
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def update(self, tick):
+        window = self._windows.get(tick.coin_id)
+        if window is None:
+            window = self._windows[tick.coin_id] = deque()
+        if window and tick.ts < window[-1][0]:
+            return  # out of order; the newer price already stands
+        if window and tick.ts // 1000 == window[-1][0] // 1000:
+            window[-1] = (tick.ts, tick.price)
+        else:
+            window.append((tick.ts, tick.price))
+        cutoff = tick.ts - DAY_MS
+        # Keep the last point at or before the cutoff as the 24h reference
+        while len(window) > 1 and window[1][0] <= cutoff:
+            window.popleft()
+        ref_ts, ref_price = window[0]
+        change = (tick.price / ref_price - 1) * 100 if ref_ts <= cutoff and ref_price else None
+        self._quotes[tick.coin_id] = Quote(tick.price, tick.ts, change)
+        self._received[tick.coin_id] = self._clock()
+        self.ticks += 1
+        for listener in self._listeners:
+            # A failing listener (e.g. alert delivery) must not tear down the feed connection
+            try:
+                listener(tick)
+            except Exception:
+                self.listener_errors += 1
+
+    def subscribe(self, listener):
+        """Call `listener(tick)` after every applied tick, on the writer thread; errors are counted, not raised."""
+        self._listeners.append(listener)
+
+    def quote(self, coin_id, max_age=None):
+        """Latest Quote for `coin_id`, or None if there is none (or none arrived in the last `max_age` s)."""
+        quote = self._quotes.get(coin_id)
+        if quote is None or (max_age is not None and self._clock() - self._received.get(coin_id, 0) > max_age):
+            return None
+        return quote
+
+    def overlay(self, records, max_age=None):
+        """Copies of markets-style records with streamed prices in place of the REST ones.
+
+        Pass the snapshot's refresh interval as `max_age`, so a feed that went
+        quiet hands back to the snapshot. Before a coin has a day of ticks, its 24h change is taken against the
+        price implied 24h ago by the record itself.
+        """
+        out = []
+        for rec in records:
+            quote = self.quote(rec.get("id"), max_age)
+            if quote is None:
+                out.append(rec)
+                continue
+            change = quote.change_24h
+            if change is None:
+                price, pct = rec.get("current_price"), rec.get("price_change_percentage_24h")
+                if price and pct is not None and pct != -100:
+                    change = (quote.price / (price / (1 + pct / 100)) - 1) * 100
+            out.append(dict(rec, current_price=quote.price, price_change_percentage_24h=change))
+        return out
+
+
+class PriceFeed:
+    """A source of Ticks. Subclasses implement `ticks()` (a blocking iterator) and `close()`."""
+
+    def ticks(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ReplayFeed(PriceFeed):
+    """Ticks read straight from a recorded JSONL file, optionally paced by their timestamps.
+
+    With `follow`, the file is tailed at EOF (polled every `poll_interval`
+    seconds) for appended ticks instead of ending the feed.
+    """
+
+    def __init__(self, path, speed=0.0, sleep=time.sleep, follow=False, poll_interval=0.5):
+        self.path = path
+        self.speed = speed
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self._sleep = sleep
+        self._closed = False
+
+    def _lines(self, fh):
+        pending = ""
+        while not self._closed:
+            line = fh.readline()
+            if line.endswith("\n"):
+                yield pending + line
+                pending = ""
+            elif not self.follow:
+                if pending + line:
+                    yield pending + line
+                return
+            else:
+                # A partly written last line is completed by a later read
+                pending += line
+                self._sleep(self.poll_interval)
+
+    def ticks(self):
+        prev = None
+        with open(self.path, encoding="utf-8") as fh:
+            for line in self._lines(fh):
+                if self._closed:
+                    return
+                tick = parse_tick(line)
+                if tick is None:
+                    continue
+                if self.speed and prev is not None and tick.ts > prev:
+                    self._sleep((tick.ts - prev) / 1000 / self.speed)
+                prev = tick.ts
+                yield tick
+
+    def close(self):
+        self._closed = True
+
+
+class SSEFeed(PriceFeed):
+    """Ticks from a Server-Sent Events stream whose `data:` lines are tick JSON."""
+
+    def __init__(self, url, session=None, timeout=30):
+        self.url = url
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self._response = None
+
+    def ticks(self):
+        self._response = self.session.get(self.url, stream=True, timeout=self.timeout,
+                                          headers={"Accept": "text/event-stream"})
+        self._response.raise_for_status()
+        data = []
+        for line in self._response.iter_lines(decode_unicode=True):
+            if line is None:
+                continue
+            if line.startswith("data:"):
+                data.append(line[5:].lstrip())
+            elif not line and data:
+                tick = parse_tick("\n".join(data))
+                data = []
+                if tick is not None:
+                    yield tick
+
+    def close(self):
+        if self._response is not None:
+            self._response.close()
+
+
+class FeedIngestor:
+    """Background thread that pumps a feed into a LatestPriceTable, reconnecting with backoff.
+
+    `feed_factory` builds a fresh PriceFeed for every (re)connect.
+    """
+
+    def __init__(self, feed_factory, table, backoff_base=0.5, backoff_max=30.0):
+        self.feed_factory = feed_factory
+        self.table = table
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connects = 0
+        self.errors = 0
+        self._feed = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="price-feed", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._feed is not None:
+            self._feed.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_once(self):
+        """Consume one connection until it ends; returns the number of ticks applied."""
+        self._feed = self.feed_factory()
+        self.connects += 1
+        n = 0
+        try:
+            for tick in self._feed.ticks():
+                if self._stopped.is_set():
+                    break
+                self.table.update(tick)
+                n += 1
+        finally:
+            self._feed.close()
+        return n
+
+    def _run(self):
+        failures = 0
+        while not self._stopped.is_set():
+            try:
+                failures = 0 if self.run_once() else failures + 1
+            except Exception:
+                self.errors += 1
+                failures += 1
+            delay = min(self.backoff_max, self.backoff_base * (2 ** max(failures - 1, 0)))
+            self._stopped.wait(delay)
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_price_table():
+    """Process-wide streamed price table, or None unless CRYPTOBUDDY_FEED_URL is set.
+
+    An http(s) URL is consumed as an SSE stream; anything else is read as a
+    recorded JSONL file (replayed at its recorded pace, then tailed for
+    appended ticks).
+    """
+    global _table
+    url = os.getenv("CRYPTOBUDDY_FEED_URL")
+    if not url:
+        return None
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                if url.startswith(("http://", "https://")):
+                    factory = lambda: SSEFeed(url)  # noqa: E731
+                else:
+                    factory = lambda: ReplayFeed(url, speed=1.0, follow=True)  # noqa: E731
+                table = LatestPriceTable()
+                FeedIngestor(factory, table).start()
+                _table = table
+    return _table
@@ -0,0 +1,249 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from async_fetch import fetch_many
+from coingecko import get_client
+
+POINT_DTYPE = np.dtype([("ts", "<i8"), ("price", "<f8")])
+DAY_MS = 86_400_000
+
+
+def default_history_dir():
+    root = os.getenv("CRYPTOBUDDY_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "cryptobuddy")
+    return os.path.join(root, "history")
+
+
+class PriceSeries:
+    """Sorted, de-duplicated (timestamp ms, price) arrays for one coin.
+
+    `revision` counts merges that corrected the price of an existing
+    timestamp, so consumers can tell a correction from a plain append.
+    """
+
+    def __init__(self, points=None):
+        self.points = np.empty(0, dtype=POINT_DTYPE)
+        self.revision = 0
+        if points is not None and len(points):
+            self.merge(points)
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def first_ts(self):
+        return int(self.points["ts"][0]) if len(self.points) else None
+
+    @property
+    def last_ts(self):
+        return int(self.points["ts"][-1]) if len(self.points) else None
+
+    def merge(self, points):
+        """Fold new points in (newest value wins on equal timestamps); returns the points that were new."""
+        return self.fold(points)[0]
+
+    def fold(self, points):
+        """`merge` returning `(new points, corrected points)`: the latter changed an existing timestamp's price."""
+        points = np.asarray(points, dtype=POINT_DTYPE)
+        if not len(points):
+            return points, points
+        old = self.points
+        merged = _latest_per_ts(np.concatenate([old, points]))
+        is_new = ~np.isin(merged["ts"], old["ts"], assume_unique=True)
+        # Every old timestamp survives the merge, so its position in the merged array is exact
+        pos = np.searchsorted(merged["ts"], old["ts"])
+        was, now = old["price"], merged["price"][pos]
+        corrected = pos[(was != now) & ~(np.isnan(was) & np.isnan(now))]
+        self.points = merged
+        if len(corrected):
+            self.revision += 1
+        return merged[is_new], merged[corrected]
+
+    def window(self, start_ms, end_ms=None):
+        """View of the points in [start_ms, end_ms]; a slice, not a copy."""
+        ts = self.points["ts"]
+        lo = np.searchsorted(ts, start_ms, side="left")
+        hi = len(ts) if end_ms is None else np.searchsorted(ts, end_ms, side="right")
+        return self.points[lo:hi]
+
+
+def _latest_per_ts(points):
+    """Points sorted by timestamp, keeping the last occurrence of each timestamp."""
+    # Reverse before unique() so the last occurrence of a timestamp is kept
+    _, idx = np.unique(points["ts"][::-1], return_index=True)
+    return points[::-1][idx]
+
+
+def points_from_payload(data):
+    """`market_chart` JSON -> structured point array."""
+    prices = (data or {}).get("prices") or []
+    if not prices:
+        return np.empty(0, dtype=POINT_DTYPE)
+    arr = np.asarray(prices, dtype="f8")
+    out = np.empty(len(arr), dtype=POINT_DTYPE)
+    out["ts"] = arr[:, 0].astype("i8")
+    out["price"] = arr[:, 1]
+    return out
+
+
+class PriceHistoryStore:
+    """Per-coin append-only price history that only downloads what it is missing.
+
+    Each coin lives in an append-only `<coin>.bin` log of (ts, price) records
+    under `directory` (or purely in memory when `directory` is None); a
+    corrected price is appended again, and the last record of a timestamp wins. A
+    request for a window fetches the tail since the newest stored point via
+    `/market_chart/range`, backfills only if the window reaches further back
+    than what is stored, then answers by slicing.
+    """
+
+    def __init__(self, directory=None, fetch=None, min_interval=300, clock=time.time):
+        self.directory = directory
+        self.fetch = fetch or get_client().get
+        self.min_interval = min_interval
+        self._clock = clock
+        self._series = {}
+        self._checked = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, coin_id):
+        return os.path.join(self.directory, f"{coin_id}.bin")
+
+    def series(self, coin_id):
+        with self._lock:
+            series = self._series.get(coin_id)
+            if series is None:
+                points = None
+                if self.directory and os.path.exists(self._path(coin_id)):
+                    points = np.fromfile(self._path(coin_id), dtype=POINT_DTYPE)
+                series = self._series[coin_id] = PriceSeries(points)
+            return series
+
+    def _append(self, coin_id, points):
+        series = self.series(coin_id)
+        with self._lock:
+            added, corrected = series.fold(points)
+            if self.directory and (len(added) or len(corrected)):
+                with open(self._path(coin_id), "ab") as fh:
+                    added.tofile(fh)
+                    corrected.tofile(fh)
+        return len(added)
+
+    def _jobs(self, coin_id, days):
+        """The requests needed so `coin_id` covers the last `days` days up to now."""
+        series = self.series(coin_id)
+        now_ms = int(self._clock() * 1000)
+        start_ms = now_ms - int(float(days) * DAY_MS)
+        base = f"/coins/{coin_id}/market_chart"
+        if not len(series):
+            return [(base, {"vs_currency": "usd", "days": str(days)})]
+        jobs = []
+        # CoinGecko's first point may land a few minutes after the requested start
+        if series.first_ts > start_ms + 3_600_000:
+            jobs.append((f"{base}/range", {"vs_currency": "usd", "from": start_ms // 1000, "to": series.first_ts // 1000}))
+        # Hourly granularity lags "now", so also remember when we last asked
+        newest = max(series.last_ts, self._checked.get(coin_id, 0))
+        if now_ms - newest > self.min_interval * 1000:
+            jobs.append((f"{base}/range", {"vs_currency": "usd", "from": series.last_ts // 1000, "to": now_ms // 1000}))
+        return jobs
+
+    def update(self, coin_id, days="7"):
+        """Fetch whatever is missing for the window; returns the number of new points."""
+        return self.update_many([coin_id], days)[coin_id]
+
+    def update_many(self, coin_ids, days="7"):
+        """`update` for several coins with all tail/backfill requests in flight at once."""
+        jobs = {}
+        for cid in coin_ids:
+            for i, job in enumerate(self._jobs(cid, days)):
+                jobs[(cid, i)] = job
+        added = {cid: 0 for cid in coin_ids}
+        now_ms = int(self._clock() * 1000)
+        for (cid, _), data in fetch_many(jobs, fetch=self.fetch).items():
+            if data is not None:
+                self._checked[cid] = now_ms
+            added[cid] += self._append(cid, points_from_payload(data))
+        return added
+
+    def window(self, coin_id, days="7", refresh=True):
+        """Points for the last `days` days, fetching only the missing tail first."""
+        if refresh:
+            self.update(coin_id, days)
+        start_ms = int(self._clock() * 1000) - int(float(days) * DAY_MS)
+        return self.series(coin_id).window(start_ms)
+
+    def coins(self):
+        """IDs of every coin with stored points, on disk or in memory."""
+        ids = {cid for cid, series in self._series.items() if len(series)}
+        if self.directory:
+            ids.update(name[:-4] for name in os.listdir(self.directory) if name.endswith(".bin"))
+        return sorted(ids)
+
+    def iter_points(self, coin_id, start_ms=None, end_ms=None, chunk_rows=65_536):
+        """Stored points in [start_ms, end_ms] in timestamp order, as arrays of at most `chunk_rows`.
+
+        Never fetches and never loads the coin into the store: a coin that
+        is not already in memory is read through a memory map of its log,
+        so only the yielded chunks are resident. Backfills and corrections
+        leave a log out of order or with repeated timestamps; such a coin is
+        sorted and de-duplicated in memory on its own.
+        """
+        with self._lock:
+            series = self._series.get(coin_id)
+        if series is not None or not self.directory:
+            points = series.points if series is not None else np.empty(0, dtype=POINT_DTYPE)
+        else:
+            points = _map_log(self._path(coin_id))
+            if len(points) and not _strictly_increasing(points["ts"]):
+                points = _latest_per_ts(np.asarray(points[_in_range(points["ts"], start_ms, end_ms)]))
+        ts = points["ts"]
+        lo = 0 if start_ms is None else np.searchsorted(ts, start_ms, side="left")
+        hi = len(ts) if end_ms is None else np.searchsorted(ts, end_ms, side="right")
+        for i in range(lo, hi, chunk_rows):
+            yield np.array(points[i:min(i + chunk_rows, hi)])
+
+
+def _map_log(path):
+    """Read-only memory map of a `<coin>.bin` log; a torn trailing record is ignored."""
+    try:
+        count = os.path.getsize(path) // POINT_DTYPE.itemsize
+    except OSError:
+        count = 0
+    if not count:
+        return np.empty(0, dtype=POINT_DTYPE)
+    return np.memmap(path, dtype=POINT_DTYPE, mode="r", shape=(count,))
+
+
+def _strictly_increasing(ts, chunk=1 << 20):
+    for lo in range(0, len(ts) - 1, chunk):
+        part = ts[lo:lo + chunk + 1]
+        if (part[1:] <= part[:-1]).any():
+            return False
+    return True
+
+
+def _in_range(ts, start_ms, end_ms):
+    mask = np.ones(len(ts), dtype=bool)
+    if start_ms is not None:
+        mask &= ts >= start_ms
+    if end_ms is not None:
+        mask &= ts <= end_ms
+    return mask
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Process-wide store under `default_history_dir()`."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PriceHistoryStore(default_history_dir())
+    return _store
@@ -0,0 +1,109 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from price_feed import parse_tick
+
+
+class ReplayServer:
+    """Local SSE price stream that replays recorded JSONL ticks, for tests and demos.
+
+    Every client connecting to `/ticks` gets the whole recording as
+    `data: {...}` events, paced by the recorded timestamps divided by
+    `speed` (0 sends them as fast as possible). With `loop` the recording
+    restarts, shifted forward in time, until the client disconnects.
+    """
+
+    def __init__(self, path, speed=0.0, loop=False, port=0):
+        with open(path, encoding="utf-8") as fh:
+            self.ticks = [t for t in map(parse_tick, fh) if t is not None]
+        self.speed = speed
+        self.loop = loop
+        self.clients = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/ticks"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def events(self):
+        """(delay seconds, event bytes) for one client, in replay order."""
+        if not self.ticks:
+            return
+        span = self.ticks[-1].ts - self.ticks[0].ts + 1000
+        shift = 0
+        while True:
+            prev = None
+            for tick in self.ticks:
+                ts = tick.ts + shift
+                delay = (ts - prev) / 1000 / self.speed if self.speed and prev is not None else 0.0
+                prev = ts
+                body = json.dumps({"id": tick.coin_id, "price": tick.price, "ts": ts})
+                yield delay, f"data: {body}\n\n".encode()
+            if not self.loop:
+                return
+            shift += span
+
+    def _handler(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/ticks":
+                    self.send_error(404)
+                    return
+                replay.clients += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                try:
+                    for delay, event in replay.events():
+                        if delay > 0:
+                            time.sleep(delay)
+                        self.wfile.write(event)
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded JSONL ticks as an SSE price stream.")
+    parser.add_argument("path", help="JSONL file of {\"id\", \"price\", \"ts\"} ticks")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier (0 = no pacing)")
+    parser.add_argument("--loop", action="store_true", help="restart the recording when it ends")
+    # Not the chat server's 8765, so both run on one host with their defaults
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    with ReplayServer(args.path, speed=args.speed, loop=args.loop, port=args.port) as server:
+        print(f"Streaming {len(server.ticks)} ticks at {server.url} (export CRYPTOBUDDY_FEED_URL={server.url})")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,60 @@
+import functools
+import threading
+from collections import OrderedDict
+
+from metrics import span
+
+
+class ReportCache:
+    """Rendered answers keyed by (command, data version, args); least recently used go first.
+
+    A new market snapshot bumps the version, so stale entries are never
+    served; they just age out.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        text = render()
+        with self._lock:
+            self._entries[key] = text
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def cached_report(command):
+    """Method decorator: reuse the text `command` rendered for the same `self.report_version()` and args."""
+
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            key = (command, self.report_version(), args)
+            return self.report_cache.get_or_render(key, lambda: _render(command, method, self, args))
+
+        return wrapper
+
+    return decorate
+
+
+def _render(command, method, bot, args):
+    with span("render", report=command):
+        return method(bot, *args)
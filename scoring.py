@@ -0,0 +1,127 @@
+from collections import namedtuple
+
+import numpy as np
+
+from market_model import MarketSnapshot
+from metrics import span
+
+# One set of rules for every ranking. A coin scores:
+#   `rising` points if its 24h change is positive
+#   + momentum * 24h change, capped at momentum_cap (only while rising)
+#   + the points of the first (max_rank, points) tier its market cap rank fits
+#   + green_bonus if its sustainability score is at least green_threshold
+#   + sustainability * its sustainability score
+#   + trend * its indicator momentum (% over the indicator window), capped at +/- trend_cap
+ScoringWeights = namedtuple(
+    "ScoringWeights",
+    ["rising", "momentum", "momentum_cap", "rank_tiers", "green_bonus", "green_threshold", "sustainability",
+     "trend", "trend_cap"],
+    defaults=[3.0, 0.0, 0.0, (), 0.0, 7, 0.0, 0.0, 0.0],
+)
+
+# Live rankings also read stored history: a point per % of indicator momentum, up to +/- 1 (1.5 balanced)
+LONG_TERM_WEIGHTS = ScoringWeights(rising=3.0, rank_tiers=((10, 2.0),), green_bonus=3.0, sustainability=0.2,
+                                   trend=0.1, trend_cap=1.0)
+BALANCED_WEIGHTS = ScoringWeights(rising=3.0, momentum=0.1, momentum_cap=2.0,
+                                  rank_tiers=((5, 2.0), (15, 1.0)), sustainability=0.4, trend=0.1, trend_cap=1.5)
+
+# Offline data only has trend/cap labels; they map onto the same columns
+OFFLINE_LONG_TERM_WEIGHTS = ScoringWeights(rising=3.0, rank_tiers=((10, 2.0), (50, 1.0)), sustainability=0.3)
+OFFLINE_BALANCED_WEIGHTS = ScoringWeights(rising=3.0, rank_tiers=((10, 2.0), (50, 1.0)), sustainability=0.4)
+CAP_LABEL_RANK = {"high": 1, "medium": 11, "low": 51}
+
+
+class MarketFrame:
+    """Column view of a market snapshot: one NumPy array per scoring input.
+
+    Row i describes `ids[i]`. Missing 24h changes are 0, missing ranks are
+    +inf and coins without curated sustainability data have NaN there, as do
+    coins without a `trend` (indicator momentum) reading.
+    """
+
+    def __init__(self, ids, change, rank, sustainability, trend=None):
+        self.ids = ids
+        self.change = np.asarray(change, dtype=np.float64)
+        self.rank = np.asarray(rank, dtype=np.float64)
+        self.sustainability = np.asarray(sustainability, dtype=np.float64)
+        self.trend = np.full(len(ids), np.nan) if trend is None else np.asarray(trend, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, sustainability_data=None):
+        sustainability_data = sustainability_data or {}
+        if isinstance(snapshot, MarketSnapshot):
+            ids = snapshot.ids
+            change = np.nan_to_num(snapshot.column("price_change_percentage_24h"), nan=0.0)
+            rank = np.nan_to_num(snapshot.column("market_cap_rank"), nan=np.inf)
+        else:
+            ids = [c["id"] for c in snapshot]
+            change = np.fromiter((c.get("price_change_percentage_24h") or 0.0 for c in snapshot), np.float64, len(ids))
+            rank = np.fromiter((c.get("market_cap_rank") or np.inf for c in snapshot), np.float64, len(ids))
+        sus = np.fromiter(
+            (sustainability_data.get(cid, {}).get("sustainability_score", np.nan) for cid in ids),
+            np.float64, len(ids),
+        )
+        return cls(ids, change, rank, sus)
+
+    @classmethod
+    def from_offline(cls, offline_db):
+        names = list(offline_db)
+        change = [1.0 if offline_db[n]["price_trend"] == "rising" else 0.0 for n in names]
+        rank = [CAP_LABEL_RANK.get(offline_db[n]["market_cap"], np.inf) for n in names]
+        sus = [offline_db[n]["sustainability_score"] for n in names]
+        return cls(names, change, rank, sus)
+
+
+def score(frame, weights):
+    """Score every row of `frame` at once; returns a float64 array."""
+    rising = frame.change > 0
+    scores = np.where(rising, weights.rising, 0.0)
+    if weights.momentum:
+        scores += np.where(rising, np.minimum(frame.change * weights.momentum, weights.momentum_cap), 0.0)
+
+    tier_points = np.zeros(len(frame))
+    unassigned = np.ones(len(frame), dtype=bool)
+    for max_rank, points in weights.rank_tiers:
+        hit = unassigned & (frame.rank <= max_rank)
+        tier_points[hit] = points
+        unassigned &= ~hit
+    scores += tier_points
+
+    known = ~np.isnan(frame.sustainability)
+    sus = np.where(known, frame.sustainability, 0.0)
+    if weights.green_bonus:
+        scores += np.where(known & (sus >= weights.green_threshold), weights.green_bonus, 0.0)
+    scores += sus * weights.sustainability
+    if weights.trend:
+        trend = np.nan_to_num(frame.trend, nan=0.0) * weights.trend
+        if weights.trend_cap:
+            trend = np.clip(trend, -weights.trend_cap, weights.trend_cap)
+        scores += trend
+    return scores
+
+
+def top_k(scores, k):
+    """Indices of the `k` best scores, best first; ties keep snapshot order."""
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > kth)
+        # Ties at the cut-off go to the earliest rows, like a stable sort would
+        ties = np.flatnonzero(scores == kth)[: k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(n)
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def rank(frame, weights, k):
+    """[(row index, score), ...] for the top `k` rows of `frame` under `weights`."""
+    with span("score"):
+        scores = score(frame, weights)
+        return [(int(i), float(scores[i])) for i in top_k(scores, k)]
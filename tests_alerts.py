@@ -0,0 +1,214 @@
+import asyncio
+import gc
+import json
+
+import advisor
+from alerts import AlertEngine, AlertStore, alert_message, answer_alert_command, is_alert_command
+from chat_server import ChatServer
+from crypto_buddy import CryptoBuddy
+from disk_cache import DiskCache
+from market_model import MarketSnapshot
+
+MARKETS = [
+    {"id": "bitcoin", "name": "Bitcoin", "symbol": "btc", "current_price": 60000.0, "market_cap": 1.2e12,
+     "market_cap_rank": 1, "total_volume": 3e10, "price_change_percentage_24h": 2.5},
+    {"id": "ethereum", "name": "Ethereum", "symbol": "eth", "current_price": 3000.0, "market_cap": 3.6e11,
+     "market_cap_rank": 2, "total_volume": 1.5e10, "price_change_percentage_24h": 1.0},
+]
+
+
+def snapshot(**prices):
+    return MarketSnapshot([{"id": cid, "current_price": p} for cid, p in prices.items()])
+
+
+def test_only_crossed_rules_fire_once(tmp_path):
+    engine = AlertEngine()
+    below_50k = engine.add("ann", "bitcoin", low=50000)
+    below_55k = engine.add("ann", "bitcoin", low=55000)
+    above_70k = engine.add("bob", "bitcoin", high=70000)
+    move = engine.add("bob", "ethereum", low=2850, high=3150)
+
+    assert engine.evaluate_snapshot(snapshot(bitcoin=60000.0, ethereum=3000.0)) == []
+    fired = engine.evaluate_snapshot(snapshot(bitcoin=54000.0, ethereum=3200.0))
+    assert sorted(n.alert.id for n in fired) == [below_55k.id, move.id]
+    # One-shot: the move rule's other bound went with it, and nothing fires twice
+    assert engine.evaluate_snapshot(snapshot(bitcoin=54000.0, ethereum=2000.0)) == []
+    assert engine.watched() == ["bitcoin"]
+    assert [n.alert.id for n in engine.evaluate([("bitcoin", 71000.0)])] == [above_70k.id]
+    assert [a.id for a in engine.alerts()] == [below_50k.id]
+    # A missing price fires nothing
+    assert engine.evaluate_snapshot([{"id": "bitcoin", "current_price": None}]) == []
+
+    assert engine.cancel("bob") == 0
+    assert engine.cancel("ann", below_50k.id) == 1
+    assert len(engine) == 0
+    assert [n.alert.id for n in engine.take("ann")] == [below_55k.id]
+    assert engine.take("ann") == []
+
+    # Every callback of an owner is reached, and leaving unsubscribes only that one
+    first, second = [], []
+    engine.subscribe("ann", first.append)
+    engine.subscribe("ann", second.append)
+    engine.add("ann", "bitcoin", high=70000)
+    engine.evaluate_snapshot(snapshot(bitcoin=71000.0))
+    assert len(first) == len(second) == 1
+    engine.unsubscribe("ann", first.append)
+    engine.add("ann", "bitcoin", high=80000)
+    engine.evaluate_snapshot(snapshot(bitcoin=81000.0))
+    assert len(first) == 1 and len(second) == 2
+
+
+def test_alerts_and_queued_notifications_survive_a_restart(tmp_path):
+    path = str(tmp_path / "alerts.sqlite3")
+    engine = AlertEngine(AlertStore(path))
+    kept = engine.add("ann", "bitcoin", low=50000, label="Bitcoin below $50,000.00")
+    queued = engine.add("ann", "ethereum", high=4000, label="Ethereum above $4,000.00")
+    pushed = engine.add("bob", "ethereum", high=3500)
+    received = []
+    engine.subscribe("bob", received.append)
+    engine.evaluate_snapshot(snapshot(bitcoin=60000.0, ethereum=4100.0))
+    assert [n.alert.id for n in received] == [pushed.id]
+
+    engine = AlertEngine(AlertStore(path))
+    assert [a.id for a in engine.alerts()] == [kept.id]
+    assert engine.add("ann", "bitcoin", high=1e6).id == pushed.id + 1
+    received = []
+    engine.subscribe("ann", received.append)
+    assert [(n.alert.id, n.value) for n in received] == [(queued.id, 4100.0)]
+    assert alert_message(received[0]) == "🔔 Alert #2: Ethereum above $4,000.00 (now $4,100.00)"
+    assert AlertEngine(AlertStore(path)).take("ann") == []
+    assert engine.reassign("ann", "carol") == 2
+    assert {a.owner for a in AlertEngine(AlertStore(path)).alerts()} == {"carol"}
+
+
+def test_unclaimed_notifications_expire_and_session_engines_go_with_their_session(tmp_path):
+    now = [1000.0]
+    path = str(tmp_path / "alerts.sqlite3")
+    engine = AlertEngine(AlertStore(path), clock=lambda: now[0], pending_ttl=3600)
+    engine.add("gone", "bitcoin", high=70000)
+    engine.add("ann", "bitcoin", high=70000)
+    engine.subscribe("ann", [].append)
+    engine.evaluate_snapshot(snapshot(bitcoin=71000.0))
+    now[0] += 1800
+    assert engine.expire() == 0
+    now[0] += 3600
+    assert engine.expire() == 1 and engine.take("gone") == []
+    assert AlertEngine(AlertStore(path)).store.undelivered() == []
+
+    engine = advisor.session_alerts()
+    engine.add(advisor.ALERT_OWNER, "bitcoin", high=1e6, label="Bitcoin above $1,000,000.00")
+    advisor._check_alerts(snapshot(bitcoin=2e6))
+    assert advisor.take_alerts(engine) == ["🔔 Alert #1: Bitcoin above $1,000,000.00 (now $2,000,000.00)"]
+    del engine
+    gc.collect()
+    assert len(advisor._session_engines) == 0
+
+
+def test_commands():
+    engine = AlertEngine()
+    coins = {"btc": "bitcoin", "eth": "ethereum", "sol": "solana"}
+
+    def resolve(name):
+        return coins.get(name.lower())
+
+    prices = {"ethereum": 3000.0, "solana": 100.0}
+    latest = {"solana": {"sma": 105.0, "ema": 95.0}}
+
+    def ask(text):
+        return answer_alert_command(text, engine, "ann", resolve, prices.get, str.title,
+                                    indicators=lambda ids: {cid: latest[cid] for cid in ids if cid in latest})
+
+    assert "Alert #1 set: Bitcoin below $50,000.00" in ask("Tell me when BTC drops below 50k")
+    assert "Alert #2 set: Ethereum moves 5% from $3,000.00" in ask("alert me if eth moves 5%")
+    assert "Alert #3 set: Bitcoin RSI above 70" in ask("notify me when btc rsi goes above 70")
+    assert "Alert #4 set: Solana crosses above its SMA" in ask("tell me when SOL crosses above its SMA")
+    # A crossing needs the price on the other side of the average now, or it would fire at once
+    assert "already above its EMA (+5.3%)" in ask("tell me when SOL crosses above its EMA")
+    assert "no price history for Bitcoin" in ask("tell me when BTC crosses below its SMA")
+    assert "don't know the coin 'doge'" in ask("tell me when doge goes above 1")
+    assert ask("what is the price of btc?") is None
+    assert not is_alert_command("is bitcoin sustainable?")
+
+    by_id = {a.id: a for a in engine.alerts()}
+    assert (by_id[2].low, by_id[2].high) == (2850.0, 3150.0)
+    assert (by_id[3].field, by_id[3].high) == ("rsi", 70.0)
+    assert (by_id[4].field, by_id[4].low, by_id[4].high) == ("sma_gap", None, 0.0)
+    assert ask("my alerts").count("\n   #") == 4
+    assert "Cancelled alert #3." in ask("cancel alert 3")
+    assert "no alert #3" in ask("cancel alert #3")
+    assert "Cancelled 3 alerts." in ask("cancel all alerts")
+    assert "no active alerts" in ask("show my alerts")
+
+    # A new rule that already holds fires at once, without touching anyone else's
+    bobs = engine.add("bob", "ethereum", high=2000)
+    assert "Alert #6 set" in ask("tell me when eth goes above 2900")
+    assert [n.alert.id for n in engine.take("ann")] == [6]
+    assert [a.id for a in engine.alerts()] == [bobs.id]
+    ask("my alerts")
+    assert engine.take("bob") == []
+
+
+def test_chat_sessions_get_their_alerts_pushed():
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), alerts=AlertEngine(AlertStore(":memory:")))
+    bot._fetch = lambda url, params=None: MARKETS if url.endswith("/markets") else None
+
+    async def read(reader):
+        return json.loads(await reader.readline())
+
+    async def ask(reader, writer, message):
+        writer.write(message.encode() + b"\n")
+        await writer.drain()
+        return (await read(reader))["reply"]
+
+    async def scenario():
+        server = await ChatServer(bot, port=0, workers=2).start()
+        ann = await asyncio.open_connection(*server.address)
+        guest = await asyncio.open_connection(*server.address)
+        assert "Hello ann" in await ask(*ann, "/user ann")
+        assert "Alert #1 set" in await ask(*ann, "tell me when btc goes above 70000")
+        assert "Alert #2 set" in await ask(*guest, "tell me when eth drops below 2000")
+        assert "#1 Bitcoin above $70,000.00" in await ask(*ann, "my alerts")
+        # Naming a session keeps the alerts it set so far
+        late = await asyncio.open_connection(*server.address)
+        assert "Alert #3 set" in await ask(*late, "tell me when btc goes above 80000")
+        assert "You have 1 active alert." in await ask(*late, "/user bob")
+        assert "#3 Bitcoin above $80,000.00" in await ask(*late, "my alerts")
+
+        bot.check_alerts(snapshot(bitcoin=71000.0, ethereum=3000.0))
+        assert await read(ann[0]) == {"alert": "🔔 Alert #1: Bitcoin above $70,000.00 (now $71,000.00)"}
+
+        # A name is held by one open connection at a time, and freed when it closes
+        twin = await asyncio.open_connection(*server.address)
+        assert "in use by another connection" in await ask(*twin, "/user ann")
+        assert "no active alerts" in await ask(*twin, "my alerts")
+        ann[1].close()
+        for _ in range(100):
+            reply = await ask(*twin, "/user ann")
+            if "Hello ann" in reply:
+                break
+            await asyncio.sleep(0.01)
+        assert "Hello ann" in reply
+        assert "Alert #4 set" in await ask(*twin, "tell me when btc goes above 65000")
+        bot.check_alerts(snapshot(bitcoin=75000.0, ethereum=3000.0))
+        assert (await read(twin[0]))["alert"].startswith("🔔 Alert #4")
+
+        # A guest's alerts end with its connection; a named user's stay
+        guest[1].close()
+        late[1].close()
+        twin[1].close()
+        await server.close()
+
+    asyncio.run(scenario())
+    assert [(a.id, a.owner) for a in bot.alerts.alerts()] == [(3, "chat:bob")]
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    test_only_crossed_rules_fire_once(pathlib.Path(tempfile.mkdtemp()))
+    test_alerts_and_queued_notifications_survive_a_restart(pathlib.Path(tempfile.mkdtemp()))
+    test_unclaimed_notifications_expire_and_session_engines_go_with_their_session(pathlib.Path(tempfile.mkdtemp()))
+    test_commands()
+    test_chat_sessions_get_their_alerts_pushed()
+    print("All alert tests passed.")
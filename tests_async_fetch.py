@@ -0,0 +1,77 @@
+import time
+
+from alerts import AlertEngine
+from async_fetch import fetch_many
+from coingecko import CoinGeckoClient
+from crypto_buddy import CryptoBuddy
+from disk_cache import DiskCache
+from fake_coingecko import FakeCoinGecko
+
+COINS = ["bitcoin", "ethereum", "solana", "cardano", "polkadot"]
+
+
+def stub_client(fake):
+    return CoinGeckoClient(api_key="", tier="pro", base_url=fake.base_url, max_retries=0)
+
+
+def test_fan_out_takes_about_one_request():
+    with FakeCoinGecko(latency=0.2) as fake:
+        client = stub_client(fake)
+        jobs = {cid: (f"/coins/{cid}/market_chart", {"vs_currency": "usd", "days": "1"}) for cid in COINS}
+        start = time.perf_counter()
+        results = fetch_many(jobs, fetch=client.get)
+        elapsed = time.perf_counter() - start
+    assert all(results[cid]["prices"] for cid in COINS)
+    assert elapsed < 0.2 * len(COINS) / 2
+
+
+def test_partial_results_on_failure_and_deadline():
+    with FakeCoinGecko(fail_ids={"solana"}) as fake:
+        client = stub_client(fake)
+        results = fetch_many({cid: (f"/coins/{cid}", None) for cid in COINS}, fetch=client.get)
+    assert results["solana"] is None
+    assert results["bitcoin"]["market_data"]["current_price"]["usd"] == 60000.0
+
+    def slow(url, params):
+        time.sleep(0.5 if "slow" in url else 0)
+        return url
+
+    start = time.perf_counter()
+    results = fetch_many({"fast": ("fast", None), "slow": ("slow", None)}, fetch=slow, deadline=0.1)
+    assert results == {"fast": "fast", "slow": None}
+    assert time.perf_counter() - start < 0.4
+
+
+def test_concurrency_limit():
+    in_flight, peak = [0], [0]
+
+    def fetch(url, params):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.02)
+        in_flight[0] -= 1
+        return url
+
+    fetch_many({i: (str(i), None) for i in range(12)}, fetch=fetch, limit=3)
+    assert peak[0] <= 3
+
+
+def test_detail_fallbacks_run_concurrently():
+    with FakeCoinGecko(latency=0.2) as fake:
+        bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), alerts=AlertEngine())
+        bot.client = stub_client(fake)
+        bot.base_url = fake.base_url
+        start = time.perf_counter()
+        coins = bot.lookup_coins(["bitcoin", "cardano"], fields=("current_price", "ath"))
+        elapsed = time.perf_counter() - start
+    assert coins["cardano"]["current_price"] == 0.45
+    # one markets snapshot, then both detail calls side by side
+    assert elapsed < 0.2 * 3
+
+
+if __name__ == "__main__":
+    test_fan_out_takes_about_one_request()
+    test_partial_results_on_failure_and_deadline()
+    test_concurrency_limit()
+    test_detail_fallbacks_run_concurrently()
+    print("All async fetch tests passed.")
@@ -0,0 +1,119 @@
+import json
+import time
+
+from alerts import AlertEngine
+from batch import answer_all, main, read_queries
+from coingecko import CoinGeckoClient
+from crypto_buddy import CryptoBuddy
+from disk_cache import DiskCache
+from fake_coingecko import DEFAULT_COINS, FakeCoinGecko
+from fx import FxTable
+
+TEMPLATES = [
+    "What's the price of Bitcoin?",
+    "Which crypto is trending?",
+    "What's the most sustainable coin?",
+    "Best for long-term growth?",
+    "Compare Bitcoin and Ethereum",
+    "Show all cryptocurrencies",
+    "Give me a recommendation",
+]
+
+
+def listed_coins(n):
+    coins = [dict(c) for c in DEFAULT_COINS]
+    for i in range(len(coins), n):
+        coins.append({"id": f"coin-{i}", "symbol": f"c{i}", "name": f"Coin {i}", "current_price": 1.0 + i,
+                      "market_cap": 1e9 / (i + 1), "market_cap_rank": i + 1, "total_volume": 1e6,
+                      "price_change_percentage_24h": 0.5})
+    return coins
+
+
+def fake_bot(fake):
+    client = CoinGeckoClient(api_key="", tier="pro", base_url=fake.base_url, max_retries=0)
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), fx=FxTable(fetch=client.get, disk_cache=DiskCache(":memory:")),
+                      alerts=AlertEngine())
+    bot.client, bot.base_url = client, fake.base_url
+    return bot
+
+
+def test_thousands_of_queries_take_a_handful_of_requests():
+    with FakeCoinGecko(coins=listed_coins(300)) as fake:
+        bot = fake_bot(fake)
+        bot.universe_pages = 2
+        # Every template many times over, plus the price of 150 coins outside the snapshot
+        texts = [TEMPLATES[i % len(TEMPLATES)] for i in range(3000)]
+        texts += [f"what's the price of c{i}?" for i in range(100, 250)]
+        start = time.perf_counter()
+        results = list(answer_all(bot, read_queries(texts), workers=8))
+        elapsed = time.perf_counter() - start
+        paths = list(fake.requests)
+
+    assert len(results) == 3150 and [r["id"] for r in results[:3]] == [1, 2, 3]
+    assert all(r["error"] is None for r in results), [r for r in results if r["error"]][:1]
+    assert results[0]["intent"] == "price" and "Bitcoin (BTC)" in results[0]["reply"]
+    assert results[4]["intent"] == "compare"
+    assert "Coin 120 (C120)" in results[3020]["reply"] and "$121.00" in results[3020]["reply"]
+    # One snapshot, two universe pages and two batched lookups; no per-coin detail calls
+    assert paths.count("/api/v3/coins/markets") == 5, paths
+    assert len(paths) == 5
+    assert elapsed < 10, elapsed
+
+
+def test_text_and_jsonl_input_to_json_results(tmp_path):
+    lines = [
+        "# prices first",
+        "What's the price of Bitcoin?",
+        json.dumps({"request_id": "q-2", "title": "Compare Bitcoin and Ethereum", "body": "side by side"}),
+        json.dumps({"id": 7, "query": "What's the price of Bitcoin?", "currency": "JPY"}),
+        "currency eur",
+        "What's the price of Bitcoin?",
+        "currency xyz",
+        "{not json",
+        json.dumps({"id": 9, "note": "no text"}),
+        "",
+    ]
+    queries = list(read_queries(lines))
+    assert [q.id for q in queries] == [2, "q-2", 7, 5, 6, 7, 8, 9]
+    assert queries[1].text == "Compare Bitcoin and Ethereum" and queries[2].currency == "jpy"
+
+    src, out = tmp_path / "queries.jsonl", tmp_path / "results.jsonl"
+    src.write_text("\n".join(lines), encoding="utf-8")
+    with FakeCoinGecko() as fake:
+        bot = fake_bot(fake)
+        assert main([str(src), "-o", str(out), "--workers", "4"], bot=bot) == 1
+    results = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+
+    assert [r["currency"] for r in results[:6]] == ["usd", "usd", "jpy", "eur", "eur", "eur"]
+    assert "$60,000.00" in results[0]["reply"] and "¥9,000,000" in results[2]["reply"]
+    assert results[3]["reply"] == "Answering in EUR." and "€55,200.00" in results[4]["reply"]
+    assert results[5]["error"] == "no exchange rate for XYZ"
+    assert results[6]["error"].startswith("invalid JSON") and "no query text" in results[7]["error"]
+    # The bot's own default is untouched
+    assert bot.default_currency == "usd"
+
+
+def test_alert_commands_act_in_input_order():
+    block = ["alert me when bitcoin goes above 1000000", "my alerts", "cancel alert {n}", "my alerts"]
+    texts = [line.format(n=i + 1) for i in range(50) for line in block]
+    texts += ["What's the price of Bitcoin?"] * 200
+    with FakeCoinGecko() as fake:
+        bot = fake_bot(fake)
+        results = list(answer_all(bot, read_queries(texts), workers=8))
+
+    assert all(r["error"] is None for r in results)
+    for i in range(50):
+        set_, listed, cancelled, empty = (r["reply"] for r in results[4 * i:4 * i + 4])
+        assert f"Alert #{i + 1} set" in set_ and f"#{i + 1} Bitcoin above" in listed, (i, listed)
+        assert f"Cancelled alert #{i + 1}." in cancelled and "no active alerts" in empty
+    assert len(bot.alerts) == 0
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    test_thousands_of_queries_take_a_handful_of_requests()
+    test_text_and_jsonl_input_to_json_results(pathlib.Path(tempfile.mkdtemp()))
+    test_alert_commands_act_in_input_order()
+    print("All batch tests passed.")
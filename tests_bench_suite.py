@@ -0,0 +1,15 @@
+from bench_suite import compare
+
+
+def test_compare_flags_slowdowns_and_throughput_drops():
+    baselines = {"a_ms": 10.0, "tiny_ms": 0.02, "rate_per_sec": 1000.0, "gone_ms": 5.0}
+    results = {"a_ms": 14.0, "tiny_ms": 0.5, "rate_per_sec": 800.0, "new_ms": 99.0}
+    assert compare(results, baselines) == []
+
+    results = {"a_ms": 20.0, "tiny_ms": 2.0, "rate_per_sec": 500.0}
+    assert [name for name, _, _ in compare(results, baselines)] == ["a_ms", "tiny_ms", "rate_per_sec"]
+
+
+if __name__ == "__main__":
+    test_compare_flags_slowdowns_and_throughput_drops()
+    print("All bench suite tests passed.")
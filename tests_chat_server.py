@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from alerts import AlertEngine
+from chat_server import ChatServer
+from crypto_buddy import CryptoBuddy
+from disk_cache import DiskCache
+
+MARKETS = [
+    {"id": "bitcoin", "name": "Bitcoin", "symbol": "btc", "current_price": 60000.0, "market_cap": 1.2e12,
+     "market_cap_rank": 1, "total_volume": 3e10, "price_change_percentage_24h": 2.5},
+    {"id": "cardano", "name": "Cardano", "symbol": "ada", "current_price": 0.5, "market_cap": 1.6e10,
+     "market_cap_rank": 9, "total_volume": 4e8, "price_change_percentage_24h": 4.0},
+]
+
+
+async def ask(reader, writer, message, as_json=False):
+    line = json.dumps({"message": message}) if as_json else message
+    writer.write(line.encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())["reply"]
+
+
+def test_sessions_share_data_but_not_state():
+    calls = []
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), alerts=AlertEngine())
+
+    def fake_fetch(url, params=None):
+        calls.append(url)
+        return [c for c in MARKETS if c["id"] in params.get("ids", "bitcoin,cardano")] if url.endswith("/markets") else None
+
+    bot._fetch = fake_fetch
+
+    async def scenario():
+        server = await ChatServer(bot, port=0, workers=4).start()
+        host, port = server.address
+        a = await asyncio.open_connection(host, port)
+        b = await asyncio.open_connection(host, port)
+        c = await asyncio.open_connection(host, port)
+
+        assert "Holding 2 Bitcoin" in await ask(*a, "/hold btc 2")
+        assert "Holding 100 Cardano" in await ask(*b, "/hold cardano 100", as_json=True)
+        answers = await asyncio.gather(ask(*a, "/portfolio"), ask(*b, "/portfolio"), ask(*c, "which coin is trending?"))
+        assert "Total value: $120,000.00" in answers[0]
+        assert "Total value: $50.00" in answers[1]
+        assert "TRENDING" in answers[2]
+        assert await ask(*b, "/history") == "1. /hold cardano 100\n2. /portfolio"
+        assert len(server.sessions) == 3
+
+        for _, writer in (a, b, c):
+            writer.close()
+        await server.close()
+        return server.requests
+
+    assert asyncio.run(scenario()) == 6
+    assert calls == [f"{bot.base_url}/coins/markets"]
+
+
+if __name__ == "__main__":
+    test_sessions_share_data_but_not_state()
+    print("All chat server tests passed.")
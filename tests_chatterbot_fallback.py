@@ -0,0 +1,70 @@
+import crypto_buddy
+from alerts import AlertEngine
+from crypto_buddy import CORPUS_FINGERPRINT, CryptoBuddy, _stored_fingerprint
+from disk_cache import DiskCache
+
+
+class FakeStorage:
+    def __init__(self):
+        self.statements = []
+
+    def drop(self):
+        self.statements.clear()
+
+
+class FakeChatBot:
+    instances = []
+
+    def __init__(self, name, **kwargs):
+        self.storage = FakeStorage()
+        FakeChatBot.instances.append(self)
+
+    def get_response(self, text):
+        return "small talk"
+
+
+class FakeTrainer:
+    runs = 0
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def train(self, conversation):
+        FakeTrainer.runs += 1
+        self.bot.storage.statements.extend(conversation)
+
+
+def make_bot(db_path):
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), alerts=AlertEngine())
+    bot.chatbot_db = str(db_path)
+    return bot
+
+
+def test_chatbot_is_lazy_and_trains_once(tmp_path, monkeypatch):
+    loads = []
+    monkeypatch.setattr(crypto_buddy, "_load_chatterbot", lambda: loads.append(1) or (FakeChatBot, FakeTrainer))
+    FakeTrainer.runs = 0
+    db = tmp_path / "cryptobuddy.db"
+
+    bot = make_bot(db)
+    assert loads == [] and bot.chatbot is None
+    assert bot.process_response("tell me a joke") == "\nsmall talk\n"
+    assert FakeTrainer.runs == 1
+    assert _stored_fingerprint(str(db)) == CORPUS_FINGERPRINT
+
+    # A second launch against the same DB skips training
+    again = make_bot(db)
+    again.process_response("how are you")
+    assert FakeTrainer.runs == 1 and len(loads) == 2
+
+
+def test_rule_based_when_chatterbot_missing(tmp_path, monkeypatch):
+    monkeypatch.setattr(crypto_buddy, "_load_chatterbot", lambda: None)
+    bot = make_bot(tmp_path / "cryptobuddy.db")
+    assert "I'm not sure about that" in bot.process_response("tell me a joke")
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,156 @@
+import json
+import os
+import tempfile
+import time
+
+from coingecko import CoinGeckoClient, TokenBucket, endpoint_key, parse_retry_after
+from fake_coingecko import FakeCoinGecko, record_fixtures
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = headers or {}
+
+    @property
+    def content(self):
+        return json.dumps(self._payload).encode()
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.headers = {}
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, params))
+        return self.responses.pop(0)
+
+
+def make_client(responses, **kwargs):
+    clock = FakeClock()
+    session = FakeSession(responses)
+    client = CoinGeckoClient(api_key="", tier="pro", session=session, clock=clock, sleep=clock.sleep, **kwargs)
+    return client, session, clock
+
+
+def test_token_bucket_waits_for_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire() and bucket.acquire()
+    assert bucket.acquire()
+    assert clock.sleeps == [0.5]
+    assert not bucket.acquire(max_wait=0.1)
+
+
+def test_public_tier_fan_out_queues_instead_of_failing():
+    clock = FakeClock()
+    session = FakeSession([FakeResponse(200, payload={"ok": True})] * 16)
+    client = CoinGeckoClient(api_key="", tier="public", session=session, clock=clock, sleep=clock.sleep)
+    # A minute's budget goes out at once, the rest queue at the refill rate
+    assert all(client.get(f"/coins/c{i}") == {"ok": True} for i in range(16))
+    assert clock.sleeps == [6.0] * 6
+    assert client.stats()["/coins/{id}"]["throttled"] == 0
+
+    # Beyond `queue_wait`, the request is counted as throttled
+    client = CoinGeckoClient(api_key="", tier="public", session=FakeSession([]), clock=clock, sleep=clock.sleep,
+                             queue_wait=0)
+    client.limiter.tokens = 0
+    assert client.get("/coins/bitcoin") is None
+    assert client.stats()["/coins/{id}"]["throttled"] == 1
+
+
+def test_retry_after_is_honoured():
+    client, session, clock = make_client([
+        FakeResponse(429, headers={"Retry-After": "7"}),
+        FakeResponse(200, payload=[{"id": "bitcoin"}]),
+    ])
+    assert client.get("/coins/markets", {"vs_currency": "usd"}) == [{"id": "bitcoin"}]
+    assert len(session.calls) == 2
+    assert 7 in clock.sleeps
+
+    stats = client.stats()["/coins/markets"]
+    assert stats["requests"] == 2 and stats["retries"] == 1
+    assert stats["statuses"] == {429: 1, 200: 1}
+
+
+def test_gives_up_after_max_retries():
+    client, session, _ = make_client([FakeResponse(503)] * 3, max_retries=2)
+    assert client.get("/coins/bitcoin") is None
+    assert len(session.calls) == 3
+    assert client.stats()["/coins/{id}"]["errors"] == 1
+
+
+def test_full_url_and_endpoint_keys():
+    client, session, _ = make_client([FakeResponse(200, payload={"prices": []})])
+    client.get(f"{client.base_url}/coins/solana/market_chart", {"days": "7"})
+    assert "/coins/{id}/market_chart" in client.stats()
+    assert endpoint_key("/coins/markets") == "/coins/markets"
+    assert parse_retry_after("bogus") is None
+
+
+def test_fake_server_throttles_and_client_retries():
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        time.sleep(seconds)
+
+    with FakeCoinGecko(rate_limit=2, retry_after=0) as fake:
+        client = CoinGeckoClient(api_key="", tier="pro", base_url=fake.base_url, max_retries=5,
+                                 backoff_base=0.3, sleep=sleep)
+        for _ in range(3):
+            assert client.get("/coins/bitcoin")["id"] == "bitcoin"
+        assert fake.statuses[429] >= 1 and fake.statuses[200] == 3
+    assert client.stats()["/coins/{id}"]["statuses"][429] == fake.statuses[429]
+    assert sleeps
+
+    with FakeCoinGecko(error_rate=1.0) as fake:
+        client = CoinGeckoClient(api_key="", tier="pro", base_url=fake.base_url, max_retries=0)
+        assert client.get("/coins/markets", {"vs_currency": "usd"}) is None
+        assert fake.statuses == {500: 1}
+
+
+def test_fixtures_round_trip():
+    directory = tempfile.mkdtemp()
+    with FakeCoinGecko() as source:
+        client = CoinGeckoClient(api_key="", tier="pro", base_url=source.base_url, max_retries=0)
+        assert record_fixtures(directory, fetch=client.get, ids=["bitcoin"], days="1") == ["bitcoin"]
+    assert os.path.exists(os.path.join(directory, "market_chart", "bitcoin.json"))
+
+    with FakeCoinGecko(fixtures=directory) as fake:
+        client = CoinGeckoClient(api_key="", tier="pro", base_url=fake.base_url, max_retries=0)
+        recorded = fake.charts["bitcoin"]
+        chart = client.get("/coins/bitcoin/market_chart", {"vs_currency": "usd", "days": "1"})
+        markets = client.get("/coins/markets", {"vs_currency": "usd"})
+    assert chart["prices"] and chart["prices"][-1] == recorded[-1]
+    assert [c["id"] for c in markets][0] == "bitcoin"
+
+
+if __name__ == "__main__":
+    test_token_bucket_waits_for_refill()
+    test_public_tier_fan_out_queues_instead_of_failing()
+    test_retry_after_is_honoured()
+    test_gives_up_after_max_retries()
+    test_full_url_and_endpoint_keys()
+    test_fake_server_throttles_and_client_retries()
+    test_fixtures_round_trip()
+    print("All coingecko client tests passed.")
@@ -0,0 +1,80 @@
+import time
+
+from alerts import AlertEngine
+from crypto_buddy import CryptoBuddy
+from disk_cache import DiskCache
+from fake_coingecko import DEFAULT_COINS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_roundtrip_and_timestamps(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    DiskCache(path).put("markets:bitcoin", DEFAULT_COINS[:1], fetched_at=42.0)
+    entry = DiskCache(path).get("markets:bitcoin")
+    assert entry.value[0]["id"] == "bitcoin"
+    assert entry.fetched_at == 42.0
+
+
+def test_evicts_least_recently_read():
+    clock = FakeClock()
+    cache = DiskCache(":memory:", max_bytes=250, clock=clock)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        cache.put(key, "x" * 100)
+    assert cache.get("a") is None
+    clock.now += 1
+    cache.get("b")
+    clock.now += 1
+    cache.put("d", "x" * 100)
+    assert cache.get("b") is not None and cache.get("c") is None
+    assert cache.size() <= 250
+
+
+def test_cached_fetch_serves_stale_and_refreshes():
+    clock = FakeClock()
+    cache = DiskCache(":memory:", clock=clock)
+    calls = []
+
+    def loader():
+        calls.append(clock.now)
+        return {"n": len(calls)}
+
+    assert cache.cached_fetch("k", loader, max_age=60) == {"n": 1}
+    assert cache.cached_fetch("k", loader, max_age=60) == {"n": 1}
+    clock.now += 120
+    assert cache.cached_fetch("k", loader, max_age=60) == {"n": 1}
+    for _ in range(100):
+        if cache.get("k").value == {"n": 2}:
+            break
+        time.sleep(0.01)
+    assert cache.get("k").value == {"n": 2}
+
+
+def test_cli_starts_from_last_known_snapshot_when_offline():
+    disk = DiskCache(":memory:")
+    online = CryptoBuddy(disk_cache=disk, alerts=AlertEngine())
+    online._fetch = lambda url, params=None: DEFAULT_COINS if url.endswith("/coins/markets") else None
+    online.show_all()
+
+    offline = CryptoBuddy(disk_cache=disk, alerts=AlertEngine())
+    offline._fetch = lambda url, params=None: None
+    assert "$60,000.00" in offline.get_price("Bitcoin")
+    assert "Dogecoin" in offline.find_trending()
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    test_roundtrip_and_timestamps(pathlib.Path(tempfile.mkdtemp()))
+    test_evicts_least_recently_read()
+    test_cached_fetch_serves_stale_and_refreshes()
+    test_cli_starts_from_last_known_snapshot_when_offline()
+    print("All disk cache tests passed.")
@@ -0,0 +1,48 @@
+import numpy as np
+
+from downsample import lttb_indices, minmax_indices
+
+
+def reference_lttb(x, y, n):
+    """Straightforward LTTB, as usually published."""
+    size = len(y)
+    every = (size - 2) / (n - 2)
+    out, a = [0], 0
+    for i in range(n - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        nlo, nhi = hi, min(int((i + 2) * every) + 1, size)
+        if i == n - 3:
+            nlo, nhi = size - 1, size
+        ax, ay = np.mean(x[nlo:nhi]), np.mean(y[nlo:nhi])
+        best = max(range(lo, hi), key=lambda j: abs((x[a] - ax) * (y[j] - y[a]) - (x[a] - x[j]) * (ay - y[a])))
+        out.append(best)
+        a = best
+    return out + [size - 1]
+
+
+def test_lttb_matches_reference_and_keeps_spikes():
+    rng = np.random.default_rng(5)
+    x = np.arange(5000, dtype=float)
+    y = np.cumsum(rng.normal(size=5000))
+    y[1234] += 500.0
+    idx = lttb_indices(x, y, 300)
+    assert len(idx) == 300 and idx[0] == 0 and idx[-1] == 4999
+    assert np.all(np.diff(idx) > 0)
+    assert 1234 in idx
+    assert list(idx) == reference_lttb(x, y, 300)
+    assert list(lttb_indices(x[:100], y[:100], 300)) == list(range(100))
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    rng = np.random.default_rng(6)
+    y = rng.normal(size=100_000)
+    idx = minmax_indices(y, 1000)
+    assert len(idx) <= 1002 and np.all(np.diff(idx) > 0)
+    assert y.argmin() in idx and y.argmax() in idx
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+
+
+if __name__ == "__main__":
+    test_lttb_matches_reference_and_keeps_spikes()
+    test_minmax_keeps_every_bucket_extreme()
+    print("All downsampling tests passed.")
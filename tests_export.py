@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import os
+import tracemalloc
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from coingecko import CoinGeckoClient
+from export import HISTORY_COLUMNS, columns_for, export, history_chunks, market_chunks, to_ms
+from fake_coingecko import FakeCoinGecko
+from price_history import POINT_DTYPE, PriceHistoryStore
+
+START_MS = 1_700_000_000_000
+MINUTE_MS = 60_000
+
+
+def write_log(directory, coin_id, n, shuffled=False):
+    points = np.empty(n, dtype=POINT_DTYPE)
+    points["ts"] = START_MS + np.arange(n) * MINUTE_MS
+    points["price"] = np.arange(n) * 0.5
+    if shuffled:
+        # What a backfill leaves behind: the newer half first
+        points = np.concatenate([points[n // 2:], points[:n // 2]])
+    points.tofile(os.path.join(directory, f"{coin_id}.bin"))
+
+
+def offline_store(directory):
+    return PriceHistoryStore(str(directory), fetch=lambda *a: None)
+
+
+def test_history_formats_columns_and_time_range(tmp_path):
+    write_log(tmp_path, "bitcoin", 1000)
+    write_log(tmp_path, "ethereum", 1000, shuffled=True)
+    store = offline_store(tmp_path)
+    assert store.coins() == ["bitcoin", "ethereum"]
+
+    start, end = START_MS + 10 * MINUTE_MS, START_MS + 19 * MINUTE_MS
+    out = tmp_path / "h.csv"
+    assert export(history_chunks(None, start, end, store=store, chunk_rows=7), str(out), "csv", HISTORY_COLUMNS) == 20
+    rows = list(csv.reader(open(out, encoding="utf-8")))
+    assert rows[0] == ["coin_id", "timestamp", "price"]
+    assert rows[1] == ["bitcoin", "2023-11-14T22:23:20.000Z", "5.0"]
+    # The out-of-order log still comes out in time order
+    eth = [r for r in rows[1:] if r[0] == "ethereum"]
+    assert [float(r[2]) for r in eth] == [i * 0.5 for i in range(10, 20)]
+
+    buf = io.BytesIO()
+    columns = columns_for("history", ["price", "coin_id"])
+    export(history_chunks(["ethereum"], "2023-11-14T22:13:20", START_MS + MINUTE_MS, store=store), buf, "jsonl",
+           columns)
+    assert [json.loads(line) for line in buf.getvalue().splitlines()] == [
+        {"price": 0.0, "coin_id": "ethereum"}, {"price": 0.5, "coin_id": "ethereum"}]
+
+    out = tmp_path / "h.parquet"
+    assert export(history_chunks(store=store, chunk_rows=300), str(out), "parquet", HISTORY_COLUMNS) == 2000
+    table = pq.read_table(out)
+    assert str(table.schema.field("timestamp").type) == "timestamp[ms, tz=UTC]"
+    assert table.column("price").to_pylist()[1000:1003] == [0.0, 0.5, 1.0]
+    assert pq.ParquetFile(out).num_row_groups == 7
+
+    try:
+        columns_for("history", ["price", "volume"])
+        raise AssertionError("unknown column accepted")
+    except ValueError as e:
+        assert "volume" in str(e)
+    assert to_ms("2023-11-14T22:13:20") == START_MS
+
+
+def test_memory_stays_flat_as_exports_grow(tmp_path):
+    peaks = {}
+    for n in (50_000, 400_000):
+        directory = tmp_path / str(n)
+        directory.mkdir()
+        write_log(directory, "bitcoin", n)
+        store = offline_store(directory)
+        for fmt in ("csv", "jsonl"):
+            tracemalloc.start()
+            rows = export(history_chunks(store=store, chunk_rows=5_000), str(directory / f"h.{fmt}"), fmt,
+                          HISTORY_COLUMNS)
+            peaks[n, fmt] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert rows == n
+    for fmt in ("csv", "jsonl"):
+        # 8x the rows (6.4 MB of points) for about the same peak
+        assert peaks[400_000, fmt] < peaks[50_000, fmt] * 1.25 + 256 * 1024, peaks
+        assert peaks[400_000, fmt] < 400_000 * POINT_DTYPE.itemsize / 2, peaks
+
+
+def test_market_export_pages_through_the_market(tmp_path):
+    with FakeCoinGecko() as fake:
+        client = CoinGeckoClient(base_url=fake.base_url, tier="pro")
+        chunks = list(market_chunks(per_page=3, fetch=client.get))
+        assert [len(c["id"]) for c in chunks] == [3, 3, 2]
+        assert sum("/coins/markets" in p for p in fake.requests) == 3
+        assert chunks[0]["id"][:2] == ["bitcoin", "ethereum"]
+
+        buf = io.BytesIO()
+        assert export(market_chunks(pages=1, per_page=3, fetch=client.get), buf, "csv",
+                      columns_for("market", ["symbol", "current_price"])) == 3
+        assert buf.getvalue().decode().splitlines()[:2] == ["symbol,current_price", "btc,60000.0"]
+
+    # A failed export leaves neither the file nor its partial
+    def failing():
+        yield {"id": ["bitcoin"]}
+        raise RuntimeError("network down")
+
+    out = tmp_path / "m.csv"
+    try:
+        export(failing(), str(out), "csv", ("id",))
+        raise AssertionError("error swallowed")
+    except RuntimeError:
+        pass
+    assert os.listdir(tmp_path) == []
+
+    # So does a markets page that fails mid-export
+    with FakeCoinGecko() as fake:
+        client = CoinGeckoClient(base_url=fake.base_url, tier="pro")
+
+        def flaky(path, params=None):
+            return None if params.get("page") == 2 else client.get(path, params)
+
+        try:
+            export(market_chunks(per_page=3, fetch=flaky), str(out), "csv", ("id",))
+            raise AssertionError("truncated export reported as success")
+        except RuntimeError as e:
+            assert "page 2" in str(e)
+    assert os.listdir(tmp_path) == []
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    test_history_formats_columns_and_time_range(pathlib.Path(tempfile.mkdtemp()))
+    test_memory_stays_flat_as_exports_grow(pathlib.Path(tempfile.mkdtemp()))
+    test_market_export_pages_through_the_market(pathlib.Path(tempfile.mkdtemp()))
+    print("All export tests passed.")
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+
+from alerts import AlertEngine
+from chat_server import ChatServer
+from coingecko import CoinGeckoClient
+from crypto_buddy import CryptoBuddy
+from disk_cache import DiskCache
+from fake_coingecko import FakeCoinGecko
+from fx import FxTable, format_money, parse_exchange_rates
+from market_model import MarketSnapshot
+from price_history import POINT_DTYPE
+
+RATES = {"rates": {"btc": {"value": 1.0, "type": "crypto"}, "usd": {"value": 60000.0, "type": "fiat"},
+                   "eur": {"value": 55200.0, "type": "fiat"}, "jpy": {"value": 9e6, "type": "fiat"}}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rates_formatting_and_ttl():
+    assert parse_exchange_rates(RATES) == {"usd": 1.0, "eur": 0.92, "jpy": 150.0}
+    assert parse_exchange_rates({"error": "rate limited"}) is None
+    assert format_money(1234.567, "eur") == "€1,234.57"
+    assert format_money(1234.567, "jpy") == "¥1,235"
+    assert format_money(-5, "usd") == "-$5.00"
+    assert format_money(10, "chf") == "10.00 CHF"
+
+    calls = []
+    clock = Clock()
+    fx = FxTable(fetch=lambda path: calls.append(path) or RATES, disk_cache=DiskCache(":memory:", clock=clock),
+                 ttl=3600, clock=clock)
+    assert fx.rate("usd") == 1.0 and calls == []
+    assert fx.rate("eur") == 0.92 and fx.rate("jpy") == 150.0 and fx.rate("xyz") is None
+    assert calls == ["/exchange_rates"]
+    clock.now += 1800
+    fx.rate("eur")
+    assert len(calls) == 1
+
+
+def test_failed_loads_are_retried_and_refreshes_picked_up():
+    clock = Clock()
+    responses = [None, RATES, {"rates": dict(RATES["rates"], eur={"value": 57000.0, "type": "fiat"})}]
+    calls, release = [], threading.Event()
+
+    def fetch(path):
+        calls.append(path)
+        if len(calls) == 3:
+            release.wait(5)
+        return responses[len(calls) - 1]
+
+    fx = FxTable(fetch=fetch, disk_cache=DiskCache(":memory:", clock=clock), ttl=3600, clock=clock, retry=60)
+    assert fx.rate("eur") is None and fx.version is None
+    clock.now += 30
+    assert fx.rate("eur") is None and len(calls) == 1
+    clock.now += 30
+    assert fx.rate("eur") == 0.92 and len(calls) == 2
+    version = fx.version
+
+    # Expired: the old table is served while the disk cache refreshes in the background
+    clock.now += 3600
+    assert fx.rate("eur") == 0.92
+    release.set()
+    deadline = time.time() + 5
+    while fx._disk_cache.get("fx:rates").value["eur"] != 0.95 and time.time() < deadline:
+        time.sleep(0.01)
+    assert fx.rate("eur") == 0.92
+    clock.now += 60
+    assert fx.rate("eur") == 0.95 and fx.version != version
+
+
+def test_conversion_is_vectorized_and_leaves_percentages():
+    fx = FxTable(fetch=lambda path: RATES, disk_cache=DiskCache(":memory:"))
+    snapshot = MarketSnapshot([{"id": "bitcoin", "symbol": "btc", "name": "Bitcoin", "current_price": 60000.0,
+                                "market_cap": 1e12, "market_cap_rank": 1, "total_volume": None,
+                                "price_change_percentage_24h": 2.0}])
+    eur = fx.convert_snapshot(snapshot, "eur")
+    assert eur[0]["current_price"] == 55200.0 and eur[0]["market_cap"] == 0.92e12
+    assert eur[0]["total_volume"] is None and eur[0]["price_change_percentage_24h"] == 2.0
+    assert eur.column("current_price")[0] == 55200.0
+    assert fx.convert_snapshot(snapshot, "eur") is eur
+    assert fx.convert_snapshot(snapshot, "usd") is snapshot
+
+    points = np.zeros(3, dtype=POINT_DTYPE)
+    points["price"] = [1.0, 2.0, 3.0]
+    assert list(fx.convert_points(points, "jpy")["price"]) == [150.0, 300.0, 450.0]
+    assert list(points["price"]) == [1.0, 2.0, 3.0]
+
+
+def test_currency_views_cost_no_extra_market_requests():
+    with FakeCoinGecko() as fake:
+        client = CoinGeckoClient(api_key="", tier="pro", base_url=fake.base_url, max_retries=0)
+        fx = FxTable(fetch=client.get, disk_cache=DiskCache(":memory:"))
+        bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), fx=fx, alerts=AlertEngine())
+        bot._fetch, bot.base_url = client.get, client.base_url
+
+        usd = bot.process_response("Which crypto is trending?")
+        assert "Prices are now shown in EUR" in bot.process_response("currency eur")
+        eur = bot.process_response("Which crypto is trending?")
+        assert "no exchange rate for XYZ" in bot.process_response("set currency xyz")
+        with bot.in_currency("jpy"):
+            jpy = bot.process_response("What's the price of Bitcoin?")
+        markets = fake.requests.count("/api/v3/coins/markets")
+        rates = fake.requests.count("/api/v3/exchange_rates")
+
+    assert "$150.00" in usd and "€138.00" in eur and "¥9,000,000" in jpy
+    assert markets == 1 and rates == 1
+
+
+def test_chat_sessions_pick_their_own_currency():
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), fx=FxTable(fetch=lambda path: RATES,
+                                                                   disk_cache=DiskCache(":memory:")),
+                      alerts=AlertEngine())
+    bot._fetch = lambda url, params=None: [{"id": "bitcoin", "name": "Bitcoin", "symbol": "btc",
+                                            "current_price": 60000.0, "market_cap_rank": 1}]
+
+    async def scenario():
+        server = await ChatServer(bot, port=0, workers=2).start()
+        replies = []
+        for currency in ("eur", None):
+            reader, writer = await asyncio.open_connection(*server.address)
+            for message in ([f"/currency {currency}"] if currency else []) + ["/hold bitcoin 1", "/portfolio"]:
+                writer.write(message.encode() + b"\n")
+                await writer.drain()
+                replies.append(json.loads(await reader.readline())["reply"])
+            writer.close()
+        await server.close()
+        return replies
+
+    replies = asyncio.run(scenario())
+    assert replies[0] == "Answering in EUR." and "Total value: €55,200.00" in replies[2]
+    assert "Total value: $60,000.00" in replies[4]
+
+
+if __name__ == "__main__":
+    test_rates_formatting_and_ttl()
+    test_failed_loads_are_retried_and_refreshes_picked_up()
+    test_conversion_is_vectorized_and_leaves_percentages()
+    test_currency_views_cost_no_extra_market_requests()
+    test_chat_sessions_pick_their_own_currency()
+    print("All fx tests passed.")
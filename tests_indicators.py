@@ -0,0 +1,150 @@
+import numpy as np
+
+from alerts import AlertEngine
+from crypto_buddy import CryptoBuddy
+from disk_cache import DiskCache
+from indicators import INDICATORS, IndicatorCache, IndicatorSeries, ema, hourly, momentum, rsi, sma
+from price_history import POINT_DTYPE, PriceHistoryStore
+
+HOUR_MS = 3_600_000
+
+
+def random_walk(n, seed=11, start_ts=0):
+    rng = np.random.default_rng(seed)
+    points = np.empty(n, dtype=POINT_DTYPE)
+    points["ts"] = start_ts + np.arange(n) * HOUR_MS
+    points["price"] = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return points
+
+
+def test_vectorized_matches_reference_loops():
+    x = random_walk(300)["price"]
+    assert np.allclose(sma(x, 20)[19:], [x[i - 19:i + 1].mean() for i in range(19, 300)])
+
+    expected, alpha = [x[0]], 2 / 21
+    for v in x[1:]:
+        expected.append(expected[-1] + alpha * (v - expected[-1]))
+    assert np.allclose(ema(x, 20), expected)
+
+    d = np.diff(x)
+    gain, loss = np.maximum(d[:14], 0).mean(), np.maximum(-d[:14], 0).mean()
+    for v in d[14:]:
+        gain += (max(v, 0) - gain) / 14
+        loss += (max(-v, 0) - loss) / 14
+    assert np.isclose(rsi(x, 14)[-1], 100 - 100 / (1 + gain / loss))
+    assert np.isnan(momentum(x, 24)[23]) and np.isclose(momentum(x, 24)[-1], (x[-1] / x[-25] - 1) * 100)
+
+
+def test_incremental_append_matches_full_recompute():
+    points = random_walk(500)
+    for split in (5, 15, 120):
+        series = IndicatorSeries(points[:split])
+        assert series.append(points[split:]) == 500 - split
+        full = IndicatorSeries(points)
+        for name in INDICATORS:
+            assert np.allclose(series.values(name), full.values(name), equal_nan=True, rtol=1e-9), (split, name)
+
+
+def test_cache_trims_and_appends_instead_of_rebuilding():
+    clock = [1_700_000_000.0]
+    all_points = random_walk(24 * 20, start_ts=int(clock[0] * 1000) - 24 * 10 * HOUR_MS)
+    store = PriceHistoryStore(fetch=lambda path, params: None, clock=lambda: clock[0])
+    store._append("bitcoin", all_points[all_points["ts"] <= clock[0] * 1000])
+    cache = IndicatorCache(store)
+
+    first = cache.get("bitcoin", "7")
+    assert len(first) == 7 * 24 + 1
+
+    clock[0] += 5 * 3600
+    store._append("bitcoin", all_points[all_points["ts"] <= clock[0] * 1000])
+    again = cache.get("bitcoin", "7")
+    assert again is first and cache.rebuilds == 1
+    assert list(again.ts) == list(hourly(store.window("bitcoin", "7", refresh=False))["ts"])
+    assert np.isclose(again.latest()["sma"], IndicatorSeries(store.series("bitcoin").points).latest()["sma"])
+
+    # A corrected price inside the window rebuilds the series
+    corrected = store.series("bitcoin").points[-3:].copy()
+    corrected["price"] *= 2
+    store._append("bitcoin", corrected)
+    rebuilt = cache.get("bitcoin", "7")
+    assert rebuilt is not first and cache.rebuilds == 2
+    assert rebuilt.price[-1] == corrected["price"][-1]
+
+
+def test_mixed_spacing_is_resampled_hourly():
+    now = 1_700_000_000.0
+    store = PriceHistoryStore(fetch=lambda path, params: None, clock=lambda: now)
+    # A backfill answered hourly, then a tail under a day answered every 5 minutes
+    start = (int(now * 1000) // HOUR_MS - 72) * HOUR_MS
+    backfill = random_walk(48, start_ts=start + 7 * 60_000)
+    store._append("bitcoin", backfill)
+    tail = np.empty(12 * 24, dtype=POINT_DTYPE)
+    tail["ts"] = start + 48 * HOUR_MS + np.arange(len(tail)) * 300_000
+    tail["price"] = np.linspace(100.0, 110.0, len(tail))
+    store._append("bitcoin", tail)
+
+    series = IndicatorCache(store).get("bitcoin", "7")
+    assert len(series) == 72 and set(np.diff(series.ts)) == {HOUR_MS}
+    assert series.ts[0] % HOUR_MS == 0
+    # Momentum over 24 points spans exactly a day, from the last hourly point to the last hour's first 5-minute one
+    assert np.isclose(series.latest()["momentum"], (tail["price"][-12] / backfill["price"][-1] - 1) * 100)
+
+
+def test_trending_and_rankings_read_stored_indicators():
+    now = 1_700_000_000.0
+    store = PriceHistoryStore(fetch=lambda path, params: None, clock=lambda: now)
+    store._append("cardano", random_walk(24 * 7, start_ts=int(now * 1000) - 24 * 7 * HOUR_MS))
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), alerts=AlertEngine())
+    bot.indicator_cache = IndicatorCache(store)
+    markets = [
+        {"id": "bitcoin", "name": "Bitcoin", "symbol": "btc", "current_price": 60000.0, "market_cap": 1.2e12,
+         "market_cap_rank": 1, "price_change_percentage_24h": 2.5},
+        {"id": "cardano", "name": "Cardano", "symbol": "ada", "current_price": 0.45, "market_cap": 1.6e10,
+         "market_cap_rank": 9, "price_change_percentage_24h": 4.0},
+    ]
+    bot._fetch = lambda url, params=None: markets if url.endswith("/coins/markets") else None
+
+    out = bot.find_trending()
+    assert out.count("RSI(14)") == 1 and out.index("RSI(14)") > out.index("Cardano")
+    frame = bot._market_frame(bot.market_snapshot())
+    assert np.isnan(frame.trend[0]) and np.isclose(frame.trend[1], bot.indicators(["cardano"])["cardano"]["momentum"])
+
+    # New history under the same snapshot re-renders the cached report and the ranking frame
+    last = store.series("cardano").points[-1]
+    store._append("cardano", [(last["ts"] + HOUR_MS, last["price"] * 1.5)])
+    momentum = bot.indicators(["cardano"])["cardano"]["momentum"]
+    assert bot.find_trending() != out and f"Momentum: {momentum:+.2f}%" in bot.find_trending()
+    assert np.isclose(bot._market_frame(bot.market_snapshot()).trend[1], momentum)
+
+
+def test_stored_history_changes_the_rankings():
+    now = 1_700_000_000.0
+    store = PriceHistoryStore(fetch=lambda path, params: None, clock=lambda: now)
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), alerts=AlertEngine())
+    bot.indicator_cache = IndicatorCache(store)
+    markets = [
+        {"id": "alpha", "name": "Alpha", "symbol": "alp", "current_price": 10.0, "market_cap": 5e10,
+         "market_cap_rank": 3, "price_change_percentage_24h": 1.0},
+        {"id": "beta", "name": "Beta", "symbol": "bet", "current_price": 10.0, "market_cap": 4e10,
+         "market_cap_rank": 4, "price_change_percentage_24h": 1.2},
+    ]
+    bot._fetch = lambda url, params=None: markets if url.endswith("/coins/markets") else None
+    assert "Winner: Beta" in bot.balanced_recommendation()
+
+    # Beta has been sliding for two days: its momentum now outweighs its slightly better 24h change
+    points = np.empty(48, dtype=POINT_DTYPE)
+    points["ts"] = int(now * 1000) - np.arange(48)[::-1] * HOUR_MS
+    points["price"] = np.linspace(12.0, 10.0, 48)
+    store._append("beta", points)
+    assert bot.indicators(["beta"])["beta"]["momentum"] < -2
+    assert "Winner: Alpha" in bot.balanced_recommendation()
+
+
+if __name__ == "__main__":
+    test_vectorized_matches_reference_loops()
+    test_incremental_append_matches_full_recompute()
+    test_cache_trims_and_appends_instead_of_rebuilding()
+    test_mixed_spacing_is_resampled_hourly()
+    test_trending_and_rankings_read_stored_indicators()
+    test_stored_history_changes_the_rankings()
+    print("All indicator tests passed.")
@@ -0,0 +1,42 @@
+from intent_router import IntentRouter, Route
+
+ALIASES = {"bitcoin": "bitcoin", "btc": "bitcoin", "ethereum": "ethereum", "eth": "ethereum",
+           "binance coin": "binancecoin", "bnb": "binancecoin", "cardano": "cardano"}
+
+
+def test_intents_follow_priority():
+    router = IntentRouter(ALIASES)
+    assert router.route("What's the price of Bitcoin?") == Route("price", ["bitcoin"])
+    assert router.route("Best for long-term growth?").intent == "long_term"
+    assert router.route("Give me a recommendation").intent == "recommend"
+    assert router.route("Which crypto is trending?").intent == "trending"
+    assert router.route("hello there") == Route(None, [])
+
+
+def test_whole_tokens_only():
+    router = IntentRouter(ALIASES)
+    assert router.route("send me a photo").intent is None
+    assert router.route("really small caps").intent is None
+    assert router.route("eco-friendly coins").intent == "sustainable"
+
+
+def test_coins_in_mention_order_with_phrases():
+    router = IntentRouter(ALIASES)
+    route = router.route("compare ETH vs Binance Coin and eth again")
+    assert route == Route("compare", ["ethereum", "binancecoin"])
+
+
+def test_bulk_index_cannot_shadow_keywords_or_aliases():
+    extra = {"hot": "holotoken", "the": "thena", "btc": "btc-clone", "pepe": "pepe"}
+    router = IntentRouter(ALIASES, extra)
+    assert router.route("is pepe hot").intent == "trending"
+    assert router.route("price of the pepe") == Route("price", ["pepe"])
+    assert router.route("price of btc").coins == ["bitcoin"]
+
+
+if __name__ == "__main__":
+    test_intents_follow_priority()
+    test_whole_tokens_only()
+    test_coins_in_mention_order_with_phrases()
+    test_bulk_index_cannot_shadow_keywords_or_aliases()
+    print("All intent router tests passed.")
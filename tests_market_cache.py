@@ -0,0 +1,176 @@
+import threading
+import time
+
+from alerts import AlertEngine
+from crypto_buddy import CryptoBuddy
+from disk_cache import DiskCache
+from market_cache import MarketRefresher, MarketSnapshotCache
+
+MARKETS = [
+    {"id": "bitcoin", "name": "Bitcoin", "symbol": "btc", "current_price": 60000.0, "market_cap": 1.2e12,
+     "market_cap_rank": 1, "total_volume": 3e10, "price_change_percentage_24h": 2.5},
+    {"id": "cardano", "name": "Cardano", "symbol": "ada", "current_price": 0.45, "market_cap": 1.6e10,
+     "market_cap_rank": 9, "total_volume": 4e8, "price_change_percentage_24h": 4.0},
+]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_and_stale_while_revalidate():
+    clock = FakeClock()
+    loads = []
+
+    def loader():
+        loads.append(clock.now)
+        return [dict(MARKETS[0], current_price=60000.0 + len(loads))]
+
+    cache = MarketSnapshotCache(loader, ttl=60, stale_ttl=300, clock=clock)
+    assert cache.get()[0]["current_price"] == 60001.0
+    clock.now = 30
+    cache.get()
+    assert len(loads) == 1
+
+    # Stale: served immediately, refreshed in the background
+    clock.now = 120
+    assert cache.get()[0]["current_price"] == 60001.0
+    for _ in range(100):
+        if cache.version == 2:
+            break
+        time.sleep(0.01)
+    assert cache.coin("bitcoin")["current_price"] == 60002.0
+
+    # Expired: blocking reload
+    clock.now = 1000
+    assert cache.get()[0]["current_price"] == 60003.0
+
+
+def test_failed_refresh_keeps_previous_snapshot():
+    results = [MARKETS, None]
+    cache = MarketSnapshotCache(lambda: results.pop(0) if results else None, ttl=0, stale_ttl=0)
+    assert cache.get() == MARKETS
+    assert cache.get() == MARKETS
+    assert cache.coin("cardano")["symbol"] == "ada"
+    assert cache.coin("dogecoin") is None
+
+
+def test_commands_share_one_markets_request():
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), alerts=AlertEngine())
+    calls = []
+
+    def fake_fetch(url, params=None):
+        calls.append(url)
+        return MARKETS if url.endswith("/coins/markets") else None
+
+    bot._fetch = fake_fetch
+    assert "Bitcoin" in bot.find_trending()
+    assert "LIVE DATA" in bot.find_long_term()
+    assert "Cardano" in bot.show_all()
+    assert "Winner" in bot.balanced_recommendation()
+    assert "$60,000.00" in bot.get_price("bitcoin")
+    assert calls == [f"{bot.base_url}/coins/markets"]
+
+
+def test_compare_and_sustainable_use_batched_markets_lookup():
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), alerts=AlertEngine())
+    calls = []
+
+    def fake_fetch(url, params=None):
+        calls.append((url.rsplit("/", 1)[-1], (params or {}).get("ids")))
+        if url.endswith("/coins/markets"):
+            ids = params["ids"].split(",")
+            # The snapshot request only knows bitcoin; cardano arrives via the batch
+            if "ethereum" in ids:
+                return [MARKETS[0]]
+            return [c for c in MARKETS if c["id"] in ids]
+        return None
+
+    bot._fetch = fake_fetch
+    out = bot.compare_coins("compare Bitcoin and Cardano")
+    assert "Comparison (live)" in out and "$0.45" in out
+    assert calls == [("markets", ",".join(bot.crypto_ids.values())), ("markets", "cardano")]
+    assert "Cardano" in bot.find_sustainable()
+    assert all(name == "markets" for name, _ in calls)
+
+
+def test_detail_endpoint_only_for_missing_fields():
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), alerts=AlertEngine())
+    detail = {"id": "bitcoin", "name": "Bitcoin", "symbol": "btc", "market_data": {
+        "current_price": {"usd": 61000.0}, "price_change_percentage_24h": 1.0,
+        "market_cap": {"usd": 1.2e12}, "total_volume": {"usd": 3e10}}}
+    calls = []
+
+    def fake_fetch(url, params=None):
+        calls.append(url.rsplit("/", 1)[-1])
+        if url.endswith("/coins/markets"):
+            return [dict(MARKETS[0], total_volume=None)]
+        return detail
+
+    bot._fetch = fake_fetch
+    assert "$61,000.00" in bot.get_price("Bitcoin")
+    assert calls == ["markets", "bitcoin"]
+
+
+def test_concurrent_refreshes_share_one_load():
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        release.wait(5)
+        return MARKETS
+
+    cache = MarketSnapshotCache(loader)
+    threads = [threading.Thread(target=cache.refresh) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(loads) == 1
+    assert cache.coin("bitcoin")["symbol"] == "btc"
+
+
+def test_refresher_publishes_snapshots_in_background():
+    requested = []
+
+    def loader(ids):
+        requested.append(ids)
+        return [c for c in MARKETS if c["id"] in ids]
+
+    refresher = MarketRefresher(loader, ["bitcoin"], interval=60).start()
+    try:
+        first = refresher.snapshot()
+        assert [c["id"] for c in first.coins] == ["bitcoin"]
+        assert refresher.snapshot() is first
+
+        # A newly watched coin wakes the poller instead of waiting out the interval
+        assert refresher.watch(["bitcoin", "cardano"])
+        assert not refresher.watch(["cardano"])
+        for _ in range(100):
+            if "cardano" in refresher.snapshot().by_id:
+                break
+            time.sleep(0.01)
+        latest = refresher.snapshot()
+        assert "cardano" in latest.by_id and latest.version > first.version
+        assert requested[-1] == ("bitcoin", "cardano")
+        assert first.coins == (MARKETS[0],)
+    finally:
+        refresher.stop(timeout=1)
+
+
+if __name__ == "__main__":
+    test_ttl_and_stale_while_revalidate()
+    test_failed_refresh_keeps_previous_snapshot()
+    test_commands_share_one_markets_request()
+    test_compare_and_sustainable_use_batched_markets_lookup()
+    test_detail_endpoint_only_for_missing_fields()
+    test_concurrent_refreshes_share_one_load()
+    test_refresher_publishes_snapshots_in_background()
+    print("All market cache tests passed.")
@@ -0,0 +1,71 @@
+import json
+import pickle
+
+import numpy as np
+
+from disk_cache import DiskCache
+from fake_coingecko import DEFAULT_COINS
+from market_model import FIELDS, MarketRecord, MarketSnapshot, decode_markets
+from scoring import MarketFrame
+
+
+def payload():
+    return [dict(c, image="https://example.com/x.png", ath=1.0, roi=None) for c in DEFAULT_COINS]
+
+
+def test_decode_keeps_only_used_fields():
+    snapshot = decode_markets(json.dumps(payload()).encode())
+    assert len(snapshot) == len(DEFAULT_COINS)
+    btc = snapshot[0]
+    assert isinstance(btc, MarketRecord) and btc["id"] == btc.id == "bitcoin"
+    assert list(btc) == list(FIELDS) and "image" not in btc and btc.get("image") is None
+    assert btc == {f: DEFAULT_COINS[0].get(f) for f in FIELDS}
+    assert dict(btc, current_price=1.0)["current_price"] == 1.0
+    assert decode_markets(snapshot) is snapshot
+    assert decode_markets({"status": {"error_code": 429}}) is None
+    assert pickle.loads(pickle.dumps(snapshot)) == snapshot
+
+
+def test_columns_are_shared_and_frames_match_raw_dicts():
+    raw = payload()
+    raw[1]["market_cap_rank"] = None
+    snapshot = MarketSnapshot(raw)
+    prices = snapshot.column("current_price")
+    assert prices is snapshot.to_numpy()["current_price"] and not prices.flags.writeable
+    assert np.isnan(snapshot.column("market_cap_rank")[1])
+    assert snapshot.ids == [c["id"] for c in raw]
+
+    df = snapshot.to_frame(["name", "current_price"])
+    assert list(df.columns) == ["name", "current_price"] and list(df["name"]) == [c["name"] for c in raw]
+
+    sus = {"cardano": {"sustainability_score": 9}}
+    fast, slow = MarketFrame.from_snapshot(snapshot, sus), MarketFrame.from_snapshot(raw, sus)
+    assert fast.ids == slow.ids
+    for column in ("change", "rank", "sustainability"):
+        assert np.array_equal(getattr(fast, column), getattr(slow, column), equal_nan=True)
+
+
+def test_slicing_select_and_disk_round_trip():
+    snapshot = decode_markets(payload())
+    assert isinstance(snapshot[:2], MarketSnapshot) and len(snapshot[:2]) == 2
+    assert [r.id for r in snapshot.select(["solana", "bitcoin"])] == ["bitcoin", "solana"]
+
+    cache = DiskCache(":memory:")
+    cache.put("markets", snapshot)
+    assert decode_markets(cache.get("markets").value) == snapshot
+
+
+def test_malformed_entries_are_skipped():
+    body = json.dumps([None, {"symbol": "btc"}, {"id": "bitcoin", "symbol": "btc", "current_price": 1.0},
+                       {"id": "odd", "symbol": 7}, {"id": 5}, "ethereum", {"id": "ethereum", "symbol": None}])
+    snapshot = decode_markets(body)
+    assert [r.id for r in snapshot] == ["bitcoin", "ethereum"]
+    assert snapshot.column("current_price")[0] == 1.0
+
+
+if __name__ == "__main__":
+    test_decode_keeps_only_used_fields()
+    test_columns_are_shared_and_frames_match_raw_dicts()
+    test_slicing_select_and_disk_round_trip()
+    test_malformed_entries_are_skipped()
+    print("All market model tests passed.")
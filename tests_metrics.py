@@ -0,0 +1,76 @@
+import os
+import tempfile
+import urllib.request
+
+from coingecko import CoinGeckoClient
+from fake_coingecko import FakeCoinGecko
+from metrics import Metrics, MetricsServer, profiled
+
+
+class StepClock:
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def test_spans_counters_and_collectors_render():
+    metrics = Metrics(clock=StepClock(0.02))
+    with metrics.span("fetch", endpoint="/coins/markets"):
+        pass
+    metrics.inc("cryptobuddy_errors_total", where="get_price")
+    metrics.inc("cryptobuddy_errors_total", where="get_price")
+    metrics.register("cache", lambda: [("cryptobuddy_cache_hits_total", "counter", {"cache": "report"}, 3)])
+    metrics.register("cache", lambda: [("cryptobuddy_cache_hits_total", "counter", {"cache": "report"}, 5)])
+
+    text = metrics.render()
+    assert 'cryptobuddy_span_seconds_bucket{endpoint="/coins/markets",le="0.01",span="fetch"} 0' in text
+    assert 'cryptobuddy_span_seconds_bucket{endpoint="/coins/markets",le="0.025",span="fetch"} 1' in text
+    assert 'cryptobuddy_span_seconds_count{endpoint="/coins/markets",span="fetch"} 1' in text
+    assert 'cryptobuddy_errors_total{where="get_price"} 2' in text
+    assert 'cryptobuddy_cache_hits_total{cache="report"} 5' in text
+    assert text.count("# TYPE cryptobuddy_cache_hits_total counter") == 1
+
+    (name, labels, count, total, avg_ms, max_ms), = metrics.spans()
+    assert (name, labels, count) == ("fetch", {"endpoint": "/coins/markets"}, 1)
+    assert round(avg_ms, 6) == 20.0
+
+
+def test_http_statuses_exported_over_http():
+    metrics = Metrics()
+    with FakeCoinGecko(fail_ids={"solana"}) as fake:
+        client = CoinGeckoClient(api_key="", tier="pro", base_url=fake.base_url, max_retries=0)
+        client.get("/coins/bitcoin")
+        client.get("/coins/solana")
+    metrics.register("coingecko", client.metric_samples)
+
+    with MetricsServer(metrics) as server:
+        text = urllib.request.urlopen(server.url).read().decode()
+    assert 'coingecko_requests_total{endpoint="/coins/{id}",status="200"} 1' in text
+    assert 'coingecko_requests_total{endpoint="/coins/{id}",status="500"} 1' in text
+    assert 'coingecko_errors_total{endpoint="/coins/{id}"} 1' in text
+
+
+def test_profiled_dumps_only_when_enabled():
+    directory = tempfile.mkdtemp()
+    with profiled("trending"):
+        sum(range(1000))
+    assert os.listdir(directory) == []
+
+    with profiled("trending", directory):
+        sorted(str(i) for i in range(10_000))
+    prof, txt = sorted(os.listdir(directory))
+    assert prof.startswith("trending-") and prof.endswith(".prof") and txt == prof[:-5] + ".txt"
+    with open(os.path.join(directory, txt), encoding="utf-8") as fh:
+        report = fh.read()
+    assert "peak traced memory" in report and "Largest allocations" in report
+
+
+if __name__ == "__main__":
+    test_spans_counters_and_collectors_render()
+    test_http_statuses_exported_over_http()
+    test_profiled_dumps_only_when_enabled()
+    print("All metrics tests passed.")
@@ -0,0 +1,64 @@
+import numpy as np
+
+from portfolio import PortfolioBook
+from price_history import DAY_MS, POINT_DTYPE
+
+HOUR_MS = 3_600_000
+
+
+def series(prices, start=0, step=HOUR_MS):
+    out = np.empty(len(prices), dtype=POINT_DTYPE)
+    out["ts"] = np.arange(len(prices)) * step + start
+    out["price"] = prices
+    return out
+
+
+def test_revalue_matches_per_portfolio_loop():
+    rng = np.random.default_rng(3)
+    assets = [f"coin-{j}" for j in range(20)]
+    holdings = rng.uniform(0, 5, (500, 20)) * (rng.random((500, 20)) < 0.3)
+    book = PortfolioBook.from_matrix([f"p{i}" for i in range(500)], assets, holdings)
+    prices = {a: float(p) for a, p in zip(assets, rng.uniform(0.1, 1000, 20))}
+    del prices["coin-7"]
+
+    values = book.revalue(prices)
+    for i in (0, 17, 499):
+        expected = sum(amount * prices.get(a, 0.0) for a, amount in book.positions(f"p{i}").items())
+        assert np.isclose(values[i], expected)
+
+    book.set("p0", {"coin-1": 2.0, "new-coin": 1.0})
+    records = [{"id": "coin-1", "current_price": 10.0}, {"id": "new-coin", "current_price": 5.0}]
+    assert book.value("p0", records) == 25.0
+    assert book.holdings.shape == (500, 21)
+
+
+def test_history_drawdown_volatility_and_contribution():
+    book = PortfolioBook()
+    book.set("a", {"bitcoin": 1.0, "ethereum": 10.0})
+    book.set("b", {"ethereum": 1.0, "dogecoin": 100.0})
+    history = book.history({
+        "bitcoin": series([100.0, 120.0, 90.0, 110.0]),
+        # Sparser series: carried forward onto the hourly grid
+        "ethereum": series([10.0, 12.0], step=2 * HOUR_MS),
+    })
+    assert list(history.ts) == [0, HOUR_MS, 2 * HOUR_MS]
+    assert list(history.values[:, 0]) == [200.0, 220.0, 210.0]
+    assert history.missing == ["dogecoin"]
+
+    dd = history.drawdown()
+    assert dd[0, 0] == 0.0 and np.isclose(dd[2, 0], 210.0 / 220.0 - 1)
+    assert np.isclose(history.max_drawdown()[0], 210.0 / 220.0 - 1)
+
+    contrib = history.contributions()
+    assert np.allclose(contrib.sum(axis=1), history.values[-1] - history.values[0])
+    assert np.isclose(history.weights()[0].sum(), 1.0)
+
+    returns = np.diff(np.log([200.0, 220.0, 210.0]))
+    expected = returns.std(ddof=1) * np.sqrt(365 * DAY_MS / HOUR_MS)
+    assert np.isclose(history.volatility()[0], expected)
+
+
+if __name__ == "__main__":
+    test_revalue_matches_per_portfolio_loop()
+    test_history_drawdown_volatility_and_contribution()
+    print("All portfolio tests passed.")
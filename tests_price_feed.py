@@ -0,0 +1,129 @@
+import json
+import time
+
+from alerts import AlertEngine
+from crypto_buddy import CryptoBuddy
+from disk_cache import DiskCache
+from price_feed import DAY_MS, FeedIngestor, LatestPriceTable, ReplayFeed, SSEFeed, Tick
+from replay_server import ReplayServer
+
+T0 = 1_700_000_000_000
+BTC = {"id": "bitcoin", "name": "Bitcoin", "symbol": "btc", "current_price": 60000.0, "market_cap": 1.2e12,
+       "market_cap_rank": 1, "total_volume": 3e10, "price_change_percentage_24h": 20.0}
+
+
+def write_ticks(path, ticks):
+    with open(path, "w", encoding="utf-8") as fh:
+        for coin_id, price, ts in ticks:
+            fh.write(json.dumps({"id": coin_id, "price": price, "ts": ts}) + "\n")
+    return str(path)
+
+
+def test_rolling_24h_change():
+    table = LatestPriceTable()
+    table.update(Tick("bitcoin", 100.0, T0))
+    assert table.quote("bitcoin") == (100.0, T0, None)
+
+    table.update(Tick("bitcoin", 110.0, T0 + DAY_MS // 2))
+    table.update(Tick("bitcoin", 120.0, T0 + DAY_MS))
+    assert round(table.quote("bitcoin").change_24h, 6) == 20.0
+
+    # The reference moves forward with the window; late ticks are ignored
+    table.update(Tick("bitcoin", 121.0, T0 + DAY_MS + DAY_MS // 2))
+    assert round(table.quote("bitcoin").change_24h, 6) == 10.0
+    table.update(Tick("bitcoin", 1.0, T0))
+    assert table.quote("bitcoin").price == 121.0
+
+
+def test_overlay_uses_snapshot_until_a_day_of_ticks():
+    table = LatestPriceTable()
+    table.update(Tick("bitcoin", 72000.0, T0))
+    [live] = table.overlay([BTC])
+    assert live["current_price"] == 72000.0
+    # Snapshot implies 50,000 a day ago
+    assert round(live["price_change_percentage_24h"], 6) == 44.0
+    assert BTC["current_price"] == 60000.0
+
+
+def test_quiet_feed_hands_back_to_the_snapshot():
+    now = [1000.0]
+    table = LatestPriceTable(clock=lambda: now[0])
+    # A replayed recording: old tick timestamps still count from when they arrived
+    table.update(Tick("bitcoin", 72000.0, T0))
+    assert table.overlay([BTC], max_age=30)[0]["current_price"] == 72000.0
+    now[0] += 31
+    assert table.overlay([BTC], max_age=30)[0] is BTC
+    assert table.quote("bitcoin").price == 72000.0
+
+
+def test_replay_file_is_tailed_not_reread(tmp_path):
+    path = write_ticks(tmp_path / "ticks.jsonl", [("bitcoin", 60000.0, T0)])
+    polls = []
+
+    def sleep(seconds):
+        polls.append(seconds)
+        if len(polls) == 1:
+            with open(path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps({"id": "bitcoin", "price": 60500.0, "ts": T0 + 1000}))
+        elif len(polls) == 2:
+            with open(path, "a", encoding="utf-8") as fh:
+                fh.write("\n")
+        else:
+            feed.close()
+
+    feed = ReplayFeed(path, sleep=sleep, follow=True, poll_interval=0.25)
+    assert [t.price for t in feed.ticks()] == [60000.0, 60500.0]
+    assert polls == [0.25, 0.25, 0.25]
+
+
+def test_replay_server_streams_into_table(tmp_path):
+    path = write_ticks(tmp_path / "ticks.jsonl", [
+        ("bitcoin", 60000.0, T0), ("ethereum", 3000.0, T0 + 200), ("bitcoin", 60100.5, T0 + 400),
+    ])
+    table = LatestPriceTable()
+    seen = []
+
+    def broken(tick):
+        raise RuntimeError("database is locked")
+
+    # A failing listener is counted; the connection and the listeners after it carry on
+    table.subscribe(broken)
+    table.subscribe(seen.append)
+    with ReplayServer(path) as server:
+        ingestor = FeedIngestor(lambda: SSEFeed(server.url, timeout=5), table)
+        assert ingestor.run_once() == 3
+    assert table.listener_errors == 3 and len(seen) == 3 and ingestor.errors == 0
+    assert table.quote("bitcoin").price == 60100.5
+    assert table.quote("ethereum").ts == T0 + 200
+
+    assert [t.coin_id for t in ReplayFeed(path).ticks()] == ["bitcoin", "ethereum", "bitcoin"]
+
+
+def test_get_price_reads_streamed_price(tmp_path):
+    table = LatestPriceTable()
+    table.update(Tick("bitcoin", 61234.5, int(time.time() * 1000)))
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), price_table=table, alerts=AlertEngine())
+    calls = []
+
+    def fake_fetch(url, params=None):
+        calls.append(url)
+        return [BTC] if url.endswith("/coins/markets") else None
+
+    bot._fetch = fake_fetch
+    assert "$61,234.50" in bot.get_price("Bitcoin")
+    table.update(Tick("bitcoin", 61300.0, int(time.time() * 1000) + 1000))
+    assert "$61,300.00" in bot.get_price("bitcoin")
+    assert len(calls) == 1
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    test_rolling_24h_change()
+    test_overlay_uses_snapshot_until_a_day_of_ticks()
+    test_quiet_feed_hands_back_to_the_snapshot()
+    test_replay_file_is_tailed_not_reread(pathlib.Path(tempfile.mkdtemp()))
+    test_replay_server_streams_into_table(pathlib.Path(tempfile.mkdtemp()))
+    test_get_price_reads_streamed_price(pathlib.Path(tempfile.mkdtemp()))
+    print("All price feed tests passed.")
@@ -0,0 +1,113 @@
+import numpy as np
+
+from price_history import DAY_MS, PriceHistoryStore, PriceSeries
+
+HOUR_MS = 3_600_000
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeChartApi:
+    """Hourly prices equal to the hour index, served like market_chart and market_chart/range."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = []
+
+    def __call__(self, path, params):
+        self.calls.append((path, dict(params)))
+        end = int(self.clock() * 1000)
+        if path.endswith("/range"):
+            start, end = params["from"] * 1000, params["to"] * 1000
+        else:
+            start = end - int(float(params["days"]) * DAY_MS)
+        first = -(-start // HOUR_MS) * HOUR_MS
+        return {"prices": [[ts, ts / HOUR_MS] for ts in range(first, end + 1, HOUR_MS)]}
+
+
+def test_merge_dedupes_and_keeps_newest():
+    series = PriceSeries([(3, 3.0), (1, 1.0)])
+    added = series.merge([(2, 2.0), (3, 30.0)])
+    assert list(series.points["ts"]) == [1, 2, 3]
+    assert series.points["price"][-1] == 30.0
+    assert list(added["ts"]) == [2]
+    assert list(series.window(2, 3)["ts"]) == [2, 3]
+
+
+def test_only_missing_tail_is_fetched(tmp_path):
+    clock = FakeClock()
+    api = FakeChartApi(clock)
+    store = PriceHistoryStore(str(tmp_path), fetch=api, clock=clock)
+
+    first = store.window("bitcoin", "7")
+    assert len(first) == 7 * 24
+    assert api.calls[0][0] == "/coins/bitcoin/market_chart"
+
+    # Within min_interval: served from the store without a request
+    clock.now += 60
+    store.window("bitcoin", "7")
+    assert len(api.calls) == 1
+
+    clock.now += 3 * 3600
+    window = store.window("bitcoin", "7")
+    assert len(api.calls) == 2
+    path, params = api.calls[-1]
+    assert path == "/coins/bitcoin/market_chart/range"
+    assert params["from"] * 1000 == int(first["ts"][-1])
+    assert window["ts"][-1] > first["ts"][-1]
+    assert len(set(window["ts"])) == len(window)
+
+    # Shorter windows are slices of what is stored
+    calls = len(api.calls)
+    assert len(store.window("bitcoin", "1")) == 24
+    assert len(api.calls) == calls
+
+    # A fresh store picks the append-only log back up from disk
+    reloaded = PriceHistoryStore(str(tmp_path), fetch=api, clock=clock)
+    assert len(reloaded.window("bitcoin", "7", refresh=False)) == len(store.window("bitcoin", "7", refresh=False))
+
+
+def test_longer_window_backfills_only_the_head():
+    clock = FakeClock()
+    api = FakeChartApi(clock)
+    store = PriceHistoryStore(fetch=api, clock=clock)
+    store.window("cardano", "7")
+    head = store.series("cardano").first_ts
+    store.window("cardano", "30")
+    assert len(api.calls) == 2
+    path, params = api.calls[-1]
+    assert path.endswith("/range")
+    assert params["to"] * 1000 == head
+    assert len(store.window("cardano", "30", refresh=False)) >= 30 * 24 - 1
+
+
+def test_corrections_survive_a_restart(tmp_path):
+    store = PriceHistoryStore(str(tmp_path), fetch=lambda path, params: None)
+    store._append("bitcoin", [(1, 1.0), (2, 2.0), (3, 3.0)])
+    revision = store.series("bitcoin").revision
+    assert store._append("bitcoin", [(2, 20.0), (3, 3.0), (4, 4.0)]) == 1
+    assert store.series("bitcoin").revision == revision + 1
+
+    reloaded = PriceHistoryStore(str(tmp_path), fetch=lambda path, params: None)
+    assert list(reloaded.series("bitcoin").points["price"]) == [1.0, 20.0, 3.0, 4.0]
+    # Streamed straight from the log, the corrected point appears once, with its new price
+    fresh = PriceHistoryStore(str(tmp_path), fetch=lambda path, params: None)
+    points = np.concatenate(list(fresh.iter_points("bitcoin")))
+    assert list(points["ts"]) == [1, 2, 3, 4] and list(points["price"]) == [1.0, 20.0, 3.0, 4.0]
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    test_merge_dedupes_and_keeps_newest()
+    test_only_missing_tail_is_fetched(pathlib.Path(tempfile.mkdtemp()))
+    test_longer_window_backfills_only_the_head()
+    test_corrections_survive_a_restart(pathlib.Path(tempfile.mkdtemp()))
+    print("All price history tests passed.")
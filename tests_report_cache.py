@@ -0,0 +1,51 @@
+from alerts import AlertEngine
+from crypto_buddy import CryptoBuddy
+from disk_cache import DiskCache
+from universe import MarketTable
+
+MARKETS = [
+    {"id": "bitcoin", "name": "Bitcoin", "symbol": "btc", "current_price": 60000.0, "market_cap": 1.2e12,
+     "market_cap_rank": 1, "total_volume": 3e10, "price_change_percentage_24h": 2.5},
+    {"id": "cardano", "name": "Cardano", "symbol": "ada", "current_price": 0.45, "market_cap": 1.6e10,
+     "market_cap_rank": 9, "total_volume": 4e8, "price_change_percentage_24h": 4.0},
+]
+
+
+def make_bot():
+    bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), alerts=AlertEngine())
+    bot._fetch = lambda url, params=None: MARKETS if url.endswith("/coins/markets") else None
+    return bot
+
+
+def test_reports_are_reused_until_the_snapshot_changes():
+    bot = make_bot()
+    first = bot.find_trending()
+    assert bot.find_trending() is first
+    assert bot.show_all() is bot.show_all()
+    assert bot.report_cache.hits == 2
+
+    bot.market_cache.refresh()
+    again = bot.find_trending()
+    assert again == first and again is not first
+
+
+def test_show_all_pages_through_the_universe():
+    bot = make_bot()
+    table = MarketTable()
+    table.add_page(1, [dict(MARKETS[0], id=f"coin-{i}", name=f"Coin {i}", symbol=f"c{i}", market_cap_rank=i + 1)
+                       for i in range(60)])
+    bot._universe = table.finalize()
+    bot.universe_pages = 1
+
+    first = bot.show_all()
+    assert "Coin 0 (C0)" in first and "Coin 25" not in first
+    assert "Page 1/3 (60 coins) - say 'show all page 2'" in first
+    last = bot.process_response("show all page 3")
+    assert "Coin 59" in last and "Page 3/3 (60 coins)\n" in last
+    assert bot.show_all(99) == last
+
+
+if __name__ == "__main__":
+    test_reports_are_reused_until_the_snapshot_changes()
+    test_show_all_pages_through_the_universe()
+    print("All report cache tests passed.")
@@ -0,0 +1,58 @@
+import numpy as np
+
+from scoring import BALANCED_WEIGHTS, LONG_TERM_WEIGHTS, MarketFrame, ScoringWeights, rank, score, top_k
+
+SNAPSHOT = [
+    {"id": "bitcoin", "market_cap_rank": 1, "price_change_percentage_24h": 2.0},
+    {"id": "cardano", "market_cap_rank": 12, "price_change_percentage_24h": 30.0},
+    {"id": "newcoin", "market_cap_rank": None, "price_change_percentage_24h": None},
+]
+SUSTAINABILITY = {"bitcoin": {"sustainability_score": 3}, "cardano": {"sustainability_score": 9}}
+
+
+def test_rules_match_the_advisor():
+    frame = MarketFrame.from_snapshot(SNAPSHOT, SUSTAINABILITY)
+    # long term: rising 3 + top-10 2 + 0.2*3 | rising 3 + green 3 + 0.2*9 | nothing
+    assert np.allclose(score(frame, LONG_TERM_WEIGHTS), [5.6, 7.8, 0.0])
+    # balanced: 3 + 0.2 momentum + 2 + 1.2 | 3 + 2 (capped) + 1 + 3.6 | nothing
+    assert np.allclose(score(frame, BALANCED_WEIGHTS), [6.4, 9.6, 0.0])
+    # stored history: 0.1 per % of indicator momentum, capped at 1 (long term) and 1.5 (balanced)
+    frame.trend[:] = [5.0, -30.0, np.nan]
+    assert np.allclose(score(frame, LONG_TERM_WEIGHTS), [6.1, 6.8, 0.0])
+    assert np.allclose(score(frame, BALANCED_WEIGHTS), [6.9, 8.1, 0.0])
+
+
+def test_top_k_is_ordered_and_tie_stable():
+    scores = np.array([1.0, 5.0, 3.0, 5.0, 3.0, 0.5])
+    assert list(top_k(scores, 3)) == [1, 3, 2]
+    assert list(top_k(scores, 10)) == [1, 3, 2, 4, 0, 5]
+    assert list(top_k(scores, 0)) == []
+
+
+def test_custom_weights():
+    frame = MarketFrame.from_snapshot(SNAPSHOT, SUSTAINABILITY)
+    size_only = ScoringWeights(rising=0.0, rank_tiers=((1, 10.0),))
+    assert rank(frame, size_only, 1) == [(0, 10.0)]
+
+    # Indicator momentum only counts where a coin has a reading
+    frame.trend[:] = [4.0, -30.0, np.nan]
+    trend_only = ScoringWeights(rising=0.0, trend=0.5, trend_cap=3.0)
+    assert np.allclose(score(frame, trend_only), [2.0, -3.0, 0.0])
+
+
+def test_offline_labels_map_onto_columns():
+    offline = {
+        "Bitcoin": {"price_trend": "rising", "market_cap": "high", "sustainability_score": 3},
+        "Cardano": {"price_trend": "rising", "market_cap": "medium", "sustainability_score": 9},
+    }
+    frame = MarketFrame.from_offline(offline)
+    assert list(frame.change) == [1.0, 1.0]
+    assert frame.ids == ["Bitcoin", "Cardano"]
+
+
+if __name__ == "__main__":
+    test_rules_match_the_advisor()
+    test_top_k_is_ordered_and_tie_stable()
+    test_custom_weights()
+    test_offline_labels_map_onto_columns()
+    print("All scoring tests passed.")
@@ -0,0 +1,75 @@
+from alerts import AlertEngine
+from coingecko import CoinGeckoClient
+from crypto_buddy import CryptoBuddy
+from disk_cache import DiskCache
+from fake_coingecko import DEFAULT_COINS, FakeCoinGecko
+from universe import ingest_universe
+
+
+def synthetic_coins(n):
+    coins = [dict(c) for c in DEFAULT_COINS]
+    for i in range(len(coins), n):
+        coins.append({"id": f"coin-{i}", "symbol": f"c{i}", "name": f"Coin {i}", "current_price": 1.0 + i,
+                      "market_cap": 1e9 / (i + 1), "market_cap_rank": i + 1, "total_volume": 1e6,
+                      "price_change_percentage_24h": None if i % 7 == 0 else 0.5})
+    # A small coin squatting on Bitcoin's ticker must not hijack "btc"
+    coins.append({"id": "btc-clone", "symbol": "btc", "name": "Bitcoin Clone", "current_price": 0.01,
+                  "market_cap": 1.0, "market_cap_rank": n + 1, "total_volume": 1.0,
+                  "price_change_percentage_24h": 0.0})
+    return coins
+
+
+def test_paginated_ingestion_and_index():
+    with FakeCoinGecko(coins=synthetic_coins(600)) as fake:
+        client = CoinGeckoClient(api_key="", tier="pro", base_url=fake.base_url)
+        table = ingest_universe(max_pages=10, fetch=client.get)
+        pages = [p for p in fake.requests if p.endswith("/coins/markets")]
+    assert len(table) == 601
+    assert len(pages) == 4  # 250 + 250 + 101, then the short page ends ingestion
+    assert table.ids[:2] == ["bitcoin", "ethereum"]
+    assert table.resolve("BTC") == "bitcoin"
+    assert table.resolve("Coin 420") == "coin-420"
+    assert table.resolve("nope") is None
+    rec = table.record("coin-14")
+    assert rec["market_cap_rank"] == 15 and rec["price_change_percentage_24h"] is None
+    assert table.columns["current_price"].dtype.itemsize == 8
+
+
+def test_failed_page_ends_ingestion_without_a_rank_gap():
+    with FakeCoinGecko(coins=synthetic_coins(1000)) as fake:
+        client = CoinGeckoClient(api_key="", tier="pro", base_url=fake.base_url, max_retries=0)
+
+        def fetch(path, params):
+            return None if params["page"] == 2 else client.get(path, params)
+
+        table = ingest_universe(max_pages=4, fetch=fetch)
+    assert len(table) == 250
+    assert table.record(table.ids[-1])["market_cap_rank"] == 250
+
+
+def test_universe_feeds_scoring_directly():
+    with FakeCoinGecko(coins=synthetic_coins(300)) as fake:
+        client = CoinGeckoClient(api_key="", tier="pro", base_url=fake.base_url)
+        table = ingest_universe(fetch=client.get)
+    frame = table.frame({"cardano": {"sustainability_score": 9}})
+    assert len(frame) == 301
+    assert frame.rank[0] == 1 and frame.change[14] == 0.0
+
+
+def test_cli_prices_any_listed_coin():
+    coins = synthetic_coins(300)
+    with FakeCoinGecko(coins=coins) as fake:
+        bot = CryptoBuddy(disk_cache=DiskCache(":memory:"), alerts=AlertEngine())
+        bot.client = CoinGeckoClient(api_key="", tier="pro", base_url=fake.base_url)
+        bot.base_url = fake.base_url
+        bot.universe_pages = 2
+        out = bot.process_response("what's the price of c42?")
+    assert "Coin 42 (C42)" in out and "$43.00" in out
+
+
+if __name__ == "__main__":
+    test_paginated_ingestion_and_index()
+    test_failed_page_ends_ingestion_without_a_rank_gap()
+    test_universe_feeds_scoring_directly()
+    test_cli_prices_any_listed_coin()
+    print("All universe tests passed.")
@@ -0,0 +1,141 @@
+import sys
+import threading
+import time
+
+import numpy as np
+
+from async_fetch import fetch_many
+from coingecko import get_client
+from scoring import MarketFrame
+
+PER_PAGE = 250
+NUMERIC_FIELDS = ("current_price", "market_cap", "total_volume", "price_change_percentage_24h", "market_cap_rank")
+
+
+class MarketTable:
+    """Columnar `/coins/markets` universe: interned strings plus one float64 array per field.
+
+    Pages can arrive in any order; `add_page` keeps them apart and `finalize`
+    stitches them together in page order (i.e. by market cap), then builds
+    the name/symbol/ID index. Missing numbers are stored as NaN.
+    """
+
+    def __init__(self):
+        self._pages = {}
+        self.ids = []
+        self.names = []
+        self.symbols = []
+        self.columns = {f: np.empty(0) for f in NUMERIC_FIELDS}
+        self.index = {}
+        self._row = {}
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add_page(self, page, records):
+        intern = sys.intern
+        n = len(records)
+        chunk = {
+            "ids": [intern(r["id"]) for r in records],
+            "names": [r.get("name") or r["id"] for r in records],
+            "symbols": [intern((r.get("symbol") or "").lower()) for r in records],
+        }
+        for f in NUMERIC_FIELDS:
+            chunk[f] = np.fromiter((np.nan if r.get(f) is None else r[f] for r in records), np.float64, n)
+        self._pages[page] = chunk
+
+    def finalize(self):
+        pages = [self._pages[p] for p in sorted(self._pages)]
+        self._pages = {}
+        self.ids = [i for p in pages for i in p["ids"]]
+        self.names = [n for p in pages for n in p["names"]]
+        self.symbols = [s for p in pages for s in p["symbols"]]
+        self.columns = {f: np.concatenate([p[f] for p in pages]) if pages else np.empty(0) for f in NUMERIC_FIELDS}
+        self._row = {cid: i for i, cid in enumerate(self.ids)}
+
+        # Ordered by market cap, so on a symbol/name clash the bigger coin wins
+        index = {}
+        for i, cid in enumerate(self.ids):
+            for key in (cid, self.names[i].lower(), self.symbols[i]):
+                if key:
+                    index.setdefault(key, cid)
+        self.index = index
+        self.loaded_at = time.time()
+        return self
+
+    def resolve(self, text):
+        """Coin ID for an ID, name or ticker symbol (case-insensitive), else None."""
+        return self.index.get(text.strip().lower())
+
+    def record(self, coin_id):
+        """The coin as a flat markets-style dict, or None."""
+        i = self._row.get(coin_id)
+        if i is None:
+            return None
+        rec = {"id": self.ids[i], "name": self.names[i], "symbol": self.symbols[i]}
+        for f in NUMERIC_FIELDS:
+            v = self.columns[f][i]
+            rec[f] = None if np.isnan(v) else float(v)
+        if rec["market_cap_rank"] is not None:
+            rec["market_cap_rank"] = int(rec["market_cap_rank"])
+        return rec
+
+    def frame(self, sustainability_data=None):
+        """Scoring columns straight from the table, without going back through dicts."""
+        sustainability_data = sustainability_data or {}
+        change = np.nan_to_num(self.columns["price_change_percentage_24h"], nan=0.0)
+        rank = np.nan_to_num(self.columns["market_cap_rank"], nan=np.inf)
+        sus = np.fromiter(
+            (sustainability_data.get(cid, {}).get("sustainability_score", np.nan) for cid in self.ids),
+            np.float64, len(self.ids),
+        )
+        return MarketFrame(self.ids, change, rank, sus)
+
+
+def page_params(page, per_page=PER_PAGE):
+    """`/coins/markets` query for one page of the market, by market cap."""
+    return {"vs_currency": "usd", "order": "market_cap_desc", "per_page": per_page, "page": page,
+            "sparkline": "false", "price_change_percentage": "24h"}
+
+
+def ingest_universe(max_pages=4, per_page=PER_PAGE, fetch=None, concurrency=4):
+    """Pull the top `max_pages * per_page` coins from /coins/markets into a MarketTable.
+
+    Pages are requested `concurrency` at a time (still subject to the shared
+    client's rate limit) and streamed into the table as they land. Ingestion
+    stops early at the first short or failed page.
+    """
+    fetch = fetch or get_client().get
+    table = MarketTable()
+    page = 1
+    while page <= max_pages:
+        wave = range(page, min(page + concurrency, max_pages + 1))
+        jobs = {p: ("/coins/markets", page_params(p, per_page)) for p in wave}
+        done = False
+        for p, records in sorted(fetch_many(jobs, fetch=fetch, limit=concurrency).items()):
+            if records:
+                table.add_page(p, records)
+            if not records or len(records) < per_page:
+                # Later pages of the wave would leave a gap in the ranks
+                done = True
+                break
+        if done:
+            break
+        page += concurrency
+    return table.finalize()
+
+
+_universe = None
+_universe_lock = threading.Lock()
+
+
+def get_universe(max_pages=4, max_age=600):
+    """Process-wide universe table, re-ingested once it is older than `max_age` seconds."""
+    global _universe
+    with _universe_lock:
+        if _universe is None or time.time() - _universe.loaded_at > max_age:
+            table = ingest_universe(max_pages)
+            if len(table) or _universe is None:
+                _universe = table
+        return _universe